@@ -1,95 +1,16 @@
 import streamlit as st
-from supabase import create_client
+from core.arranque import cliente, conexion_configurada, iniciar_pagina
+from core.estilos import BASE, LOGIN
+from core.recursos import icono, imagen
 
-# --- 1. CONFIGURACIÓN  ---
-st.set_page_config(page_title="Gestor Autónomo PRO", layout="wide", page_icon="logo.jpg")
+# --- 1. CONFIGURACIÓN Y ESTILOS (core/estilos.py, imágenes en static/) ---
+iniciar_pagina("Gestor Autónomo PRO", icono("logo", 64, "logo.jpg"), layout="wide", estilos=(BASE, LOGIN), login=False)
 
-# --- 2. TUS ESTILOS CSS GENERALES (CSS REFORZADO) ---
-st.markdown("""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;600;800&display=swap');
-    
-    html, body, [class*="css"] {
-        font-family: 'Inter', sans-serif;
-    }
+# --- 2. CONEXIÓN A SUPABASE ---
+# El cliente (y el import de supabase) se crea al pulsar ENTRAR / REGISTRARME,
+# no para pintar la portada.
 
-    #MainMenu {visibility: hidden;}
-    header {visibility: hidden;}
-    footer {visibility: hidden;}
-    
-    .stApp { background-color: #F8FAFC; color: #1E293B; }
-    
-    .block-container {
-        padding-top: 2rem !important;
-        padding-bottom: 2rem !important;
-    }
-
-    /* HERO SECTION */
-    .hero-box {
-        background: linear-gradient(135deg, #2563EB 0%, #1D4ED8 100%);
-        padding: 40px 20px;
-        border-radius: 20px;
-        color: white;
-        text-align: center;
-        margin-bottom: 40px; 
-        box-shadow: 0 10px 30px rgba(37, 99, 235, 0.2);
-    }
-
-    /* BOTONES */
-    .stButton > button {
-        border-radius: 12px; font-weight: 600; border: none;
-        background-color: #EFF6FF; color: #2563EB; 
-        padding: 0.6rem 1rem; transition: all 0.2s;
-        box-shadow: 0 2px 5px rgba(0,0,0,0.05);
-    }
-    .stButton > button:hover { 
-        background-color: #2563EB; color: white; 
-        box-shadow: 0 5px 15px rgba(37, 99, 235, 0.4);
-    }
-
-    /* --- 📱 TRUCO DE MAGIA PARA MÓVIL (VERSIÓN FUERTE) --- */
-    @media only screen and (max-width: 768px) {
-        
-        /* 1. Obligamos al contenedor de columnas a ser flexible vertical */
-        [data-testid="stHorizontalBlock"] {
-            display: flex !important;
-            flex-direction: column !important;
-            gap: 20px !important;
-        }
-        
-        /* 2. SELECCIONAMOS LA COLUMNA 2 (LOGIN) Y LA MOVEMOS PRIMERO */
-        [data-testid="column"]:nth-of-type(2) {
-            order: -1 !important; /* El -1 la manda arriba del todo */
-            margin-bottom: 10px !important;
-            z-index: 99 !important;
-        }
-        
-        /* 3. Las otras columnas (1 y 3) se quedan debajo (orden 0 por defecto) */
-        [data-testid="column"]:nth-of-type(1),
-        [data-testid="column"]:nth-of-type(3) {
-            order: 1 !important;
-        }
-    }
-    </style>
-""", unsafe_allow_html=True)
-
-# --- 3. CONEXIÓN A SUPABASE ---
-@st.cache_resource
-def init_supabase():
-    try:
-        url = st.secrets["supabase"]["url"]
-        key = st.secrets["supabase"]["key"]
-        return create_client(url, key)
-    except:
-        return None
-
-if 'supabase' not in st.session_state:
-    st.session_state['supabase'] = init_supabase()
-
-# --- 4. GESTIÓN DE SESIÓN ---
-if 'user' not in st.session_state: st.session_state['user'] = None
-
-# --- 5. LÓGICA DE PANTALLA PRINCIPAL ---
+# --- 3. LÓGICA DE PANTALLA PRINCIPAL ---
 if st.session_state['user'] is None:
     
     # A. CABECERA
@@ -135,7 +56,7 @@ if st.session_state['user'] is None:
 
     # --- 2. CENTRO: LOGIN ---
     with col_login:
-        if st.session_state['supabase'] is None:
+        if not conexion_configurada():
             st.error("❌ Error de conexión: Revisa secrets.toml")
         else:
             with st.container(border=True):
@@ -154,7 +75,7 @@ if st.session_state['user'] is None:
                     if st.button("🚀 ENTRAR", use_container_width=True):
                         with st.spinner("🔐 Verificando credenciales..."):
                             try:
-                                resp = st.session_state['supabase'].auth.sign_in_with_password({"email": email, "password": password})
+                                resp = cliente().auth.sign_in_with_password({"email": email, "password": password})
                                 st.session_state['user'] = resp.user
                                 st.rerun()
                             except Exception as e: 
@@ -169,7 +90,7 @@ if st.session_state['user'] is None:
                     if st.button("✨ REGISTRARME", use_container_width=True):
                         with st.spinner("📩 Creando tu cuenta..."):
                             try:
-                                resp = st.session_state['supabase'].auth.sign_up({"email": email_reg, "password": pass_reg})
+                                resp = cliente().auth.sign_up({"email": email_reg, "password": pass_reg})
                                 st.success("¡Cuenta creada! Revisa tu email.")
                             except Exception as e: st.error(f"Error: {e}")
                 
@@ -184,7 +105,8 @@ if st.session_state['user'] is None:
 
         with st.container(border=True):
             st.caption("✨ **Recomendado**")
-            st.image("revolut.jpg", use_container_width=True)
+            st.markdown(imagen("revolut", "Revolut Business", "(max-width: 768px) 100vw, 320px",
+                               estilo="border-radius: 8px;"), unsafe_allow_html=True)
             
             st.markdown("""
             <div style="font-size: 0.85em; color: #64748B; margin-bottom: 15px; line-height: 1.4;">
@@ -0,0 +1,2 @@
+# Banco de pruebas de rendimiento: datos sintéticos, un Supabase local en
+# memoria y un medidor que ejecuta las páginas con AppTest (python -m bench).
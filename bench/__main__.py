@@ -0,0 +1,259 @@
+import argparse
+import datetime
+import glob
+import inspect
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import streamlit as st
+from streamlit.delta_generator import DeltaGenerator
+from streamlit.testing.v1 import AppTest
+
+from bench.cliente_local import ClienteLocal
+from bench.sinteticos import generar
+
+# --- BANCO DE PRUEBAS DE LAS PÁGINAS ---
+# Para cada tamaño de libro genera los datos, los sirve con ClienteLocal y
+# ejecuta cada página con AppTest dos veces (en frío, con las cachés vacías,
+# y en caliente, un rerun sin cambios). De cada ejecución se guarda:
+#   - fetch_ms:   tiempo dentro del cliente (consultas + latencia simulada)
+#   - render_ms:  tiempo dentro de las llamadas st.* (serializar tablas, gráficos...)
+#   - compute_ms: el resto del script (cálculo, DataFrames, cachés), ya sin
+#                 la sobrecarga fija de AppTest
+#   - pico_mb:    memoria máxima (tracemalloc) de la ejecución en frío
+#
+# fetch_ms es lo que tarda ClienteLocal (pandas), no Postgres: sirve para
+# comparar commits entre sí; --latencia añade la ida y vuelta de la red.
+#
+#   python -m bench                                  # 10k y 100k filas
+#   python -m bench --filas 1000000 --paginas dashboard
+#   python -m bench --comparar bench/resultados/base.json
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTADOS = os.path.join(RAIZ, 'bench', 'resultados')
+
+PAGINAS = {
+    'dashboard': 'pages/1_*.py',
+    'ingresos': 'pages/2_*.py',
+    'gastos': 'pages/3_*.py',
+    'configuracion': 'pages/8_*.py',
+}
+
+USER_ID = '00000000-0000-0000-0000-00000000be17'
+UMBRAL = 0.25  # +25 % en tiempo total o memoria = regresión
+
+
+class _Cronometro:
+    # Suma el tiempo pasado en métodos de DeltaGenerator (solo la llamada más
+    # externa) descontando lo que el cliente haya tardado mientras tanto
+    def __init__(self, cliente):
+        self.cliente = cliente
+        self.render = 0.0
+        self._nivel = 0
+        self._originales = {}
+
+    def _envolver(self, funcion):
+        def envuelta(*args, **kwargs):
+            if self._nivel:
+                return funcion(*args, **kwargs)
+            self._nivel += 1
+            t0, f0 = time.perf_counter(), self.cliente.segundos
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                self._nivel -= 1
+                self.render += (time.perf_counter() - t0) - (self.cliente.segundos - f0)
+        return envuelta
+
+    def __enter__(self):
+        # Los elementos vienen de los mixins (MarkdownMixin, DataFrameMixin...)
+        for clase in DeltaGenerator.__mro__:
+            for nombre, valor in vars(clase).items():
+                if not nombre.startswith('_') and inspect.isfunction(valor) and nombre not in self._originales:
+                    self._originales[nombre] = nombre in vars(DeltaGenerator) and valor
+                    setattr(DeltaGenerator, nombre, self._envolver(valor))
+        self._rebind()
+        return self
+
+    def __exit__(self, *exc):
+        for nombre, valor in self._originales.items():
+            if valor:
+                setattr(DeltaGenerator, nombre, valor)
+            else:
+                delattr(DeltaGenerator, nombre)
+        self._originales = {}
+        self._rebind()
+
+    def _rebind(self):
+        # st.markdown y compañía son métodos ya ligados a la raíz: se vuelven a ligar
+        principal = st._main
+        for nombre in dir(principal):
+            if isinstance(getattr(st, nombre, None), type(principal.markdown)):
+                setattr(st, nombre, getattr(principal, nombre))
+
+
+def _app(ruta, cliente):
+    at = AppTest.from_file(ruta, default_timeout=600)
+    at.session_state['supabase'] = cliente
+    at.session_state['user'] = SimpleNamespace(id=USER_ID, email='bench@gestor.local')
+    at.secrets['supabase'] = {'url': 'http://127.0.0.1:9', 'key': 'bench'}
+    return at
+
+
+def _ejecutar(at, cliente, sobrecarga):
+    cliente.reiniciar_contadores()
+    with _Cronometro(cliente) as crono:
+        t0 = time.perf_counter()
+        at.run()
+        total = time.perf_counter() - t0
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    fetch, render = cliente.segundos, crono.render
+    return {
+        'total_ms': round(total * 1000, 1),
+        'fetch_ms': round(fetch * 1000, 1),
+        'compute_ms': round(max(total - fetch - render - sobrecarga, 0) * 1000, 1),
+        'render_ms': round(render * 1000, 1),
+        'consultas': cliente.consultas,
+    }
+
+
+def _limpiar_caches():
+    st.cache_resource.clear()
+    st.cache_data.clear()
+
+
+def _sobrecarga(veces=5):
+    # Lo que tarda AppTest con un script vacío: (primera ejecución, rerun).
+    # La primera de cada AppTest incluye registrar los componentes instalados.
+    primera, rerun = 0.0, 0.0
+    for _ in range(veces):
+        at = AppTest.from_string("import streamlit as st", default_timeout=60)
+        t0 = time.perf_counter()
+        at.run()
+        t1 = time.perf_counter()
+        at.run()
+        primera, rerun = primera + (t1 - t0), rerun + (time.perf_counter() - t1)
+    return primera / veces, rerun / veces
+
+
+def medir_pagina(ruta, cliente, sobrecarga):
+    _limpiar_caches()
+    at = _app(ruta, cliente)
+    frio = _ejecutar(at, cliente, sobrecarga[0])
+    caliente = _ejecutar(at, cliente, sobrecarga[1])
+
+    # Pasada aparte para la memoria: tracemalloc ralentiza y falsearía los tiempos
+    # y con las respuestas grabadas, para no contar la memoria del "servidor"
+    _limpiar_caches()
+    at = _app(ruta, cliente)
+    cliente.reproducir = True
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    try:
+        at.run()
+        pico = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+        cliente.reproducir = False
+    return {'frio': frio, 'caliente': caliente, 'pico_mb': round(pico / 2 ** 20, 1)}
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def ejecutar(filas, paginas, latencia_ms=0, semilla=0):
+    os.chdir(RAIZ)
+    rutas = {p: os.path.abspath(glob.glob(PAGINAS[p])[0]) for p in paginas}
+    sobrecarga = _sobrecarga()
+    resultados = {}
+    for n in filas:
+        t0 = time.perf_counter()
+        cliente = ClienteLocal(generar(n, USER_ID, semilla), latencia_ms)
+        print(f"· {n} filas generadas en {time.perf_counter() - t0:.1f} s", file=sys.stderr)
+        for pagina, ruta in rutas.items():
+            # Una ejecución previa para que los imports y las cachés de módulos
+            # de Streamlit no cuenten como tiempo de la primera página medida
+            _app(ruta, cliente).run()
+            resultados[f"{pagina}@{n}"] = medir_pagina(ruta, cliente, sobrecarga)
+            print(f"  {pagina:14} {_linea(resultados[f'{pagina}@{n}'])}", file=sys.stderr)
+    return {
+        'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'streamlit': st.__version__,
+        'latencia_ms': latencia_ms,
+        'semilla': semilla,
+        'sobrecarga_apptest_ms': [round(x * 1000, 1) for x in sobrecarga],
+        'resultados': resultados,
+    }
+
+
+def _linea(r):
+    f, c = r['frio'], r['caliente']
+    return (f"frío {f['total_ms']:>8} ms (fetch {f['fetch_ms']}, cómputo {f['compute_ms']}, "
+            f"render {f['render_ms']}, {f['consultas']} consultas) · caliente {c['total_ms']} ms "
+            f"· pico {r['pico_mb']} MB")
+
+
+def comparar(actual, base, umbral=UMBRAL):
+    # Imprime las diferencias y devuelve las claves que han empeorado más del umbral
+    peores = []
+    for clave, r in actual['resultados'].items():
+        anterior = base['resultados'].get(clave)
+        if anterior is None:
+            continue
+        for nombre, ahora, antes in (
+            ('frío', r['frio']['total_ms'], anterior['frio']['total_ms']),
+            ('caliente', r['caliente']['total_ms'], anterior['caliente']['total_ms']),
+            ('pico_mb', r['pico_mb'], anterior['pico_mb']),
+        ):
+            cambio = (ahora - antes) / antes if antes else 0.0
+            marca = '❌' if cambio > umbral else '✅'
+            print(f"{marca} {clave:24} {nombre:9} {antes:>9} -> {ahora:>9} ({cambio:+.0%})")
+            if cambio > umbral:
+                peores.append(f"{clave} {nombre}")
+    return peores
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide las páginas con libros sintéticos.")
+    parser.add_argument('--filas', type=int, nargs='+', default=[10_000, 100_000],
+                        help="movimientos por usuario (ingresos + gastos)")
+    parser.add_argument('--paginas', nargs='+', choices=list(PAGINAS), default=list(PAGINAS))
+    parser.add_argument('--latencia', type=float, default=0, help="ms de red simulada por consulta")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--salida', help="JSON de resultados (por defecto bench/resultados/<fecha>_<commit>.json)")
+    parser.add_argument('--comparar', help="JSON anterior con el que comparar")
+    parser.add_argument('--umbral', type=float, default=UMBRAL)
+    args = parser.parse_args()
+
+    actual = ejecutar(args.filas, args.paginas, args.latencia, args.semilla)
+
+    salida = args.salida or os.path.join(
+        RESULTADOS, f"{datetime.datetime.now():%Y%m%d-%H%M%S}_{actual['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, 'w', encoding='utf-8') as f:
+        json.dump(actual, f, indent=2, ensure_ascii=False)
+    print(f"Resultados en {salida}", file=sys.stderr)
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            peores = comparar(actual, json.load(f), args.umbral)
+        if peores:
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
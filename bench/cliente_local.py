@@ -0,0 +1,434 @@
+import datetime
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+from postgrest.exceptions import APIError
+
+from core.fiscal import TOTALES
+
+# --- SUPABASE LOCAL EN MEMORIA ---
+# Imita la parte del cliente de supabase-py que usa la app
+# (table().select().eq()...execute(), insert, delete, rpc('resumen_fiscal'),
+# rpc('restaurar_borrados') y rpc('uso_actual'), y las tablas
+# resumen_trimestral y contrapartes que en Postgres mantienen los triggers)
+# sobre DataFrames de pandas, para medir las páginas con 10k-1M filas sin
+# red ni base de datos. Las tablas se guardan ordenadas por (fecha, id), que
+# es lo que hace el índice (user_id, fecha desc, id desc) en Postgres: pedir
+# una página no ordena el histórico entero.
+#
+# 'plan' ({'plan', 'altas_mes', 'altas_total'}, como la tabla planes) pone
+# los límites de uso_mensual_trg a las altas hechas con este cliente; por
+# defecto, sin límites.
+# 'latencia_ms' añade una espera fija por petición para simular la red
+# (peticiones simultáneas esperan a la vez, como en un servidor real).
+# 'consultas' y 'segundos' acumulan el nº de peticiones y el tiempo gastado.
+# Con 'reproducir = True' las lecturas ya hechas se devuelven grabadas, sin
+# volver a calcularlas: así la memoria medida es la de la app y no la del
+# "servidor" (en producción ese trabajo lo hace Postgres).
+
+_OPERADORES = {
+    'eq': lambda c, v: c == v, 'neq': lambda c, v: c != v,
+    'gt': lambda c, v: c > v, 'gte': lambda c, v: c >= v,
+    'lt': lambda c, v: c < v, 'lte': lambda c, v: c <= v,
+}
+
+_TRUNCAR = {'week': 'W-SUN', 'month': 'M', 'quarter': 'Q', 'year': 'Y'}
+
+
+def _dividir(texto):
+    # "a,and(b,c),d" -> ["a", "and(b,c)", "d"] (comas de primer nivel, fuera de comillas)
+    partes, nivel, actual, comillas, escape = [], 0, '', False, False
+    for ch in texto:
+        if escape:
+            escape = False
+        elif ch == '\\' and comillas:
+            escape = True
+        elif ch == '"':
+            comillas = not comillas
+        elif ch == ',' and nivel == 0 and not comillas:
+            partes.append(actual)
+            actual = ''
+            continue
+        elif not comillas:
+            nivel += (ch == '(') - (ch == ')')
+        actual += ch
+    return partes + [actual] if actual else partes
+
+
+def _sin_comillas(valor):
+    # Valor de un filtro de PostgREST sin las comillas ni sus escapes
+    if len(valor) > 1 and valor[0] == valor[-1] == '"':
+        return re.sub(r'\\(.)', r'\1', valor[1:-1])
+    return valor
+
+
+def _like(patron):
+    # Patrón de ilike de PostgREST -> expresión regular. PostgREST cambia
+    # todos los "*" por "%" antes que nada (también "\\*"); luego es el LIKE
+    # de Postgres: "%", "_" y "\\" escapa
+    patron = _sin_comillas(patron).replace('*', '%')
+    regex, escape = '', False
+    for ch in patron:
+        if escape:
+            regex += re.escape(ch)
+            escape = False
+        elif ch == '\\':
+            escape = True
+        elif ch == '%':
+            regex += '.*'
+        elif ch == '_':
+            regex += '.'
+        else:
+            regex += re.escape(ch)
+    return '^' + regex + '$'
+
+
+def _ahora():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='microseconds')
+
+
+class _Consulta:
+    def __init__(self, cliente, tabla):
+        self._cliente = cliente
+        self._tabla = tabla
+        self._op = 'select'
+        self._columnas = '*'
+        self._filtros = []
+        self._orden = []
+        self._limite = None
+        self._desde = 0
+        self._valores = None
+
+    # --- Construcción (misma firma que postgrest) ---
+    def select(self, columnas='*', count=None):
+        self._columnas = columnas
+        return self
+
+    def insert(self, filas):
+        self._op, self._valores = 'insert', filas if isinstance(filas, list) else [filas]
+        return self
+
+    def update(self, valores):
+        self._op, self._valores = 'update', valores
+        return self
+
+    def delete(self):
+        self._op = 'delete'
+        return self
+
+    def _filtro(self, *filtro):
+        self._filtros.append(filtro)
+        return self
+
+    def eq(self, columna, valor): return self._filtro('eq', columna, valor)
+    def neq(self, columna, valor): return self._filtro('neq', columna, valor)
+    def gt(self, columna, valor): return self._filtro('gt', columna, valor)
+    def gte(self, columna, valor): return self._filtro('gte', columna, valor)
+    def lt(self, columna, valor): return self._filtro('lt', columna, valor)
+    def lte(self, columna, valor): return self._filtro('lte', columna, valor)
+    def in_(self, columna, valores): return self._filtro('in', columna, tuple(valores))
+    def ilike(self, columna, patron): return self._filtro('ilike', columna, patron)
+    def imatch(self, columna, patron): return self._filtro('imatch', columna, patron)
+    def or_(self, expresion): return self._filtro('or', expresion)
+
+    def order(self, columna, desc=False):
+        self._orden.append((columna, desc))
+        return self
+
+    def limit(self, n):
+        self._limite = n
+        return self
+
+    def range(self, desde, hasta):
+        self._desde, self._limite = desde, hasta - desde + 1
+        return self
+
+    def execute(self):
+        clave = (self._tabla, self._op, self._columnas, tuple(self._filtros), tuple(self._orden),
+                 self._limite, self._desde)
+        return self._cliente._ejecutar(self._resolver, clave if self._op == 'select' else None)
+
+    # --- Ejecución ---
+    def _mascara(self, df, filtro):
+        tipo, *args = filtro
+        if tipo == 'or':
+            return self._logico(df, 'or', args[0])
+        columna, valor = args
+        if tipo == 'in':
+            return df[columna].isin([self._cliente._valor(df, columna, v) for v in valor])
+        if tipo == 'ilike':
+            return df[columna].astype(str).str.match(_like(valor), case=False)
+        if tipo in ('match', 'imatch'):  # ~ / ~* de Postgres (los patrones de core.datos valen igual en re)
+            return df[columna].astype(str).str.contains(_sin_comillas(valor), case=tipo == 'match', regex=True)
+        return _OPERADORES[tipo](df[columna], self._cliente._valor(df, columna, valor))
+
+    def _logico(self, df, union, expresion):
+        # "fecha.lt.X,and(fecha.eq.X,id.lt.Y)" -> máscara (sintaxis de postgrest)
+        mascaras = []
+        for parte in _dividir(expresion):
+            if parte.startswith(('and(', 'or(')):
+                interior = parte[parte.index('(') + 1:-1]
+                mascaras.append(self._logico(df, parte[:parte.index('(')], interior))
+            else:
+                columna, op, valor = parte.split('.', 2)
+                mascaras.append(self._mascara(df, (op, columna, valor)))
+        resultado = mascaras[0]
+        for m in mascaras[1:]:
+            resultado = resultado | m if union == 'or' else resultado & m
+        return resultado
+
+    def _seleccion(self, df):
+        mascara = pd.Series(True, index=df.index)
+        for filtro in self._filtros:
+            mascara &= self._mascara(df, filtro)
+        return df[mascara]
+
+    def _resolver(self):
+        c = self._cliente
+        if self._op == 'insert':
+            propias = {'id', 'created_at'}.intersection(*self._valores)
+            if propias:  # columnas que solo pone la base de datos (migración de sincronización)
+                raise APIError({'code': '42501', 'details': None, 'hint': None,
+                                'message': f"permission denied for table {self._tabla}"})
+            return c._insertar(self._tabla, self._valores)
+        df = c._tabla(self._tabla)
+        sel = self._seleccion(df)
+        if self._op == 'delete':
+            c._quitar(self._tabla, sel.index)
+            return c._registros(sel, '*')
+        if self._op == 'update':
+            c._actualizar(self._tabla, sel.index, self._valores)
+            return c._registros(c._tabla(self._tabla).loc[sel.index], '*')
+        sel = self._ordenar(sel)
+        if self._limite is not None or self._desde:
+            fin = None if self._limite is None else self._desde + self._limite
+            sel = sel.iloc[self._desde:fin]
+        return c._registros(sel, self._columnas)
+
+    def _ordenar(self, df):
+        if not self._orden:
+            return df
+        # Orden del índice (fecha, id): basta con darle la vuelta
+        if [col for col, _ in self._orden] == ['fecha', 'id'] and self._tabla in self._cliente.tablas:
+            descendente = {d for _, d in self._orden}
+            if descendente == {False}:
+                return df
+            if descendente == {True}:
+                return df.iloc[::-1]
+        return df.sort_values([c for c, _ in self._orden], ascending=[not d for _, d in self._orden], kind='stable')
+
+
+class ClienteLocal:
+    def __init__(self, tablas, latencia_ms=0, plan=None):
+        self.tablas = {}
+        for nombre, df in tablas.items():
+            df = df.copy()
+            df['user_id'] = df['user_id'].astype('category')
+            self.tablas[nombre] = df.sort_values(['fecha', 'id'], kind='stable').reset_index(drop=True)
+        self.latencia_ms = latencia_ms
+        self.consultas = 0
+        self.segundos = 0.0
+        self.reproducir = False
+        self._grabadas = {}
+        self._libro = None
+        self._contrapartes = None
+        self._lapidas = {}  # (tabla, id) -> fila de la tabla borrados (id, user_id, borrado_en)
+        self._n_lapidas = 0
+        self.plan = plan or {'plan': 'pro', 'altas_mes': None, 'altas_total': None}
+        self._altas, self._bajas = 0, 0  # uso_mensual (las altas de este cliente son todas de este mes)
+        self._lock = threading.Lock()
+        self.auth = SimpleNamespace()
+
+    def table(self, nombre):
+        return _Consulta(self, nombre)
+
+    def rpc(self, nombre, params=None):
+        if nombre == 'uso_actual':
+            return SimpleNamespace(execute=lambda: self._ejecutar(lambda: [{
+                **self.plan, 'usadas_mes': self._altas - self._bajas, 'usadas_total': self._altas,
+                'mes': _ahora()[:7] + '-01'}]))
+        if nombre == 'restaurar_borrados':
+            return SimpleNamespace(execute=lambda: self._ejecutar(lambda: self._restaurar(**params)))
+        if nombre != 'resumen_fiscal':
+            # Lo mismo que contesta PostgREST cuando la función no existe
+            raise APIError({'code': 'PGRST202', 'details': None, 'hint': None,
+                            'message': f"Could not find the function public.{nombre} in the schema cache"})
+        clave = (nombre, tuple(sorted((params or {}).items())))
+        return SimpleNamespace(execute=lambda: self._ejecutar(lambda: self._resumen_fiscal(params or {}), clave))
+
+    def reiniciar_contadores(self):
+        self.consultas, self.segundos = 0, 0.0
+
+    # --- Internos ---
+    def _ejecutar(self, funcion, clave=None):
+        t0 = time.perf_counter()
+        if self.latencia_ms:
+            time.sleep(self.latencia_ms / 1000)  # fuera del lock: la red no se pone en cola
+        with self._lock:
+            if clave is None:
+                self._grabadas.clear()  # una escritura invalida lo grabado
+                datos = funcion()
+            elif self.reproducir and clave in self._grabadas:
+                datos = [dict(r) for r in self._grabadas[clave]]
+            else:
+                datos = self._grabadas[clave] = funcion()
+                datos = [dict(r) for r in datos]
+            self.consultas += 1
+            self.segundos += time.perf_counter() - t0
+        return SimpleNamespace(data=datos, count=len(datos))
+
+    def _tabla(self, nombre):
+        if nombre == 'resumen_trimestral':
+            if self._libro is None:
+                self._libro = self._calcular_libro()
+            return self._libro
+        if nombre == 'contrapartes':
+            if self._contrapartes is None:
+                self._contrapartes = self._calcular_contrapartes()
+            return self._contrapartes
+        if nombre == 'borrados':
+            return pd.DataFrame([{**l, 'tabla': t, 'fila_id': i} for (t, i), l in self._lapidas.items()],
+                                columns=['id', 'user_id', 'tabla', 'fila_id', 'borrado_en'])
+        return self.tablas[nombre]
+
+    def _valor(self, df, columna, valor):
+        if pd.api.types.is_datetime64_any_dtype(df[columna]):
+            return pd.Timestamp(valor)
+        if pd.api.types.is_integer_dtype(df[columna]):
+            return int(valor)
+        if pd.api.types.is_float_dtype(df[columna]):
+            return float(valor)
+        return str(valor)
+
+    def _registros(self, df, columnas):
+        if columnas != '*':
+            df = df[[c.strip() for c in columnas.split(',')]]
+        df = df.copy()
+        for c in df.columns:
+            if pd.api.types.is_datetime64_any_dtype(df[c]):
+                df[c] = df[c].dt.strftime('%Y-%m-%d')
+            elif isinstance(df[c].dtype, pd.CategoricalDtype):
+                df[c] = df[c].astype(object).where(df[c].notna(), None)  # null, como PostgREST
+        return df.to_dict('records')
+
+    def _insertar(self, nombre, filas, ids=None):
+        # ids = None: altas nuevas; con ids: filas restauradas (deshacen su baja)
+        df = self.tablas[nombre]
+        nuevas = pd.DataFrame(filas)
+        siguiente = int(df['id'].max() if len(df) else 0) + 1
+        nuevas['id'] = ids if ids is not None else range(siguiente, siguiente + len(nuevas))
+        if ids is None:
+            nuevas['created_at'] = _ahora()
+            self._contar(len(nuevas), 0)
+        else:
+            self._contar(0, -self._del_mes(nuevas))
+        if 'updated_at' in df.columns:  # como el trigger de la migración de sincronización
+            nuevas['updated_at'] = _ahora()
+        nuevas['fecha'] = pd.to_datetime(nuevas['fecha'])
+        todo = pd.concat([df.astype({'user_id': str}), nuevas], ignore_index=True)
+        todo['user_id'] = todo['user_id'].astype('category')
+        self.tablas[nombre] = todo.sort_values(['fecha', 'id'], kind='stable').reset_index(drop=True)
+        self._libro = self._contrapartes = None
+        return self._registros(nuevas, '*')
+
+    def _quitar(self, nombre, indices):
+        df = self.tablas[nombre]
+        borradas = df.loc[indices]
+        for i, u in zip(borradas['id'], borradas['user_id']):
+            self._n_lapidas += 1
+            self._lapidas[(nombre, int(i))] = {'id': self._n_lapidas, 'user_id': str(u), 'borrado_en': _ahora()}
+        self._bajas += self._del_mes(borradas)
+        self.tablas[nombre] = df.drop(index=indices).reset_index(drop=True)
+        self._libro = self._contrapartes = None
+
+    def _del_mes(self, filas):
+        if 'created_at' not in filas.columns:
+            return 0
+        return int((filas['created_at'].astype(str).str[:7] == _ahora()[:7]).sum())
+
+    def _contar(self, altas, bajas):
+        # Igual que uso_mensual_trg: si se pasa del límite, la sentencia no se aplica
+        mes, total = self._altas + altas - max(self._bajas + bajas, 0), self._altas + altas
+        limite = ((self.plan['altas_mes'] is not None and mes > self.plan['altas_mes'] and (altas or bajas))
+                  or (self.plan['altas_total'] is not None and total > self.plan['altas_total'] and altas))
+        if limite:
+            raise APIError({'code': '23514', 'details': None, 'hint': 'cuota',
+                            'message': f"Has llegado al límite del plan {self.plan['plan'].upper()}"})
+        self._altas, self._bajas = total, max(self._bajas + bajas, 0)
+
+    def _restaurar(self, p_tabla, p_filas):
+        # Como la función SQL: solo vuelven las filas con lápida, con su id y su usuario
+        filas = [f for f in p_filas if (p_tabla, int(f['id'])) in self._lapidas]
+        if not filas:
+            return []
+        ids = [int(f['id']) for f in filas]
+        restauradas = self._insertar(p_tabla, [{**f, 'user_id': self._lapidas[(p_tabla, i)]['user_id']}
+                                               for f, i in zip(filas, ids)], ids)
+        for i in ids:
+            del self._lapidas[(p_tabla, i)]
+        return restauradas
+
+    def _actualizar(self, nombre, indices, valores):
+        for columna, valor in valores.items():
+            self.tablas[nombre].loc[indices, columna] = valor
+        if 'updated_at' in self.tablas[nombre].columns:
+            self.tablas[nombre].loc[indices, 'updated_at'] = _ahora()
+        self._libro = self._contrapartes = None
+
+    def _movimientos(self, user_id=None, desde=None, hasta=None):
+        # ingresos + gastos con las columnas de TOTALES (igual que la función SQL)
+        partes = []
+        for nombre, destino in (('ingresos', ('base_ingresos', 'iva_rep', 'ret_sop')),
+                                ('gastos', ('base_gastos', 'iva_sop', 'ret_prac'))):
+            df = self.tablas[nombre]
+            mascara = pd.Series(True, index=df.index)
+            if user_id is not None:
+                mascara &= df['user_id'] == str(user_id)
+            if desde:
+                mascara &= df['fecha'] >= pd.Timestamp(desde)
+            if hasta:
+                mascara &= df['fecha'] <= pd.Timestamp(hasta)
+            m = df.loc[mascara, ['user_id', 'fecha', 'base', 'cuota_iva', 'retencion']]
+            m = m.rename(columns=dict(zip(('base', 'cuota_iva', 'retencion'), destino)))
+            m['n_' + nombre] = 1
+            partes.append(m)
+        m = pd.concat(partes, ignore_index=True)
+        m['user_id'] = m['user_id'].astype(str)
+        for c in (*TOTALES, 'n_ingresos', 'n_gastos'):
+            m[c] = m[c].fillna(0) if c in m.columns else 0
+        return m
+
+    def _resumen_fiscal(self, p):
+        m = self._movimientos(p.get('p_user_id'), p.get('p_desde'), p.get('p_hasta'))
+        periodo = p.get('p_periodo', 'total')
+        if m.empty:
+            return []
+        if periodo == 'total':
+            sumas = m[list(TOTALES)].sum()
+            return [{'periodo': None, **{c: float(sumas[c]) for c in TOTALES}}]
+        m['periodo'] = m['fecha'].dt.to_period(_TRUNCAR[periodo]).dt.start_time.dt.strftime('%Y-%m-%d')
+        sumas = m.groupby('periodo', sort=True)[list(TOTALES)].sum().reset_index()
+        return sumas.to_dict('records')
+
+    def _calcular_libro(self):
+        m = self._movimientos()
+        m['anio'] = m['fecha'].dt.year
+        m['trimestre'] = m['fecha'].dt.quarter
+        libro = m.groupby(['user_id', 'anio', 'trimestre'], as_index=False)[
+            ['n_ingresos', *TOTALES[:3], 'n_gastos', *TOTALES[3:]]].sum()
+        return libro.astype({'n_ingresos': 'int64', 'n_gastos': 'int64'})
+
+    def _calcular_contrapartes(self):
+        partes = []
+        for nombre, tipo in (('ingresos', 'cliente'), ('gastos', 'proveedor')):
+            df = self.tablas[nombre]
+            if tipo not in df.columns:
+                continue
+            m = df.groupby([df['user_id'].astype(str), df[tipo].astype(str)], observed=True).size()
+            m = m.rename('n').rename_axis(['user_id', 'nombre']).reset_index()
+            partes.append(m[m['nombre'].str.strip() != ''].assign(tipo=tipo))
+        return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(
+            columns=['user_id', 'nombre', 'n', 'tipo'])
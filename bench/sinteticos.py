@@ -0,0 +1,73 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+# --- LIBROS SINTÉTICOS DE INGRESOS / GASTOS ---
+# Genera el histórico de un autónomo con mezclas realistas: más facturas
+# entre semana y a final de mes, casi todo al 21 % de IVA, retención del 15 %
+# en la mayoría de facturas emitidas y pocas en los gastos. Con la misma
+# semilla siempre salen los mismos datos, así los resultados son comparables.
+
+# (valor, probabilidad)
+IVA_INGRESOS = ((21, 0.82), (10, 0.06), (4, 0.02), (0, 0.10))
+IRPF_INGRESOS = ((15, 0.60), (7, 0.15), (0, 0.25))
+IVA_GASTOS = ((21, 0.75), (10, 0.10), (4, 0.05), (0, 0.10))
+IRPF_GASTOS = ((0, 0.88), (15, 0.05), (19, 0.07))  # 19 %: alquiler del local
+
+CATEGORIAS = (("Servicios", 0.35), ("Suministros", 0.20), ("Herramientas", 0.15),
+              ("Alquiler", 0.10), ("Gestoría", 0.05), ("Otros", 0.15))
+
+PROPORCION_INGRESOS = 0.4  # del total de filas, el resto son gastos
+N_CLIENTES = 250
+N_PROVEEDORES = 400
+
+
+def _elegir(rng, opciones, n):
+    valores, pesos = zip(*opciones)
+    return rng.choice(np.array(valores), size=n, p=np.array(pesos) / sum(pesos))
+
+
+def _fechas(rng, n, anios, hasta):
+    # Días laborables pesan 5 veces más que el fin de semana y los últimos
+    # días de cada mes el doble (cierres, facturación mensual)
+    dias = pd.date_range(hasta - datetime.timedelta(days=365 * anios), hasta, freq='D')
+    peso = np.where(dias.dayofweek < 5, 5.0, 1.0)
+    peso *= np.where(dias.day > dias.days_in_month - 3, 2.0, 1.0)
+    return np.sort(rng.choice(dias.values, size=n, p=peso / peso.sum()))
+
+
+def _importes(rng, n, mediana, sigma):
+    return np.round(rng.lognormal(np.log(mediana), sigma, n), 2)
+
+
+def _tabla(rng, n, tabla, anios, hasta, primer_id):
+    es_ingreso = tabla == 'ingresos'
+    df = pd.DataFrame({'id': np.arange(primer_id, primer_id + n, dtype='int64'),
+                       'fecha': _fechas(rng, n, anios, hasta)})
+    if es_ingreso:
+        df['cliente'] = pd.Categorical([f"Cliente {i:03d} SL" for i in rng.zipf(1.6, n) % N_CLIENTES])
+    else:
+        df['proveedor'] = pd.Categorical([f"Proveedor {i:03d}" for i in rng.zipf(1.4, n) % N_PROVEEDORES])
+        df['categoria'] = pd.Categorical(_elegir(rng, CATEGORIAS, n))
+    df['base'] = _importes(rng, n, 900 if es_ingreso else 120, 0.9)
+    df['iva_pct'] = _elegir(rng, IVA_INGRESOS if es_ingreso else IVA_GASTOS, n).astype('int8')
+    df['irpf_pct'] = _elegir(rng, IRPF_INGRESOS if es_ingreso else IRPF_GASTOS, n).astype('int8')
+    df['cuota_iva'] = (df['base'] * df['iva_pct'] / 100).round(2)
+    df['retencion'] = (df['base'] * df['irpf_pct'] / 100).round(2)
+    df['total'] = (df['base'] + df['cuota_iva'] - df['retencion']).round(2)
+    return df
+
+
+def generar(filas, user_id, semilla=0, anios=3, hasta=None):
+    # {'ingresos': df, 'gastos': df} con 'filas' movimientos en total para user_id
+    rng = np.random.default_rng(semilla)
+    hasta = hasta or datetime.date.today()
+    n_ingresos = int(filas * PROPORCION_INGRESOS)
+    tablas = {
+        'ingresos': _tabla(rng, n_ingresos, 'ingresos', anios, hasta, 1),
+        'gastos': _tabla(rng, filas - n_ingresos, 'gastos', anios, hasta, 1),
+    }
+    for df in tablas.values():
+        df.insert(1, 'user_id', user_id)
+    return tablas
@@ -0,0 +1 @@
+# Módulos compartidos por app.py y las páginas de /pages.
@@ -0,0 +1,83 @@
+import importlib
+import sys
+
+import streamlit as st
+
+from core.estilos import inyectar
+from core.metricas import empezar_pagina
+
+# --- ARRANQUE COMÚN DE TODAS LAS PÁGINAS ---
+# Configuración, estilos, cliente de Supabase y control de sesión en un solo
+# sitio. Aquí no se importa nada pesado: supabase se importa al crear el
+# cliente y pandas/plotly se cargan con perezoso() cuando de verdad se usan,
+# así las páginas sin sesión o sin datos pintan antes.
+
+
+class _Perezoso:
+    # Se comporta como el módulo, pero no lo importa hasta el primer atributo.
+    # No se registra en sys.modules: así ni Streamlit ni inspect lo despiertan
+    # al recorrer los módulos cargados.
+    def __init__(self, nombre):
+        self._nombre = nombre
+
+    def __getattr__(self, atributo):
+        valor = getattr(importlib.import_module(self._nombre), atributo)
+        setattr(self, atributo, valor)  # las siguientes veces ya no pasa por aquí
+        return valor
+
+    def __repr__(self):
+        return f"<módulo perezoso {self._nombre!r}>"
+
+
+def perezoso(nombre):
+    # pd = perezoso("pandas") en lugar de import pandas as pd
+    if nombre in sys.modules:
+        return sys.modules[nombre]
+    return _Perezoso(nombre)
+
+
+def conexion_configurada():
+    try:
+        return bool(st.secrets["supabase"]["url"] and st.secrets["supabase"]["key"])
+    except Exception:
+        return False
+
+
+def init_supabase():
+    # Un cliente por sesión (el login es de la sesión); las conexiones HTTP
+    # son del proceso y se comparten (ver core/conexiones.py)
+    from core.conexiones import crear_cliente
+    try:
+        url = st.secrets["supabase"]["url"]
+        key = st.secrets["supabase"]["key"]
+        return crear_cliente(url, key)
+    except Exception:
+        return None
+
+
+def cliente():
+    if st.session_state.get('supabase') is None:
+        st.session_state['supabase'] = init_supabase()
+    return st.session_state['supabase']
+
+
+def es_admin():
+    # Emails con acceso a las páginas internas: [admin] emails = [...] en secrets.toml
+    user = st.session_state.get('user')
+    try:
+        return user is not None and user.email in st.secrets["admin"]["emails"]
+    except Exception:
+        return False
+
+
+def iniciar_pagina(titulo, icono, layout="centered", estilos=(), login=True):
+    st.set_page_config(page_title=titulo, page_icon=icono, layout=layout)
+    if estilos:
+        inyectar(*estilos)
+    if 'user' not in st.session_state:
+        st.session_state['user'] = None
+    user = st.session_state['user']
+    empezar_pagina(titulo, getattr(user, 'id', None))
+    if login and user is None:
+        st.warning("⚠️ Inicia sesión primero.")
+        st.stop()
@@ -0,0 +1,297 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+
+import streamlit as st
+
+# --- BUZÓN DE SALIDA DE SOPORTE ---
+# El formulario de Soporte no espera al correo: el mensaje se guarda en un
+# SQLite (una inserción, milisegundos) y un hilo del proceso lo manda
+# después. Si el servidor de correo falla, se reintenta con espera
+# exponencial; si el proceso se reinicia, lo pendiente sigue en el fichero y
+# se manda al arrancar de nuevo. Los mensajes salen por lotes, con una sola
+# conexión SMTP para todo el lote.
+#
+#   [soporte]                                   # en secrets.toml
+#   para = "soporte@midominio.es"
+#   de = "app@midominio.es"
+#   servidor = "smtp.midominio.es"
+#   puerto = 587
+#   usuario = "app@midominio.es"
+#   clave = "..."
+#   buzon = "/var/lib/gestor/buzon.sqlite3"     # por defecto, en el directorio temporal
+#   carpeta = "/tmp/correo"                     # en lugar de SMTP, deja cada correo como .eml
+#
+# El buzón es compartido por todos los procesos que apunten al mismo fichero:
+# cada lote se reserva (RESERVA) antes de mandarlo para que no salga dos veces.
+
+PARA = "finanzasyseguridadautonoma@gmail.com"  # si no hay [soporte] para
+LOTE = 20                 # mensajes por conexión SMTP
+MAX_INTENTOS = 8          # después se queda como fallido (python -m scripts.buzon reintentar)
+ESPERA_BASE = 30          # segundos antes del primer reintento; se dobla en cada fallo
+ESPERA_MAX = 3600         # tope de la espera entre reintentos
+RESERVA = 300             # segundos que un lote queda reservado por el hilo que lo manda
+RETENCION = 30            # días que se guardan los mensajes ya enviados
+TIMEOUT_SMTP = 30
+
+
+def _config():
+    try:
+        return dict(st.secrets["soporte"])
+    except Exception:
+        return {}
+
+
+def ruta(config):
+    return config.get("buzon") or os.path.join(tempfile.gettempdir(), "gestor_buzon.sqlite3")
+
+
+# --- TRANSPORTES ---
+def _caida(resultado, pendientes, error):
+    # Conexión perdida a mitad de lote: los que faltan se quedan con el error
+    resultado.update({id_mensaje: f"{type(error).__name__}: {error}" for id_mensaje, _ in pendientes})
+
+
+class CorreoSMTP:
+    def __init__(self, servidor, puerto=587, usuario=None, clave=None, tls=True):
+        self.servidor, self.puerto = servidor, int(puerto)
+        self.usuario, self.clave, self.tls = usuario, clave, tls
+
+    def enviar(self, correos):
+        # Una conexión para todo el lote. Devuelve {id: None si ha salido, o el error}.
+        # Si la conexión se cae a mitad, lo ya aceptado por el servidor cuenta
+        # como enviado y solo el resto se marca con el error (no sale dos veces).
+        # Si falla al conectar o al hacer login, la excepción es para todo el lote.
+        import smtplib
+
+        resultado = {}
+        smtp = smtplib.SMTP(self.servidor, self.puerto, timeout=TIMEOUT_SMTP)
+        try:
+            if self.tls:
+                smtp.starttls()
+            if self.usuario:
+                smtp.login(self.usuario, self.clave)
+            for i, (id_mensaje, correo) in enumerate(correos):
+                try:
+                    smtp.send_message(correo)
+                    resultado[id_mensaje] = None
+                except smtplib.SMTPServerDisconnected as e:
+                    _caida(resultado, correos[i:], e)
+                    break
+                except smtplib.SMTPException as e:  # rechazado este mensaje: el resto sigue
+                    resultado[id_mensaje] = str(e)
+                except OSError as e:  # timeout, conexión reiniciada... (SMTPException también es OSError)
+                    _caida(resultado, correos[i:], e)
+                    break
+        finally:
+            try:
+                smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                smtp.close()
+        return resultado
+
+
+class CorreoLocal:
+    # Sustituto del SMTP para desarrollo y pruebas: un .eml por mensaje
+    def __init__(self, carpeta):
+        self.carpeta = carpeta
+
+    def enviar(self, correos):
+        os.makedirs(self.carpeta, exist_ok=True)
+        for id_mensaje, correo in correos:
+            with open(os.path.join(self.carpeta, f"{id_mensaje:08d}.eml"), "wb") as f:
+                f.write(bytes(correo))
+        return {id_mensaje: None for id_mensaje, _ in correos}
+
+
+def transporte(config):
+    if config.get("carpeta"):
+        return CorreoLocal(config["carpeta"])
+    if config.get("servidor"):
+        return CorreoSMTP(config["servidor"], config.get("puerto", 587), config.get("usuario"),
+                          config.get("clave"), config.get("tls", True))
+    return None
+
+
+# --- COLA ---
+class Buzon:
+    def __init__(self, ruta):
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(ruta, check_same_thread=False, timeout=30, isolation_level=None)
+        self._con.execute("pragma journal_mode = wal")
+        self._con.execute("""
+            create table if not exists mensajes (
+                id         integer primary key autoincrement,
+                creado     real not null,
+                email      text not null,
+                asunto     text not null,
+                cuerpo     text not null,
+                user_id    text,
+                intentos   integer not null default 0,
+                siguiente  real not null,      -- no antes de este instante (reintentos y reservas)
+                enviado    real,
+                error      text
+            )""")
+        self._con.execute("create index if not exists mensajes_pendientes on mensajes (siguiente) "
+                          "where enviado is null")
+
+    def encolar(self, email, asunto, cuerpo, user_id=None):
+        ahora = time.time()
+        with self._lock:
+            cur = self._con.execute(
+                "insert into mensajes (creado, email, asunto, cuerpo, user_id, siguiente) values (?, ?, ?, ?, ?, ?)",
+                (ahora, email, asunto, cuerpo, user_id, ahora))
+        return cur.lastrowid
+
+    def reservar(self, n=LOTE):
+        # Toma hasta n mensajes pendientes y los aparta RESERVA segundos
+        ahora = time.time()
+        with self._lock:
+            self._con.execute("begin immediate")
+            try:
+                filas = self._con.execute(
+                    "select id, creado, email, asunto, cuerpo, user_id, intentos from mensajes "
+                    "where enviado is null and intentos < ? and siguiente <= ? order by siguiente limit ?",
+                    (MAX_INTENTOS, ahora, n)).fetchall()
+                self._con.executemany("update mensajes set siguiente = ? where id = ?",
+                                      [(ahora + RESERVA, f[0]) for f in filas])
+                self._con.execute("commit")
+            except Exception:
+                self._con.execute("rollback")
+                raise
+        return filas
+
+    def marcar(self, resultado, intentos):
+        # resultado {id: None | error}; intentos {id: intentos antes de este envío}
+        ahora = time.time()
+        enviados = [(ahora, i) for i, error in resultado.items() if error is None]
+        fallidos = [(error, ahora + _espera(intentos[i] + 1), i) for i, error in resultado.items() if error]
+        with self._lock:
+            self._con.execute("begin immediate")
+            try:
+                self._con.executemany("update mensajes set enviado = ?, error = null where id = ?", enviados)
+                self._con.executemany("update mensajes set intentos = intentos + 1, error = ?, siguiente = ? "
+                                      "where id = ?", fallidos)
+                self._con.execute("delete from mensajes where enviado < ?", (ahora - RETENCION * 86400,))
+                self._con.execute("commit")
+            except Exception:
+                self._con.execute("rollback")
+                raise
+
+    def descartar(self, errores):
+        # {id: error} que no se arreglan reintentando: pasan directamente a fallidos
+        with self._lock:
+            self._con.executemany("update mensajes set intentos = ?, error = ? where id = ?",
+                                  [(MAX_INTENTOS, error, i) for i, error in errores.items()])
+
+    def proximo(self):
+        # Segundos hasta el siguiente mensaje que toca mandar (None si no hay)
+        with self._lock:
+            fila = self._con.execute("select min(siguiente) from mensajes where enviado is null and intentos < ?",
+                                     (MAX_INTENTOS,)).fetchone()
+        return None if fila[0] is None else max(fila[0] - time.time(), 0)
+
+    def estado(self):
+        with self._lock:
+            return dict(self._con.execute(
+                "select case when enviado is not null then 'enviados' when intentos >= ? then 'fallidos' "
+                "else 'pendientes' end, count(*) from mensajes group by 1", (MAX_INTENTOS,)).fetchall())
+
+    def reintentar(self):
+        # Vuelve a poner en cola los fallidos
+        with self._lock:
+            return self._con.execute("update mensajes set intentos = 0, siguiente = ? "
+                                     "where enviado is null and intentos >= ?", (time.time(), MAX_INTENTOS)).rowcount
+
+
+def _espera(intentos):
+    # 30 s, 60 s, 2 min... hasta ESPERA_MAX, con +-20% para no reintentar todos a la vez
+    return min(ESPERA_BASE * 2 ** (intentos - 1), ESPERA_MAX) * random.uniform(0.8, 1.2)
+
+
+def correo(fila, para, de):
+    id_mensaje, creado, email, asunto, cuerpo, user_id, _ = fila
+    m = EmailMessage()
+    m["From"] = de
+    m["To"] = para
+    m["Reply-To"] = email
+    m["Subject"] = f"[Soporte] {asunto}"
+    m["Date"] = formatdate(creado, localtime=True)
+    m["Message-ID"] = make_msgid(f"soporte.{id_mensaje}")
+    m.set_content(f"{cuerpo}\n\n--\nDe: {email}\nUsuario: {user_id or 'sin sesión'}\n")
+    return m
+
+
+# --- CARTERO (HILO DE ENVÍO) ---
+class Cartero:
+    # Sin transporte configurado no arranca el hilo: los mensajes esperan en el buzón.
+    # Con hilo=False solo reparte cuando se le llama (scripts/buzon.py)
+    def __init__(self, buzon, transporte, para, de, hilo=True):
+        self.buzon, self.transporte, self.para, self.de = buzon, transporte, para, de
+        self._aviso = threading.Event()
+        if hilo and transporte is not None:
+            threading.Thread(target=self._bucle, name="cartero", daemon=True).start()
+
+    def avisar(self):
+        self._aviso.set()
+
+    def repartir(self):
+        # Manda lo que toque, lote a lote. Devuelve cuántos mensajes han salido
+        salidos = 0
+        while True:
+            filas = self.buzon.reservar()
+            if not filas:
+                return salidos
+            intentos = {f[0]: f[6] for f in filas}
+            correos, invalidos = [], {}
+            for f in filas:
+                try:
+                    correos.append((f[0], correo(f, self.para, self.de)))
+                except Exception as e:  # p.ej. un salto de línea en el asunto: no saldrá nunca
+                    invalidos[f[0]] = f"{type(e).__name__}: {e}"
+            if invalidos:
+                self.buzon.descartar(invalidos)
+            if not correos:
+                continue
+            try:
+                resultado = self.transporte.enviar(correos)
+            except Exception as e:  # sin conexión, login incorrecto...: todo el lote se reintenta
+                resultado = {id_mensaje: f"{type(e).__name__}: {e}" for id_mensaje, _ in correos}
+            self.buzon.marcar(resultado, intentos)
+            salidos += sum(1 for error in resultado.values() if error is None)
+            if any(resultado.values()):
+                return salidos  # el servidor falla: se espera al siguiente reintento
+
+    def _bucle(self):
+        while True:
+            try:
+                self.repartir()
+                espera = self.buzon.proximo()
+            except Exception:
+                espera = ESPERA_BASE
+            self._aviso.wait(ESPERA_MAX if espera is None else min(espera, ESPERA_MAX))
+            self._aviso.clear()
+
+
+def crear_cartero(config, hilo=True):
+    return Cartero(Buzon(ruta(config)), transporte(config), config.get("para", PARA),
+                   config.get("de", config.get("usuario", PARA)), hilo)
+
+
+@st.cache_resource
+def _cartero():
+    # Un buzón y un hilo de envío por proceso
+    return crear_cartero(_config())
+
+
+def encolar(email, asunto, cuerpo, user_id=None):
+    # Guarda el mensaje y despierta al hilo de envío. Vuelve en cuanto está en disco
+    cartero = _cartero()
+    id_mensaje = cartero.buzon.encolar(email, asunto, cuerpo, user_id)
+    cartero.avisar()
+    return id_mensaje
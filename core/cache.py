@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import OrderedDict
+
+import streamlit as st
+
+# --- CACHÉ POR USUARIO (LRU + TTL) ---
+# Las claves son (user_id, tabla, tipo, consulta). El "tipo" distingue filas crudas
+# (que se pueden parchear tras insertar/borrar) de cualquier otra lectura derivada
+# (que simplemente se descarta cuando cambia la tabla).
+# Cada (user_id, tabla) lleva un número de generación que suben invalidar y
+# parchear: si cambia mientras una carga está en curso (una escritura de otra
+# sesión o de otro hilo), lo cargado ya puede ser viejo y no se guarda.
+
+CACHE_TTL = 300          # segundos que vive una entrada
+CACHE_MAX_ENTRADAS = 512  # entradas totales antes de expulsar la menos usada
+
+
+class CacheUsuario:
+    def __init__(self, ttl=CACHE_TTL, max_entradas=CACHE_MAX_ENTRADAS):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._datos = OrderedDict()
+        self._generaciones = {}  # (user_id, tabla) -> nº de cambios vistos
+        self._lock = threading.Lock()
+
+    def obtener(self, user_id, tabla, tipo, consulta, cargar):
+        clave = (user_id, tabla, tipo, consulta)
+        ahora = time.monotonic()
+        with self._lock:
+            if clave in self._datos:
+                guardado, valor = self._datos[clave]
+                if ahora - guardado < self.ttl:
+                    self._datos.move_to_end(clave)
+                    return valor
+                del self._datos[clave]
+            generacion = self._generaciones.get(clave[:2], 0)
+
+        # La consulta se hace fuera del lock para no bloquear al resto de sesiones
+        valor = cargar()
+        with self._lock:
+            if self._generaciones.get(clave[:2], 0) != generacion:
+                return valor  # la tabla ha cambiado durante la carga: no se guarda
+            self._datos[clave] = (ahora, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+        return valor
+
+    def invalidar(self, user_id, tabla, conservar=None):
+        # Descarta todo lo de (user_id, tabla) salvo las entradas del tipo "conservar"
+        with self._lock:
+            self._generaciones[(user_id, tabla)] = self._generaciones.get((user_id, tabla), 0) + 1
+            for clave in [c for c in self._datos if c[:2] == (user_id, tabla)]:
+                if clave[2] != conservar:
+                    del self._datos[clave]
+
+    def parchear(self, user_id, tabla, tipo, funcion):
+        # Aplica funcion(valor) -> valor_nuevo a todas las entradas de ese tipo
+        with self._lock:
+            self._generaciones[(user_id, tabla)] = self._generaciones.get((user_id, tabla), 0) + 1
+            for clave, (guardado, valor) in list(self._datos.items()):
+                if clave[:3] == (user_id, tabla, tipo):
+                    self._datos[clave] = (guardado, funcion(valor))
+
+
+@st.cache_resource
+def cache_usuario():
+    # Una única instancia por proceso, compartida por todas las sesiones
+    return CacheUsuario()
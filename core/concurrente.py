@@ -0,0 +1,107 @@
+import threading
+import time
+import weakref
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from core.conexiones import MAX_CONEXIONES
+from core.metricas import en_hilo
+
+# --- CONSULTAS INDEPENDIENTES EN PARALELO ---
+# Las lecturas que no dependen unas de otras (p.ej. el libro trimestral y el
+# gráfico del Dashboard, o la página de la tabla y su contador) se lanzan a
+# la vez en un pool de hilos compartido y acotado: la página espera lo que
+# tarde la más lenta, no la suma.
+#
+#   datos, errores = a_la_vez({'trimestres': lambda: ..., 'figura': lambda: ...})
+#
+# Lo que falle o no llegue a tiempo va a 'errores' y el resto se pinta igual.
+# El timeout es de espera: el hilo no se puede matar, así que la petición
+# sigue hasta que venza el timeout del propio cliente HTTP. No anidar
+# llamadas a a_la_vez() dentro de una tarea (el pool es acotado).
+#
+# El pool tiene tantos hilos como conexiones HTTP (core/conexiones.py): más
+# hilos solo esperarían conexión libre. Cada sesión tiene además un cupo de
+# tareas en vuelo (contando las que siguen corriendo de reruns anteriores
+# que vencieron el timeout) y cada llamada puede pedir menos con
+# 'simultaneas'; lo que no cabe espera en la cola de la propia llamada, no
+# en la del pool, así que una sesión cargada no deja sin hilos a las demás.
+
+MAX_HILOS = MAX_CONEXIONES   # peticiones simultáneas como mucho, sumando todas las sesiones
+POR_SESION = 4               # tareas en vuelo como mucho por sesión
+TIMEOUT = 10                 # segundos que espera la página por el conjunto de consultas
+
+
+@st.cache_resource
+def _pool():
+    return ThreadPoolExecutor(max_workers=MAX_HILOS, thread_name_prefix="consultas")
+
+
+@st.cache_resource
+def _cupos():
+    # session_id -> semáforo. Débil: se va solo cuando la sesión no tiene nada en vuelo
+    return threading.Lock(), weakref.WeakValueDictionary()
+
+
+def _cupo(ctx):
+    lock, cupos = _cupos()
+    sesion = ctx.session_id if ctx is not None else None
+    with lock:
+        cupo = cupos.get(sesion)
+        if cupo is None:
+            cupo = cupos[sesion] = threading.BoundedSemaphore(POR_SESION)
+        return cupo
+
+
+def _queda(limite):
+    return None if limite is None else max(0.0, limite - time.monotonic())
+
+
+def _con_contexto(ctx, funcion):
+    # Los hilos del pool heredan el contexto de Streamlit de la sesión que pide
+    def tarea():
+        add_script_run_ctx(None, ctx)
+        try:
+            return funcion()
+        finally:
+            add_script_run_ctx(None, None)  # el hilo vuelve al pool sin sesión
+    return tarea
+
+
+def a_la_vez(tareas, timeout=TIMEOUT, simultaneas=POR_SESION):
+    # {nombre: función sin argumentos} -> ({nombre: resultado}, {nombre: excepción})
+    ctx = get_script_run_ctx()
+    pool = _pool()
+    cupo = _cupo(ctx)
+    limite = None if timeout is None else time.monotonic() + timeout
+    cola, futuros, activos = list(tareas.items()), {}, set()
+    while cola or activos:
+        # Se lanza lo que quepa; sin nada propio en vuelo se espera a que la sesión libere cupo
+        while cola and len(activos) < simultaneas:
+            if not cupo.acquire(timeout=0 if activos else _queda(limite)):
+                break
+            nombre, f = cola.pop(0)
+            futuro = pool.submit(_con_contexto(ctx, en_hilo(f)))
+            futuro.add_done_callback(lambda _: cupo.release())
+            futuros[nombre] = futuro
+            activos.add(futuro)
+        if not activos:
+            break  # ni cupo ni tiempo: lo que queda en la cola vence
+        hechos, activos = wait(activos, timeout=_queda(limite), return_when=FIRST_COMPLETED)
+        if not hechos:
+            break  # timeout
+
+    resultados, errores = {}, {}
+    for nombre in tareas:
+        futuro = futuros.get(nombre)
+        if futuro is None or not futuro.done():
+            if futuro is not None:
+                futuro.cancel()
+            errores[nombre] = TimeoutError(f"'{nombre}' no ha respondido en {timeout} s")
+        elif futuro.exception() is not None:
+            errores[nombre] = futuro.exception()
+        else:
+            resultados[nombre] = futuro.result()
+    return resultados, errores
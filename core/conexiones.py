@@ -0,0 +1,178 @@
+import importlib.util
+import threading
+import time
+from collections import deque
+
+import streamlit as st
+
+from core.metricas import metricas
+
+# --- CONEXIONES HTTP COMPARTIDAS CON SUPABASE ---
+# Cada sesión del navegador tiene su propio cliente de Supabase (su login,
+# su token), pero todos mandan las peticiones por un único httpx.Client del
+# proceso: un pool de conexiones keep-alive (HTTP/2 si está h2) que se
+# quedan abiertas entre reruns y entre sesiones. Así una sesión nueva no
+# paga el TCP + TLS, y varias peticiones a la vez (core/concurrente.py)
+# comparten conexión. Las cabeceras de usuario (apikey, Authorization) van
+# en cada petición, no en el httpx.Client, así que compartirlo es seguro
+# desde supabase 2.22.3 (postgrest 2.x; ver requirements.txt): las versiones
+# anteriores escriben cabeceras y base_url en el httpx.Client recibido y
+# mezclarían los tokens de distintos usuarios.
+#
+# Las métricas del pool (conexiones abiertas, % de reutilización, espera por
+# una conexión libre y tiempo de conexión) se ven en la página Rendimiento y
+# salen con las del resto en el volcado de Prometheus.
+
+MAX_CONEXIONES = 40       # abiertas a la vez con Supabase (con HTTP/2 cada una lleva muchas peticiones)
+MAX_LIBRES = 20           # que se quedan abiertas sin uso
+EXPIRACION = 60           # segundos que aguanta una conexión libre antes de cerrarla
+TIMEOUT = 60              # segundos por petición
+TIMEOUT_CONEXION = 10
+TIMEOUT_POOL = 10         # segundos esperando una conexión libre antes de fallar
+VENTANA = 1000            # últimas peticiones para los percentiles
+
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+
+class Estadisticas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.peticiones = 0
+        self.reutilizadas = 0
+        self.errores = 0
+        self.espera_s = 0.0
+        self.conexion_s = 0.0
+        self.recientes = deque(maxlen=VENTANA)   # (espera ms, conexión ms o None)
+        self.pool = None
+
+    def anotar(self, espera, conexion, error=False):
+        with self._lock:
+            self.peticiones += 1
+            self.errores += error
+            self.reutilizadas += conexion is None and not error
+            self.espera_s += espera
+            self.conexion_s += conexion or 0.0
+            self.recientes.append((espera * 1000, None if conexion is None else conexion * 1000))
+
+    def abiertas(self):
+        # (abiertas, en uso) ahora mismo
+        conexiones = list(getattr(self.pool, 'connections', ()))
+        return len(conexiones), sum(1 for c in conexiones if not c.is_idle())
+
+    def resumen(self):
+        abiertas, en_uso = self.abiertas()
+        with self._lock:
+            esperas = sorted(e for e, _ in self.recientes)
+            conexiones = sorted(c for _, c in self.recientes if c is not None)
+            peticiones, reutilizadas, errores = self.peticiones, self.reutilizadas, self.errores
+        p = lambda valores, q: round(valores[min(int(q * len(valores)), len(valores) - 1)], 1) if valores else None
+        return {
+            'http2': HTTP2, 'abiertas': abiertas, 'en_uso': en_uso, 'maximo': MAX_CONEXIONES,
+            'peticiones': peticiones, 'errores': errores,
+            'reutilizacion': round(100 * reutilizadas / peticiones, 1) if peticiones else None,
+            'espera_p50_ms': p(esperas, 0.50), 'espera_p95_ms': p(esperas, 0.95),
+            'conexion_p50_ms': p(conexiones, 0.50), 'conexion_p95_ms': p(conexiones, 0.95),
+        }
+
+    def prometheus(self):
+        abiertas, en_uso = self.abiertas()
+        with self._lock:
+            valores = [
+                ("gestor_http_conexiones", "gauge", "Conexiones abiertas con Supabase.", abiertas),
+                ("gestor_http_conexiones_en_uso", "gauge", "Conexiones con una petición en curso.", en_uso),
+                ("gestor_http_peticiones_total", "counter", "Peticiones HTTP a Supabase.", self.peticiones),
+                ("gestor_http_reutilizadas_total", "counter", "Peticiones sobre una conexión ya abierta.",
+                 self.reutilizadas),
+                ("gestor_http_errores_total", "counter", "Peticiones que no han llegado a tener respuesta.",
+                 self.errores),
+                ("gestor_http_espera_segundos_total", "counter", "Tiempo esperando una conexión libre del pool.",
+                 round(self.espera_s, 6)),
+                ("gestor_http_conexion_segundos_total", "counter", "Tiempo abriendo conexiones (TCP + TLS).",
+                 round(self.conexion_s, 6)),
+            ]
+        lineas = []
+        for nombre, tipo, ayuda, valor in valores:
+            lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo}", f"{nombre} {valor}"]
+        return "\n".join(lineas) + "\n"
+
+
+class Transporte:
+    # Envuelve el transporte de httpx para medir cada petición con las trazas
+    # de httpcore: si abre conexión nueva (connect_tcp) o reutiliza una, y
+    # cuánto espera antes de empezar a conectar o a mandar las cabeceras.
+    # httpx solo le pide handle_request y close (no hace falta heredar de
+    # httpx.BaseTransport, así no se importa httpx al cargar el módulo).
+    def __init__(self, transporte, estadisticas):
+        self._transporte = transporte
+        self._estadisticas = estadisticas
+        # _pool es interno de httpx: si cambia, solo se pierden las conexiones abiertas en las métricas
+        estadisticas.pool = getattr(transporte, '_pool', None)
+
+    def handle_request(self, request):
+        inicio = time.perf_counter()
+        marcas = {}
+        anterior = request.extensions.get("trace")
+
+        def traza(evento, info):
+            if evento not in marcas:
+                marcas[evento] = time.perf_counter()
+            if anterior is not None:
+                anterior(evento, info)
+
+        request.extensions["trace"] = traza
+        try:
+            respuesta = self._transporte.handle_request(request)
+        except Exception:
+            self._anotar(inicio, marcas, error=True)
+            raise
+        self._anotar(inicio, marcas)
+        return respuesta
+
+    def _anotar(self, inicio, marcas, error=False):
+        conecta = marcas.get("connection.connect_tcp.started")
+        cabeceras = marcas.get("http2.send_request_headers.started", marcas.get("http11.send_request_headers.started"))
+        if conecta is not None:
+            # Conexión nueva: hasta connect_tcp es espera, desde ahí hasta la
+            # primera cabecera (o el final, si falla) es TCP + TLS
+            fin = cabeceras or time.perf_counter()
+            self._estadisticas.anotar(conecta - inicio, fin - conecta, error)
+        else:
+            self._estadisticas.anotar((cabeceras or time.perf_counter()) - inicio, None, error)
+
+    def close(self):
+        self._transporte.close()
+
+
+def crear_http(estadisticas):
+    import httpx
+
+    transporte = httpx.HTTPTransport(
+        http2=HTTP2,
+        limits=httpx.Limits(max_connections=MAX_CONEXIONES, max_keepalive_connections=MAX_LIBRES,
+                            keepalive_expiry=EXPIRACION),
+    )
+    return httpx.Client(
+        transport=Transporte(transporte, estadisticas),
+        timeout=httpx.Timeout(TIMEOUT, connect=TIMEOUT_CONEXION, pool=TIMEOUT_POOL),
+        follow_redirects=True,
+    )
+
+
+@st.cache_resource
+def _http():
+    # Un único pool por proceso; sus métricas salen con las de core/metricas.py
+    medidas = Estadisticas()
+    metricas().anadir(medidas.prometheus)
+    return crear_http(medidas), medidas
+
+
+def estadisticas():
+    return _http()[1]
+
+
+def crear_cliente(url, key):
+    # Cliente de Supabase para una sesión: su propio login sobre el pool compartido
+    from supabase import create_client
+    from supabase.lib.client_options import SyncClientOptions
+
+    return create_client(url, key, options=SyncClientOptions(httpx_client=_http()[0]))
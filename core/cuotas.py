@@ -0,0 +1,92 @@
+import datetime
+
+from core.cache import cache_usuario
+from core.metricas import fase
+
+# --- LÍMITES DEL PLAN (GRATIS / NORMAL / PRO) ---
+# La base de datos lleva el uso (tabla uso_mensual) y rechaza lo que se
+# pasa del límite; aquí se guarda una copia de esos contadores en la caché
+# por usuario para avisar ANTES de escribir, sin una consulta más por alta:
+#
+#   comprobar(client, user_id, filas)   # lanza CuotaAgotada si no caben
+#   anotar(user_id, filas, +1 / -1)     # tras insertar / borrar
+#   disponibles(client, user_id)        # None = sin límite
+#
+# Como en uso_mensual, borrar solo devuelve cupo del límite mensual y si la
+# fila se dio de alta este mes; "Deshacer" (altas=False) lo vuelve a ocupar
+# sin contar como alta nueva. El mes es el de la base de datos (campo 'mes'
+# de uso_actual), no el reloj de este servidor.
+#
+# Se pide una vez (RPC uso_actual) y caduca con la caché (CACHE_TTL) o al
+# cambiar de mes. Si la base de datos rechaza una alta por el límite
+# (es_limite), la copia se descarta y se vuelve a leer.
+
+CUOTA = "cuota"  # pseudo-tabla en la caché por usuario
+
+
+class CuotaAgotada(Exception):
+    pass
+
+
+def _mes_utc():
+    # Solo para que la copia caduque a la vez que cambia el mes de la base de datos (now() en UTC)
+    return datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m')
+
+
+def estado(client, user_id):
+    # {'plan', 'altas_mes', 'altas_total', 'usadas_mes', 'usadas_total', 'mes'} o None si no hay límites
+    def cargar():
+        with fase("datos"):
+            datos = client.rpc('uso_actual').execute().data
+        return dict(datos[0]) if datos else None
+    return cache_usuario().obtener(user_id, CUOTA, "estado", _mes_utc(), cargar)
+
+
+def disponibles(client, user_id):
+    # Registros que aún caben este mes (None = sin límite)
+    e = estado(client, user_id)
+    if not e:
+        return None
+    quedan = [limite - e[usadas] for limite, usadas in ((e['altas_mes'], 'usadas_mes'),
+                                                        (e['altas_total'], 'usadas_total'))
+              if limite is not None]
+    return max(min(quedan), 0) if quedan else None
+
+
+def _del_mes(e, filas):
+    # Las filas que cuentan para el mes en curso: las nuevas (sin created_at todavía)
+    # y las dadas de alta en el mes que dice uso_actual
+    mes = str(e['mes'])[:7]
+    return sum(1 for f in filas if not f.get('created_at') or str(f['created_at'])[:7] == mes)
+
+
+def comprobar(client, user_id, filas, altas=True):
+    e = estado(client, user_id)
+    if not e:
+        return
+    if e['altas_mes'] is not None and e['usadas_mes'] + _del_mes(e, filas) > e['altas_mes']:
+        raise CuotaAgotada(f"Has llegado al límite del plan {e['plan'].upper()}: "
+                           f"{e['altas_mes']} registros al mes ({e['usadas_mes']} usados)")
+    if altas and e['altas_total'] is not None and e['usadas_total'] + len(filas) > e['altas_total']:
+        raise CuotaAgotada(f"Has llegado al límite del plan {e['plan'].upper()}: "
+                           f"{e['altas_total']} registros en total ({e['usadas_total']} usados)")
+
+
+def anotar(user_id, filas, signo=1, altas=True):
+    # Actualiza la copia en caché con las filas que la base de datos ya ha aceptado
+    def parche(e):
+        if not e:
+            return e
+        total = len(filas) if altas and signo > 0 else 0
+        return {**e, 'usadas_mes': max(e['usadas_mes'] + signo * _del_mes(e, filas), 0),
+                'usadas_total': e['usadas_total'] + total}
+    cache_usuario().parchear(user_id, CUOTA, "estado", parche)
+
+
+def es_limite(error):
+    # Rechazo de la base de datos por el límite del plan (hint de uso_mensual_trg)
+    return getattr(error, 'hint', None) == 'cuota'
+
+
+def olvidar(user_id):
+    cache_usuario().invalidar(user_id, CUOTA)
@@ -0,0 +1,317 @@
+import re
+
+from core.arranque import perezoso
+from core import cuotas
+from core.cache import cache_usuario
+from core.dinero import IMPORTES, centimos, centimos_serie, euros
+from core.fiscal import TOTALES
+from core.metricas import fase
+
+pd = perezoso("pandas")
+
+# --- ACCESO A DATOS (INGRESOS / GASTOS) ---
+# Todas las páginas leen a través de estas funciones para compartir la caché
+# por usuario. Cada vista pide solo sus columnas y recibe un DataFrame con
+# tipos fijos (fechas ya parseadas, importes en céntimos int64 (ver
+# core/dinero.py), porcentajes int8 y categorías para los textos repetidos). Las escrituras parchean las filas
+# cacheadas en lugar de obligar a descargar de nuevo toda la tabla.
+# Cada petición a Supabase cuenta como fase "datos" (ver core/metricas.py).
+# Con la réplica local activada ([espejo] en secrets.toml) las lecturas se
+# resuelven en SQLite y Supabase solo manda los cambios (ver core/espejo.py).
+
+FILAS = "filas"
+PAGINA = "pagina"
+NOMBRES = "nombres"
+RESUMEN = "resumen"  # pseudo-tabla para los agregados que dependen de ingresos y gastos
+
+LOTE_BORRADO = 200  # ids por DELETE (van en la URL de PostgREST)
+MAX_SUGERENCIAS = 200  # clientes/proveedores habituales que se ofrecen al escribir
+
+COLUMNAS = {
+    'ingresos': ('id', 'fecha', 'cliente', 'base', 'iva_pct', 'cuota_iva', 'irpf_pct', 'retencion', 'total'),
+    'gastos': ('id', 'fecha', 'proveedor', 'categoria', 'base', 'iva_pct', 'cuota_iva', 'irpf_pct', 'retencion', 'total'),
+}
+
+# Columnas de texto en las que busca la tabla paginada (índices de trigramas,
+# ver la migración de búsqueda) y la que se autocompleta en el formulario
+BUSCAR_EN = {'ingresos': ('cliente',), 'gastos': ('proveedor', 'categoria')}
+CONTRAPARTE = {'ingresos': 'cliente', 'gastos': 'proveedor'}
+
+# Columnas que necesita cada vista (siempre con 'id' para poder parchear la caché)
+VISTAS = {
+    'tabla': lambda tabla: COLUMNAS[tabla],
+    'export': lambda tabla: COLUMNAS[tabla],
+    'fiscal': lambda tabla: ('id', 'fecha', 'base', 'cuota_iva', 'retencion'),
+}
+
+TIPOS = {
+    'id': 'int64',
+    'base': 'int64', 'cuota_iva': 'int64', 'retencion': 'int64', 'total': 'int64',  # céntimos
+    'iva_pct': 'int8', 'irpf_pct': 'int8',
+    'cliente': 'category', 'proveedor': 'category', 'categoria': 'category',
+}
+
+
+def a_dataframe(filas, columnas):
+    # Lista de dicts de PostgREST (importes en euros) -> DataFrame con los tipos de TIPOS
+    df = pd.DataFrame.from_records(filas, columns=list(columnas))
+    for c in IMPORTES:
+        if c in df.columns:
+            df[c] = centimos_serie(df[c])
+    return _tipar(df)
+
+
+def _tipar(df):
+    # Los importes ya llegan en céntimos (a_dataframe o la réplica local)
+    df = df.copy()
+    for c in df.columns:
+        if c == 'fecha':
+            df[c] = pd.to_datetime(df[c], format='ISO8601')
+        elif TIPOS.get(c) == 'category':
+            df[c] = df[c].astype('category')
+        elif c in TIPOS:
+            df[c] = pd.to_numeric(df[c]).fillna(0).astype(TIPOS[c])
+    return df
+
+
+def _select(tabla, vista):
+    return ', '.join(VISTAS[vista](tabla))
+
+
+def _espejo(client, user_id):
+    # Réplica local ya sincronizada, o None si no está activada
+    from core import espejo  # importa core.datos: aquí dentro para no hacer un ciclo
+    return espejo.espejo(client, user_id) if espejo.activo() else None
+
+
+def leer_tabla(client, user_id, tabla, vista='export'):
+    e = _espejo(client, user_id)
+
+    def cargar():
+        if e:
+            return _tipar(e.filas(tabla, VISTAS[vista](tabla)))
+        with fase("datos"):
+            resp = client.table(tabla).select(_select(tabla, vista)).eq('user_id', user_id).execute()
+        return a_dataframe(resp.data or [], VISTAS[vista](tabla))
+    return cache_usuario().obtener(user_id, tabla, FILAS, vista, cargar)
+
+
+def _patron(texto):
+    # Texto buscado -> valor para un imatch (~* de Postgres) dentro de or=(...)
+    # de PostgREST: una expresión regular que solo encuentra el texto tal cual.
+    # Con ilike no se puede: PostgREST cambia todo '*' por '%' antes de pasarlo
+    # a Postgres y no hay forma de escaparlo. Los índices de trigramas sirven
+    # igual para ~*. Va entre comillas (puede llevar comas o puntos).
+    texto = re.sub(r'[^\w\s]', r'\\\g<0>', texto)
+    texto = texto.replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{texto}"'
+
+
+def _filtrar(q, tabla, filtro):
+    # filtro = {'texto', 'desde', 'hasta', 'minimo', 'maximo'} (los que haya; importes en céntimos)
+    if filtro.get('texto'):
+        patron = _patron(filtro['texto'])
+        q = q.or_(','.join(f"{c}.imatch.{patron}" for c in BUSCAR_EN[tabla]))
+    if filtro.get('desde'): q = q.gte('fecha', str(filtro['desde']))
+    if filtro.get('hasta'): q = q.lte('fecha', str(filtro['hasta']))
+    if filtro.get('minimo') is not None: q = q.gte('total', euros(filtro['minimo']))
+    if filtro.get('maximo') is not None: q = q.lte('total', euros(filtro['maximo']))
+    return q
+
+
+def pagina(client, user_id, tabla, limite, cursor=None, filtro=None):
+    # Paginación por cursor ordenada por (fecha, id) descendente.
+    # cursor = (fecha, id) de la última fila de la página anterior.
+    # filtro = búsqueda de la tabla (ver _filtrar), resuelta en el servidor.
+    # Devuelve (df, hay_mas). Pide limite+1 filas para saber si hay más.
+    e = _espejo(client, user_id)
+    filtro = filtro or {}
+
+    def cargar():
+        if e:
+            return _tipar(e.filas(tabla, VISTAS['tabla'](tabla), cursor=cursor, descendente=True, limite=limite + 1,
+                                  filtro=filtro))
+        q = _filtrar(client.table(tabla).select(_select(tabla, 'tabla')).eq('user_id', user_id), tabla, filtro)
+        if cursor is not None:
+            fecha, id_fila = cursor
+            q = q.or_(f"fecha.lt.{fecha},and(fecha.eq.{fecha},id.lt.{id_fila})")
+        with fase("datos"):
+            resp = q.order('fecha', desc=True).order('id', desc=True).limit(limite + 1).execute()
+        return a_dataframe(resp.data or [], VISTAS['tabla'](tabla))
+    consulta = (limite, cursor, tuple(sorted(filtro.items())))
+    df = cache_usuario().obtener(user_id, tabla, PAGINA, consulta, cargar)
+    return df.iloc[:limite], len(df) > limite
+
+
+def sugerencias(client, user_id, tabla, limite=MAX_SUGERENCIAS):
+    # Clientes (o proveedores) ya usados, de más a menos facturas, para el
+    # autocompletado del formulario. Salen del contador 'contrapartes' que
+    # mantienen los triggers: no se agrupa el histórico en cada alta.
+    e = _espejo(client, user_id)
+    tipo = CONTRAPARTE[tabla]
+
+    def cargar():
+        if e:
+            return e.sugerencias(tabla, tipo, limite)
+        with fase("datos"):
+            datos = (client.table('contrapartes').select('nombre').eq('user_id', user_id).eq('tipo', tipo)
+                     .order('n', desc=True).order('nombre').limit(limite).execute().data)
+        return [r['nombre'] for r in datos or []]
+    return cache_usuario().obtener(user_id, tabla, NOMBRES, limite, cargar)
+
+
+def recorrer(client, user_id, tabla, vista='export', desde=None, hasta=None, bloque=1000):
+    # Generador de DataFrames de 'bloque' filas en orden (fecha, id) ascendente.
+    # Sin caché: pensado para exportaciones, la memoria no crece con el histórico.
+    e = _espejo(client, user_id)
+    cursor = None
+    while True:
+        if e:
+            df = _tipar(e.filas(tabla, VISTAS[vista](tabla), desde, hasta, cursor, limite=bloque))
+            if df.empty:
+                return
+            yield df
+            if len(df) < bloque:
+                return
+            cursor = cursor_siguiente(df)
+            continue
+        q = client.table(tabla).select(_select(tabla, vista)).eq('user_id', user_id)
+        if desde: q = q.gte('fecha', str(desde))
+        if hasta: q = q.lte('fecha', str(hasta))
+        if cursor is not None:
+            fecha, id_fila = cursor
+            q = q.or_(f"fecha.gt.{fecha},and(fecha.eq.{fecha},id.gt.{id_fila})")
+        with fase("datos"):
+            resp = q.order('fecha').order('id').limit(bloque).execute()
+        df = a_dataframe(resp.data or [], VISTAS[vista](tabla))
+        if df.empty:
+            return
+        yield df
+        if len(df) < bloque:
+            return
+        cursor = cursor_siguiente(df)
+
+
+def cursor_siguiente(df):
+    # (fecha, id) de la última fila visible, para pedir la página siguiente
+    ultima = df.iloc[-1]
+    return ultima['fecha'].date().isoformat(), int(ultima['id'])
+
+
+def contar(client, user_id, tabla):
+    # Nº de filas sacado del libro trimestral, sin count(*) sobre la tabla
+    return int(sum(f[f'n_{tabla}'] for f in resumen_trimestral(client, user_id)))
+
+
+def resumen_fiscal(client, user_id, periodo='total', desde=None, hasta=None):
+    # Sumas calculadas en Postgres (función resumen_fiscal); una fila por periodo, en céntimos
+    e = _espejo(client, user_id)
+
+    def cargar():
+        if e:
+            return [{"periodo": r.get("periodo"), **{c: int(r[c] or 0) for c in TOTALES}}
+                    for r in e.resumen_fiscal(periodo, desde, hasta)]
+        with fase("datos"):
+            datos = client.rpc('resumen_fiscal', {
+                "p_user_id": user_id, "p_periodo": periodo,
+                "p_desde": str(desde) if desde else None,
+                "p_hasta": str(hasta) if hasta else None,
+            }).execute().data
+        return [{"periodo": r.get("periodo"), **{c: centimos(r[c]) for c in TOTALES}}
+                for r in (datos or [])]
+    return cache_usuario().obtener(user_id, RESUMEN, periodo, (desde, hasta), cargar)
+
+
+def resumen_trimestral(client, user_id):
+    # Libro de totales por trimestre que mantienen los triggers de la base de datos
+    # (con la réplica, las mismas sumas en SQL local)
+    e = _espejo(client, user_id)
+
+    def cargar():
+        if e:
+            return [{**r, **{c: int(r[c] or 0) for c in TOTALES}} for r in e.resumen_trimestral()]
+        with fase("datos"):
+            datos = client.table('resumen_trimestral').select('*').eq('user_id', user_id).execute().data
+        return [{**r, **{c: centimos(r[c]) for c in TOTALES}} for r in (datos or [])]
+    return cache_usuario().obtener(user_id, RESUMEN, "trimestral", None, cargar)
+
+
+def _tras_escribir(user_id, tabla, parche):
+    cache = cache_usuario()
+    cache.invalidar(user_id, tabla, conservar=FILAS)
+    cache.invalidar(user_id, RESUMEN)
+    cache.parchear(user_id, tabla, FILAS, parche)
+
+
+def insertar(client, user_id, tabla, fila):
+    return insertar_varios(client, user_id, tabla, [fila])
+
+
+def insertar_varios(client, user_id, tabla, filas):
+    # Un único INSERT para todas las filas (lo usa también la importación masiva).
+    # Antes se mira el límite del plan con los contadores cacheados (core/cuotas.py).
+    if not filas:
+        return []
+    cuotas.comprobar(client, user_id, filas)
+    try:
+        with fase("datos"):
+            resp = client.table(tabla).insert([{"user_id": user_id, **f} for f in filas]).execute()
+    except Exception as e:
+        if cuotas.es_limite(e):
+            cuotas.olvidar(user_id)  # p.ej. altas desde otro dispositivo: se vuelve a leer el uso
+        raise
+    nuevas = resp.data or []
+    cuotas.anotar(user_id, nuevas)
+    return _tras_insertar(client, user_id, tabla, nuevas)
+
+
+def _tras_insertar(client, user_id, tabla, nuevas):
+    e = _espejo(client, user_id)
+    if e:
+        e.guardar(tabla, nuevas)
+    _tras_escribir(user_id, tabla,
+                   lambda df: _tipar(pd.concat([df, a_dataframe(nuevas, df.columns)], ignore_index=True)))
+    return nuevas
+
+
+def borrar(client, user_id, tabla, id_fila):
+    return borrar_varios(client, user_id, tabla, [id_fila])
+
+
+def borrar_varios(client, user_id, tabla, ids):
+    # Un DELETE ... WHERE user_id = ? AND id IN (...) por lote. Devuelve las filas
+    # borradas completas para poder deshacer con restaurar().
+    ids = [int(i) for i in ids]
+    borradas = []
+    for i in range(0, len(ids), LOTE_BORRADO):
+        with fase("datos"):
+            resp = (client.table(tabla).delete()
+                    .eq('user_id', user_id).in_('id', ids[i:i + LOTE_BORRADO]).execute())
+        borradas += resp.data or []
+    if borradas:
+        cuotas.anotar(user_id, borradas, -1)
+        quitar = {int(f['id']) for f in borradas}
+        e = _espejo(client, user_id)
+        if e:
+            e.quitar(tabla, quitar)
+        _tras_escribir(user_id, tabla, lambda df: df[~df['id'].isin(quitar)])
+    return borradas
+
+
+def restaurar(client, user_id, tabla, filas):
+    # Deshace un borrado. Las filas vuelven con su id y created_at, que el
+    # cliente no puede poner: lo hace la RPC restaurar_borrados, y solo con
+    # las filas que este usuario ha borrado (sus lápidas en la tabla borrados).
+    if not filas:
+        return []
+    cuotas.comprobar(client, user_id, filas, altas=False)
+    try:
+        with fase("datos"):
+            resp = client.rpc('restaurar_borrados', {'p_tabla': tabla, 'p_filas': filas}).execute()
+    except Exception as e:
+        if cuotas.es_limite(e):
+            cuotas.olvidar(user_id)
+        raise
+    restauradas = resp.data or []
+    cuotas.anotar(user_id, restauradas, altas=False)
+    return _tras_insertar(client, user_id, tabla, restauradas)
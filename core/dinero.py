@@ -0,0 +1,78 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from core.arranque import perezoso
+
+np = perezoso("numpy")
+pd = perezoso("pandas")
+
+# --- IMPORTES EN CÉNTIMOS ---
+# La base de datos guarda los importes como numeric(12,2) (exactos, sumas
+# exactas en Postgres). En Python, desde core.datos hasta el motor fiscal,
+# van como enteros de céntimos (int64): sumar miles de facturas no arrastra
+# error y las columnas ocupan lo mismo que un float64, no como Decimal.
+# Los euros (float) solo aparecen al final: al pintar, al exportar y en el
+# JSON que se manda a PostgREST.
+#
+# Redondeo: al céntimo más cercano y, en el empate, lejos del cero (el
+# ROUND_HALF_UP de las facturas, y lo que hace round() de Postgres con
+# numeric). La cuota de IVA y la retención se calculan sobre la base ya
+# redondeada, y el total es base + cuota - retención, así siempre cuadra.
+
+IMPORTES = ('base', 'cuota_iva', 'retencion', 'total')
+_CENTIMO = Decimal('0.01')
+_HOLGURA = 1e-6  # céntimos: error de un float de hasta 10^9 € leído desde texto
+
+
+def centimos(valor):
+    # Euros (número, texto o Decimal) -> céntimos (int)
+    if valor is None or valor == '':
+        return 0
+    return int(Decimal(str(valor)).quantize(_CENTIMO, rounding=ROUND_HALF_UP) * 100)
+
+
+def centimos_serie(serie):
+    # Lo mismo por columnas: euros (float u objeto) -> int64, con el mismo redondeo
+    x = pd.to_numeric(serie).fillna(0).to_numpy(dtype='float64') * 100
+    c = np.floor(np.abs(x) + 0.5 + _HOLGURA) * np.sign(x)
+    return pd.Series(c.astype('int64'), index=serie.index, name=serie.name)
+
+
+def porcentaje(cantidad, pct):
+    # pct % de una cantidad en céntimos, redondeado al céntimo (pct entero: 21, 15, 20...)
+    producto = int(cantidad) * int(pct)
+    redondeado = (abs(producto) + 50) // 100
+    return redondeado if producto >= 0 else -redondeado
+
+
+def porcentajes(cantidades, pct):
+    # porcentaje() por columnas, solo con aritmética entera
+    producto = np.asarray(cantidades, dtype='int64') * np.asarray(pct, dtype='int64')
+    redondeado = (np.abs(producto) + 50) // 100
+    resultado = np.where(producto >= 0, redondeado, -redondeado)
+    return pd.Series(resultado, index=cantidades.index) if isinstance(cantidades, pd.Series) else resultado
+
+
+def desglose(base, iva_pct, irpf_pct):
+    # Base en céntimos -> {'cuota_iva', 'retencion', 'total'} en céntimos
+    cuota_iva, retencion = porcentaje(base, iva_pct), porcentaje(base, irpf_pct)
+    return {'cuota_iva': cuota_iva, 'retencion': retencion, 'total': base + cuota_iva - retencion}
+
+
+def euros(cantidad):
+    # Céntimos -> euros (float). c / 100 es el float más cercano al importe
+    # exacto y su repr tiene dos decimales, así que el JSON lleva el valor justo.
+    return cantidad / 100
+
+
+def a_euros(df, columnas=IMPORTES):
+    # Copia del DataFrame con esas columnas (las que tenga) en euros, para pintar o exportar
+    df = df.copy()
+    for c in columnas:
+        if c in df.columns:
+            df[c] = df[c] / 100
+    return df
+
+
+def formato(cantidad):
+    # 1234567 -> "12,345.67 €"
+    return f"{euros(cantidad):,.2f} €"
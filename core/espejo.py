@@ -0,0 +1,319 @@
+import datetime
+import os
+import sqlite3
+import threading
+import time
+
+import streamlit as st
+
+from core.arranque import perezoso
+from core.cache import cache_usuario
+from core.datos import BUSCAR_EN, COLUMNAS, RESUMEN
+from core.dinero import IMPORTES, centimos
+from core.fiscal import TOTALES
+from core.metricas import fase
+
+pd = perezoso("pandas")
+
+# --- RÉPLICA LOCAL (SQLite) DE INGRESOS / GASTOS ---
+# Con la réplica activada, cada usuario tiene en el servidor un SQLite con sus
+# ingresos y gastos. Se llena una vez y después solo se piden las filas
+# escritas o borradas desde la última marca (columna updated_at y tabla
+# borrados, ver la migración de sincronización). core.datos lee entonces de
+# aquí: la tabla paginada, las exportaciones y los agregados del Dashboard
+# se resuelven en SQL local y por la red solo viaja lo que ha cambiado.
+#
+#   [espejo]                               # en secrets.toml
+#   activo = true
+#   carpeta = "/var/lib/gestor/espejo"     # por defecto, ~/.cache/gestor/espejo
+#
+# La carpeta queda con permisos 0700: solo la lee el usuario del sistema que
+# ejecuta la app (las réplicas son los libros de los clientes).
+#
+# Lo que se escribe desde esta app se aplica en el momento; lo escrito desde
+# otro dispositivo llega en la siguiente sincronización (SINCRONIZAR_CADA).
+
+SINCRONIZAR_CADA = 30     # segundos entre peticiones de cambios por usuario
+MARGEN = 60               # segundos antes de la marca que se vuelven a pedir (transacciones largas)
+RETENCION_BORRADOS = 30   # días que el servidor guarda las lápidas (purgar_borrados)
+BLOQUE = 1000             # filas por petición (max-rows de PostgREST)
+ESPEJOS_ABIERTOS = 256    # ficheros SQLite abiertos a la vez en el proceso
+VERSION = 2               # súbela si cambian las columnas: las réplicas se rehacen (2: importes en céntimos)
+
+_TEXTO = ('cliente', 'proveedor', 'categoria')
+_ENTEROS = ('iva_pct', 'irpf_pct')
+
+# date_trunc() de Postgres en SQLite (las fechas se guardan como 'AAAA-MM-DD')
+_TRUNCAR = {
+    'total': "null",
+    'week': "date(fecha, 'weekday 0', '-6 days')",
+    'month': "strftime('%Y-%m-01', fecha)",
+    'quarter': "printf('%s-%02d-01', strftime('%Y', fecha), (cast(strftime('%m', fecha) as integer) - 1) / 3 * 3 + 1)",
+    'year': "strftime('%Y-01-01', fecha)",
+}
+
+
+def _ahora():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _instante(texto):
+    # Marca de tiempo de PostgREST -> texto UTC de ancho fijo (se compara como cadena)
+    t = datetime.datetime.fromisoformat(texto)
+    if t.tzinfo is None:
+        t = t.replace(tzinfo=datetime.timezone.utc)
+    return t.astimezone(datetime.timezone.utc).isoformat(timespec='microseconds')
+
+
+def _tipo_sql(columna):
+    if columna == 'id':
+        return 'integer primary key'
+    if columna in ('fecha', 'updated_at'):
+        return 'text not null'
+    if columna in _TEXTO:
+        return 'text'
+    return 'integer' if columna in _ENTEROS or columna in IMPORTES else 'real'
+
+
+class Espejo:
+    def __init__(self, ruta, user_id):
+        self.user_id = user_id
+        self._ultima = None  # time.monotonic() de la última sincronización de este proceso
+        self._lock = threading.RLock()
+        self._con = sqlite3.connect(ruta, check_same_thread=False, timeout=30)
+        self._con.execute("pragma journal_mode = wal")
+        # lower() de SQLite solo entiende ASCII: para buscar "Muñoz" como el ilike de Postgres
+        self._con.create_function("plegar", 1, lambda t: t.casefold() if t else t, deterministic=True)
+        self._preparar()
+
+    # --- Esquema y marcas ---
+    def _preparar(self):
+        with self._con:
+            self._con.execute("create table if not exists meta (clave text primary key, valor text)")
+            if self._meta('version') != str(VERSION):
+                for tabla in COLUMNAS:
+                    self._con.execute(f"drop table if exists {tabla}")
+                self._con.execute("delete from meta")
+            for tabla, columnas in COLUMNAS.items():
+                definicion = ', '.join(f"{c} {_tipo_sql(c)}" for c in (*columnas, 'updated_at'))
+                self._con.execute(f"create table if not exists {tabla} ({definicion})")
+                self._con.execute(f"create index if not exists {tabla}_fecha_id on {tabla} (fecha, id)")
+            self._poner_meta('version', str(VERSION))
+
+    def _meta(self, clave):
+        fila = self._con.execute("select valor from meta where clave = ?", (clave,)).fetchone()
+        return fila[0] if fila else None
+
+    def _poner_meta(self, clave, valor):
+        self._con.execute("insert or replace into meta (clave, valor) values (?, ?)", (clave, valor))
+
+    def _vaciar(self):
+        with self._con:
+            for tabla in COLUMNAS:
+                self._con.execute(f"delete from {tabla}")
+            self._con.execute("delete from meta where clave != 'version'")
+
+    # --- Sincronización ---
+    def sincronizar(self, client, forzar=False):
+        # Aplica lo escrito y borrado en el servidor desde la última marca.
+        # Devuelve el conjunto de tablas que han cambiado.
+        with self._lock:
+            if not forzar and self._ultima is not None and time.monotonic() - self._ultima < SINCRONIZAR_CADA:
+                return set()
+            ultima = self._meta('sincronizado')
+            if ultima and _ahora() - datetime.datetime.fromisoformat(ultima) > datetime.timedelta(days=RETENCION_BORRADOS):
+                self._vaciar()  # las lápidas de entonces ya no existen: se rehace entera
+
+            cambiadas = set()
+            for tabla, columnas in COLUMNAS.items():
+                for filas in self._cambios(client, tabla, ', '.join((*columnas, 'updated_at')), 'updated_at'):
+                    if self.guardar(tabla, filas, marca=filas[-1]['updated_at']):
+                        cambiadas.add(tabla)
+            for filas in self._cambios(client, 'borrados', 'id, tabla, fila_id, borrado_en', 'borrado_en'):
+                cambiadas |= self._aplicar_borrados(filas)
+
+            with self._con:
+                self._poner_meta('sincronizado', _ahora().isoformat())
+            self._ultima = time.monotonic()
+
+        cache = cache_usuario()
+        for tabla in cambiadas:
+            cache.invalidar(self.user_id, tabla)
+        if cambiadas:
+            cache.invalidar(self.user_id, RESUMEN)
+        return cambiadas
+
+    def _cambios(self, client, tabla, columnas, campo):
+        # Bloques de filas con campo >= marca - MARGEN, en orden (campo, id)
+        marca = self._meta(f"marca_{tabla}")
+        cursor = None
+        while True:
+            q = client.table(tabla).select(columnas).eq('user_id', self.user_id)
+            if marca:
+                desde = datetime.datetime.fromisoformat(marca) - datetime.timedelta(seconds=MARGEN)
+                q = q.gte(campo, desde.isoformat())
+            if cursor is not None:
+                valor, id_fila = cursor
+                q = q.or_(f"{campo}.gt.{valor},and({campo}.eq.{valor},id.gt.{id_fila})")
+            with fase("datos"):
+                resp = q.order(campo).order('id').limit(BLOQUE).execute()
+            filas = resp.data or []
+            if not filas:
+                return
+            yield filas
+            if len(filas) < BLOQUE:
+                return
+            cursor = filas[-1][campo], filas[-1]['id']
+
+    def guardar(self, tabla, filas, marca=None):
+        # Alta o actualización de filas (tal y como las devuelve PostgREST).
+        # Los importes se guardan en céntimos: las sumas en SQL son enteras.
+        # Una versión igual o más antigua que la guardada no la pisa.
+        # Devuelve cuántas filas han cambiado de verdad.
+        columnas = (*COLUMNAS[tabla], 'updated_at')
+        valor = lambda f, c: (_instante(f[c]) if c == 'updated_at' else
+                              centimos(f.get(c)) if c in IMPORTES else f.get(c))
+        valores = [tuple(valor(f, c) for c in columnas) for f in filas if f.get('updated_at')]
+        actualizar = ', '.join(f"{c} = excluded.{c}" for c in columnas if c != 'id')
+        with self._lock, self._con:
+            cur = self._con.executemany(
+                f"insert into {tabla} ({', '.join(columnas)}) values ({', '.join('?' * len(columnas))}) "
+                f"on conflict (id) do update set {actualizar} where excluded.updated_at > {tabla}.updated_at",
+                valores)
+            if marca:
+                self._poner_meta(f"marca_{tabla}", _instante(marca))
+        return cur.rowcount
+
+    def _aplicar_borrados(self, lapidas):
+        tablas = set()
+        with self._lock, self._con:
+            for l in lapidas:
+                if l['tabla'] not in COLUMNAS:
+                    continue
+                # Solo si la copia local no es posterior al borrado (fila restaurada)
+                cur = self._con.execute(f"delete from {l['tabla']} where id = ? and updated_at <= ?",
+                                        (l['fila_id'], _instante(l['borrado_en'])))
+                if cur.rowcount:
+                    tablas.add(l['tabla'])
+            self._poner_meta("marca_borrados", _instante(lapidas[-1]['borrado_en']))
+        return tablas
+
+    def quitar(self, tabla, ids):
+        with self._lock, self._con:
+            self._con.executemany(f"delete from {tabla} where id = ?", [(int(i),) for i in ids])
+
+    # --- Lecturas (mismas respuestas que las consultas a Supabase, importes en céntimos) ---
+    def _consultar(self, sql, params=()):
+        with self._lock, fase("datos"):
+            return pd.read_sql_query(sql, self._con, params=params)
+
+    def filas(self, tabla, columnas, desde=None, hasta=None, cursor=None, descendente=False, limite=None,
+              filtro=None):
+        # Filas en orden (fecha, id); 'cursor' = (fecha, id) de la última ya vista;
+        # 'filtro' = búsqueda de la tabla paginada (core.datos._filtrar)
+        condiciones, params = [], []
+        filtro = filtro or {}
+        if filtro.get('texto'):
+            condiciones.append('(' + ' or '.join(f"instr(plegar({c}), ?) > 0" for c in BUSCAR_EN[tabla]) + ')')
+            params += [filtro['texto'].casefold()] * len(BUSCAR_EN[tabla])
+        desde, hasta = desde or filtro.get('desde'), hasta or filtro.get('hasta')
+        for campo, operador in (('minimo', '>='), ('maximo', '<=')):
+            if filtro.get(campo) is not None:
+                condiciones.append(f"total {operador} ?")
+                params.append(int(filtro[campo]))
+        if desde:
+            condiciones.append("fecha >= ?")
+            params.append(str(desde))
+        if hasta:
+            condiciones.append("fecha <= ?")
+            params.append(str(hasta))
+        if cursor is not None:
+            condiciones.append(f"(fecha, id) {'<' if descendente else '>'} (?, ?)")
+            params += [cursor[0], int(cursor[1])]
+        orden = 'desc' if descendente else 'asc'
+        sql = (f"select {', '.join(columnas)} from {tabla}"
+               f"{' where ' + ' and '.join(condiciones) if condiciones else ''}"
+               f" order by fecha {orden}, id {orden}")
+        if limite is not None:
+            sql += " limit ?"
+            params.append(int(limite))
+        return self._consultar(sql, params)
+
+    def sugerencias(self, tabla, columna, limite):
+        # Lo mismo que la tabla contrapartes de la base de datos, contado aquí
+        df = self._consultar(f"select {columna} as nombre, count(*) as n from {tabla} "
+                             f"where trim(coalesce({columna}, '')) != '' group by 1 order by n desc, nombre limit ?",
+                             (int(limite),))
+        return df['nombre'].tolist()
+
+    def resumen_fiscal(self, periodo='total', desde=None, hasta=None):
+        # Igual que la función resumen_fiscal de Postgres, sobre la réplica
+        filtro = "where (? is null or fecha >= ?) and (? is null or fecha <= ?)"
+        d, h = (str(desde) if desde else None), (str(hasta) if hasta else None)
+        sumas = ', '.join(f"coalesce(sum({c}), 0) as {c}" for c in TOTALES)
+        df = self._consultar(f"""
+            with movimientos as (
+                select fecha, base as base_ingresos, cuota_iva as iva_rep, retencion as ret_sop,
+                       0 as base_gastos, 0 as iva_sop, 0 as ret_prac
+                from ingresos {filtro}
+                union all
+                select fecha, 0, 0, 0, base, cuota_iva, retencion
+                from gastos {filtro}
+            )
+            select {_TRUNCAR[periodo]} as periodo, {sumas}
+            from movimientos group by 1 order by 1
+        """, (d, d, h, h) * 2)
+        return df.to_dict('records')
+
+    def resumen_trimestral(self):
+        # Mismas columnas que el libro resumen_trimestral de la base de datos
+        df = self._consultar("""
+            select cast(strftime('%Y', fecha) as integer) as anio,
+                   (cast(strftime('%m', fecha) as integer) + 2) / 3 as trimestre,
+                   sum(n_ingresos) as n_ingresos, sum(base_ingresos) as base_ingresos,
+                   sum(iva_rep) as iva_rep, sum(ret_sop) as ret_sop,
+                   sum(n_gastos) as n_gastos, sum(base_gastos) as base_gastos,
+                   sum(iva_sop) as iva_sop, sum(ret_prac) as ret_prac
+            from (
+                select fecha, 1 as n_ingresos, base as base_ingresos, cuota_iva as iva_rep, retencion as ret_sop,
+                       0 as n_gastos, 0 as base_gastos, 0 as iva_sop, 0 as ret_prac
+                from ingresos
+                union all
+                select fecha, 0, 0, 0, 0, 1, base, cuota_iva, retencion
+                from gastos
+            )
+            group by 1, 2 order by 1, 2
+        """)
+        return [{'user_id': self.user_id, **f} for f in df.to_dict('records')]
+
+
+def activo():
+    try:
+        return bool(st.secrets["espejo"]["activo"])
+    except Exception:
+        return False
+
+
+def _carpeta():
+    try:
+        carpeta = st.secrets["espejo"]["carpeta"]
+    except Exception:
+        # Por usuario del sistema, no en el directorio temporal compartido
+        cache = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        carpeta = os.path.join(cache, "gestor", "espejo")
+    os.makedirs(carpeta, mode=0o700, exist_ok=True)
+    os.chmod(carpeta, 0o700)  # makedirs no toca una carpeta que ya existía
+    return carpeta
+
+
+@st.cache_resource(max_entries=ESPEJOS_ABIERTOS)
+def _abrir(user_id):
+    # Un objeto (y una conexión) por usuario y proceso, compartido entre sus sesiones
+    return Espejo(os.path.join(_carpeta(), f"{user_id}.sqlite3"), user_id)
+
+
+def espejo(client, user_id):
+    # Réplica del usuario, sincronizada si hace más de SINCRONIZAR_CADA segundos
+    e = _abrir(str(user_id))
+    e.sincronizar(client)
+    return e
@@ -0,0 +1,151 @@
+import streamlit as st
+
+from core.recursos import fuentes
+
+# --- ESTILOS COMPARTIDOS ---
+# Cada página inyecta solo los bloques que usa, en un único <style>.
+# Inter se sirve desde static/ (core/recursos.py): sin @import a Google
+# Fonts, que bloqueaba el pintado hasta resolver otros dos dominios.
+
+BASE = fuentes() + """
+    html, body, [class*="css"] { font-family: 'Inter', system-ui, -apple-system, 'Segoe UI', Roboto, sans-serif; }
+
+    /* FONDO DE LA APP (Un gris muy suave para que resalten las tarjetas blancas) */
+    .stApp { background-color: #F8FAFC; }
+"""
+
+TARJETAS = """
+    /* Tarjetas */
+    div[data-testid="stVerticalBlockBorderWrapper"] {
+        background-color: white;
+        padding: 25px;
+        border-radius: 16px;
+        border: 1px solid #E2E8F0;
+        box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.05);
+    }
+"""
+
+LOGIN = """
+    #MainMenu {visibility: hidden;}
+    header {visibility: hidden;}
+    footer {visibility: hidden;}
+    
+    .stApp { color: #1E293B; }
+    
+    .block-container {
+        padding-top: 2rem !important;
+        padding-bottom: 2rem !important;
+    }
+
+    /* HERO SECTION */
+    .hero-box {
+        background: linear-gradient(135deg, #2563EB 0%, #1D4ED8 100%);
+        padding: 40px 20px;
+        border-radius: 20px;
+        color: white;
+        text-align: center;
+        margin-bottom: 40px; 
+        box-shadow: 0 10px 30px rgba(37, 99, 235, 0.2);
+    }
+
+    /* BOTONES */
+    .stButton > button {
+        border-radius: 12px; font-weight: 600; border: none;
+        background-color: #EFF6FF; color: #2563EB; 
+        padding: 0.6rem 1rem; transition: all 0.2s;
+        box-shadow: 0 2px 5px rgba(0,0,0,0.05);
+    }
+    .stButton > button:hover { 
+        background-color: #2563EB; color: white; 
+        box-shadow: 0 5px 15px rgba(37, 99, 235, 0.4);
+    }
+
+    /* --- 📱 TRUCO DE MAGIA PARA MÓVIL (VERSIÓN FUERTE) --- */
+    @media only screen and (max-width: 768px) {
+        
+        /* 1. Obligamos al contenedor de columnas a ser flexible vertical */
+        [data-testid="stHorizontalBlock"] {
+            display: flex !important;
+            flex-direction: column !important;
+            gap: 20px !important;
+        }
+        
+        /* 2. SELECCIONAMOS LA COLUMNA 2 (LOGIN) Y LA MOVEMOS PRIMERO */
+        [data-testid="column"]:nth-of-type(2) {
+            order: -1 !important; /* El -1 la manda arriba del todo */
+            margin-bottom: 10px !important;
+            z-index: 99 !important;
+        }
+        
+        /* 3. Las otras columnas (1 y 3) se quedan debajo (orden 0 por defecto) */
+        [data-testid="column"]:nth-of-type(1),
+        [data-testid="column"]:nth-of-type(3) {
+            order: 1 !important;
+        }
+    }
+"""
+
+DASHBOARD = """
+    /* TARJETAS KPI (Las de arriba) */
+    div[data-testid="metric-container"] {
+        background-color: #FFFFFF;
+        border: 1px solid #E2E8F0;
+        padding: 20px;
+        border-radius: 16px;
+        box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.05);
+    }
+    
+    /* Colores bordes KPI */
+    div[data-testid="metric-container"]:nth-of-type(1) { border-left: 5px solid #10B981; } /* Ingresos */
+    div[data-testid="metric-container"]:nth-of-type(2) { border-left: 5px solid #EF4444; } /* Gastos */
+    div[data-testid="metric-container"]:nth-of-type(3) { border-left: 5px solid #3B82F6; } /* Beneficio */
+    
+    /* HUCHA DESTACADA */
+    div[data-testid="metric-container"]:nth-of-type(4) {
+        background: linear-gradient(135deg, #FFFBEB 0%, #FFFFFF 100%);
+        border: 2px solid #F59E0B;
+    }
+    div[data-testid="metric-container"]:nth-of-type(4) label { color: #D97706 !important; font-weight: 800; }
+    div[data-testid="metric-container"]:nth-of-type(4) div[data-testid="stMetricValue"] { color: #D97706 !important; }
+
+    /* TARJETAS FISCALES */
+    .fiscal-card {
+        background-color: white;
+        padding: 20px;
+        border-radius: 16px;
+        box-shadow: 0 2px 10px rgba(0,0,0,0.03);
+        text-align: center;
+        margin-bottom: 15px;
+        border: 1px solid #E2E8F0;
+    }
+    .fiscal-title { font-size: 0.8rem; font-weight: 700; color: #64748B; text-transform: uppercase; letter-spacing: 1px; margin-bottom: 8px; }
+    .fiscal-value { font-size: 1.8rem; font-weight: 800; color: #1E293B; }
+    .fiscal-note { font-size: 0.75rem; color: #94A3B8; margin-top: 5px; }
+"""
+
+PERFIL = """
+    /* Avatar Simulado */
+    .avatar-circle {
+        width: 100px; height: 100px;
+        background: linear-gradient(135deg, #3B82F6 0%, #2563EB 100%);
+        border-radius: 50%;
+        color: white;
+        display: flex; align-items: center; justify-content: center;
+        font-size: 40px; font-weight: bold;
+        margin: 0 auto 15px auto;
+        box-shadow: 0 10px 15px -3px rgba(37, 99, 235, 0.3);
+    }
+"""
+
+PLANES = """
+    .plan-header {
+        padding: 15px; border-radius: 12px 12px 0 0; color: white;
+        text-align: center; font-weight: 800; font-size: 1.1em;
+        margin: -16px -16px 15px -16px; text-transform: uppercase; letter-spacing: 1px;
+    }
+    .stButton > button { width: 100%; }
+"""
+
+
+def inyectar(*bloques):
+    st.markdown("<style>" + "".join(bloques) + "</style>", unsafe_allow_html=True)
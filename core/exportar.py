@@ -0,0 +1,142 @@
+import tempfile
+import zipfile
+from contextlib import ExitStack
+
+from core.arranque import perezoso
+from core.concurrente import a_la_vez
+from core.datos import COLUMNAS, a_dataframe, recorrer
+from core.dinero import a_euros
+from core.fiscal import MODELOS, TOTALES, acumular, modelos, totales_por_periodo
+
+pd = perezoso("pandas")
+
+# --- EXPORTACIÓN BAJO DEMANDA ---
+# Se llama desde st.download_button(data=lambda: ...), así que solo se genera
+# cuando alguien pulsa descargar. Las filas llegan de la base de datos por
+# bloques (core.datos.recorrer) y se van escribiendo en un fichero temporal,
+# por lo que nunca hay un DataFrame con todo el histórico en memoria.
+
+BLOQUE = 1000
+MAX_MEMORIA = 8 * 1024 * 1024  # a partir de aquí el temporal pasa a disco
+
+FORMATOS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+
+def _plano(df):
+    # Las categorías pueden cambiar de un bloque a otro: se escriben como texto
+    # (vacío si no hay, no 'nan'). Los importes salen en euros (de céntimos:
+    # x / 100, con dos decimales exactos)
+    df = a_euros(df)
+    for c in df.select_dtypes('category').columns:
+        df[c] = df[c].astype('string').fillna('')
+    df['fecha'] = df['fecha'].dt.date
+    return df
+
+
+def _escribir_csv(bloques, f):
+    for i, df in enumerate(bloques):
+        f.write(_plano(df).to_csv(index=False, header=i == 0).encode('utf-8'))
+
+
+def _escribir_parquet(bloques, f, vacio):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    escritor = None
+    for df in bloques:
+        tabla = pa.Table.from_pandas(_plano(df), preserve_index=False)
+        if escritor is None:
+            escritor = pq.ParquetWriter(f, tabla.schema)
+        escritor.write_table(tabla.cast(escritor.schema))  # un row group por bloque
+    if escritor is None:
+        escritor = pq.ParquetWriter(f, pa.Table.from_pandas(_plano(vacio), preserve_index=False).schema)
+    escritor.close()
+
+
+def _escribir_excel(bloques, f, vacio, hoja):
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    ws = libro.create_sheet(hoja)
+    ws.append(list(vacio.columns))
+    for df in bloques:
+        for fila in _plano(df).itertuples(index=False):
+            ws.append(list(fila))
+    libro.save(f)
+
+
+def _escribir(bloques, f, formato, vacio, hoja):
+    if formato == "CSV":
+        _escribir_csv(bloques, f)
+        if f.tell() == 0:
+            f.write(vacio.to_csv(index=False).encode('utf-8'))
+    elif formato == "Parquet":
+        _escribir_parquet(bloques, f, vacio)
+    else:
+        _escribir_excel(bloques, f, vacio, hoja)
+
+
+def _bloques(client, user_id, tabla, desde, hasta, acumulados=None):
+    # Recorre la tabla y, si se pide, va sumando los totales fiscales por trimestre
+    for df in recorrer(client, user_id, tabla, 'export', desde, hasta, BLOQUE):
+        if acumulados is not None:
+            acumulados.append(totales_por_periodo(df if tabla == 'ingresos' else None,
+                                                  df if tabla == 'gastos' else None))
+        yield df
+
+
+def _vacio(tabla):
+    return a_dataframe([], COLUMNAS[tabla])
+
+
+def exportar_tabla(client, user_id, tabla, formato, desde=None, hasta=None):
+    # Devuelve los bytes del fichero de una tabla en el formato pedido
+    with tempfile.SpooledTemporaryFile(max_size=MAX_MEMORIA) as f:
+        _escribir(_bloques(client, user_id, tabla, desde, hasta), f, formato, _vacio(tabla), tabla)
+        f.seek(0)
+        return f.read()
+
+
+def resumen_fiscal_csv(totales):
+    # Totales por trimestre -> CSV con los modelos por trimestre y por año
+    if totales.empty:
+        totales = pd.DataFrame(columns=['anio', 'trimestre', *TOTALES])
+    trimestral = modelos(totales)
+    anual = modelos(acumular(totales, ['anio']))
+    anual['trimestre'] = 'Año'
+    resumen = pd.concat([trimestral, anual], ignore_index=True).sort_values(['anio'], kind='stable')
+    return a_euros(resumen[['anio', 'trimestre', *MODELOS]], MODELOS).to_csv(index=False).encode('utf-8')
+
+
+def pack_gestoria(client, user_id, formato, desde=None, hasta=None):
+    # ZIP con ingresos, gastos y el resumen fiscal del periodo (calculado al vuelo).
+    # Las dos tablas se leen y escriben a la vez, cada una en su temporal.
+    extension = FORMATOS[formato][0]
+    acumulados = []
+    with ExitStack() as temporales:
+        def escribir(tabla):
+            f = temporales.enter_context(tempfile.SpooledTemporaryFile(max_size=MAX_MEMORIA))
+            _escribir(_bloques(client, user_id, tabla, desde, hasta, acumulados), f, formato, _vacio(tabla), tabla)
+            f.seek(0)
+            return f
+
+        ficheros, fallos = a_la_vez({t: (lambda t=t: escribir(t)) for t in ('ingresos', 'gastos')}, timeout=None)
+        if fallos:
+            raise next(iter(fallos.values()))  # un pack a medias no le sirve a la gestoría
+
+        with tempfile.SpooledTemporaryFile(max_size=MAX_MEMORIA) as z:
+            with zipfile.ZipFile(z, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+                for tabla in ('ingresos', 'gastos'):
+                    with zf.open(f"{tabla}.{extension}", 'w') as destino:
+                        while trozo := ficheros[tabla].read(1024 * 1024):
+                            destino.write(trozo)
+                totales = pd.concat(acumulados, ignore_index=True) if acumulados else pd.DataFrame()
+                if not totales.empty:
+                    totales = acumular(totales, ['anio', 'trimestre'])
+                zf.writestr("resumen_fiscal.csv", resumen_fiscal_csv(totales))
+            z.seek(0)
+            return z.read()
@@ -0,0 +1,151 @@
+import datetime
+
+from core.arranque import perezoso
+from core.dinero import porcentajes
+
+pd = perezoso("pandas")
+
+# --- MOTOR FISCAL (MODELOS 303 / 130 / 111) ---
+# Trabaja por columnas: primero se suman ingresos y gastos por periodo
+# (y por usuario si hay varios) en una sola pasada de groupby, y después
+# se calculan todos los modelos a la vez sobre esas sumas.
+#
+#   trimestral, anual = calcular(df_ingresos, df_gastos)          # un usuario
+#   trimestral, anual = calcular_lote(df_ingresos, df_gastos)     # muchos (columna user_id)
+#   modelos(pd.DataFrame(resumen_trimestral))                     # desde el libro de la BD
+#
+# Todos los importes, de entrada y de salida, son céntimos int64 (ver
+# core/dinero.py): las sumas son exactas y el único redondeo es el del
+# pago fraccionado del 130, al céntimo.
+
+TOTALES = ('base_ingresos', 'iva_rep', 'ret_sop', 'base_gastos', 'iva_sop', 'ret_prac')
+MODELOS = ('facturado', 'gastos', 'beneficio', 'mod_303', 'mod_130', 'mod_111', 'hucha')
+
+PCT_130 = 20  # % de pago fraccionado sobre el beneficio
+
+# Columna de origen -> total, según sea ingreso o gasto
+_COLUMNAS = {
+    'ingresos': {'base': 'base_ingresos', 'cuota_iva': 'iva_rep', 'retencion': 'ret_sop'},
+    'gastos': {'base': 'base_gastos', 'cuota_iva': 'iva_sop', 'retencion': 'ret_prac'},
+}
+
+
+def totales_vacios():
+    return {c: 0 for c in TOTALES}
+
+
+def _movimientos(df, tipo, por):
+    cols = list(por) + ['fecha', 'base', 'cuota_iva', 'retencion']
+    if df is None or df.empty:
+        return pd.DataFrame(columns=cols + ['tipo'])
+    m = df[cols].copy()
+    m['tipo'] = tipo
+    return m
+
+
+def totales_por_periodo(df_i, df_g, por=()):
+    # Una fila por (por..., anio, trimestre) con las seis sumas de TOTALES
+    por = list(por)
+    m = pd.concat([_movimientos(df_i, 'ingresos', por), _movimientos(df_g, 'gastos', por)],
+                  ignore_index=True)
+    claves = por + ['anio', 'trimestre']
+    if m.empty:
+        return pd.DataFrame(columns=claves + list(TOTALES))
+
+    fechas = pd.to_datetime(m['fecha'])
+    m['anio'] = fechas.dt.year
+    m['trimestre'] = fechas.dt.quarter
+    for c in ('base', 'cuota_iva', 'retencion'):
+        m[c] = pd.to_numeric(m[c]).fillna(0).astype('int64')
+
+    sumas = m.groupby(claves + ['tipo'], sort=True)[['base', 'cuota_iva', 'retencion']].sum()
+    sumas = sumas.unstack('tipo', fill_value=0)
+
+    out = pd.DataFrame(index=sumas.index)
+    for tipo, mapa in _COLUMNAS.items():
+        for origen, destino in mapa.items():
+            out[destino] = sumas[(origen, tipo)] if (origen, tipo) in sumas.columns else 0
+    return out.reset_index()
+
+
+def acumular(totales, por=()):
+    # Agrega filas de totales (p.ej. trimestres -> años, o todo el histórico)
+    por = list(por)
+    if not por:
+        return pd.DataFrame([totales[list(TOTALES)].sum()]) if len(totales) else pd.DataFrame([totales_vacios()])
+    return totales.groupby(por, as_index=False, sort=True)[list(TOTALES)].sum()
+
+
+def modelos(totales):
+    # Añade las columnas de MODELOS a un DataFrame con las columnas de TOTALES
+    t = totales.copy()
+    for c in TOTALES:
+        t[c] = pd.to_numeric(t[c]).fillna(0).astype('int64')
+    t['facturado'] = t['base_ingresos']
+    t['gastos'] = t['base_gastos']
+    t['beneficio'] = t['facturado'] - t['gastos']
+    t['mod_303'] = t['iva_rep'] - t['iva_sop']
+    t['mod_130'] = (porcentajes(t['beneficio'], PCT_130) - t['ret_sop']).clip(lower=0)
+    t['mod_111'] = t['ret_prac']
+    t['hucha'] = t['mod_303'] + t['mod_130'] + t['mod_111']
+    return t
+
+
+def filtrar_periodo(totales, anio=None, trimestre=None):
+    # Filas de un año / trimestre concretos (None = sin filtro)
+    if totales.empty or anio is None:
+        return totales
+    sel = totales['anio'] == anio
+    if trimestre is not None:
+        sel &= totales['trimestre'] == trimestre
+    return totales[sel]
+
+
+def opciones_periodo(totales):
+    # {"Todo el histórico": (None, None), "Año 2025": (2025, None), "2025 · 3T": (2025, 3), ...}
+    periodos = {"Todo el histórico": (None, None)}
+    if not totales.empty:
+        for anio in sorted(totales['anio'].unique(), reverse=True):
+            periodos[f"Año {anio}"] = (int(anio), None)
+            for trim in sorted(totales.loc[totales['anio'] == anio, 'trimestre'].unique(), reverse=True):
+                periodos[f"{anio} · {trim}T"] = (int(anio), int(trim))
+    return periodos
+
+
+def periodo_de_etiqueta(etiqueta):
+    # Inversa de opciones_periodo() sin necesitar los totales: "2025 · 3T" -> (2025, 3)
+    if etiqueta and etiqueta.startswith("Año "):
+        return int(etiqueta[4:]), None
+    if etiqueta and etiqueta.endswith("T") and " · " in etiqueta:
+        anio, trim = etiqueta[:-1].split(" · ")
+        return int(anio), int(trim)
+    return None, None
+
+
+def rango_periodo(anio=None, trimestre=None):
+    # (desde, hasta) de un año o trimestre; (None, None) = todo el histórico
+    if anio is None:
+        return None, None
+    if trimestre is None:
+        return datetime.date(anio, 1, 1), datetime.date(anio, 12, 31)
+    desde = datetime.date(anio, 3 * trimestre - 2, 1)
+    hasta = (pd.Timestamp(desde) + pd.offsets.QuarterEnd(0)).date()
+    return desde, hasta
+
+
+def calcular(df_i, df_g, por=()):
+    # Devuelve (trimestral, anual) con totales y modelos para cada periodo
+    trimestral = totales_por_periodo(df_i, df_g, por)
+    anual = acumular(trimestral, list(por) + ['anio'])
+    return modelos(trimestral), modelos(anual)
+
+
+def calcular_lote(df_i, df_g):
+    # Lo mismo para muchos usuarios a la vez (p.ej. todos los clientes de una gestoría)
+    return calcular(df_i, df_g, por=['user_id'])
+
+
+def calcular_modelos(t):
+    # Atajo para un único conjunto de totales (dict) -> dict con los modelos (céntimos)
+    fila = modelos(pd.DataFrame([{c: t[c] for c in TOTALES}])).iloc[0]
+    return {c: int(fila[c]) for c in MODELOS}
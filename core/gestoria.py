@@ -0,0 +1,76 @@
+from core.arranque import perezoso
+from core.cache import cache_usuario
+from core.concurrente import a_la_vez
+from core.dinero import centimos_serie
+from core.fiscal import MODELOS, TOTALES, modelos
+from core.metricas import fase
+
+pd = perezoso("pandas")
+
+# --- CARTERA DE CLIENTES DE UNA GESTORÍA ---
+# Posición fiscal (303 / 130 / 111) de todos los clientes vinculados en un
+# trimestre. Sale del libro resumen_trimestral (una fila por cliente y
+# trimestre), pedido por lotes de clientes en paralelo (core/concurrente.py)
+# y calculado de una vez con el motor fiscal vectorizado: con 500 clientes
+# son 5 peticiones, LOTES_A_LA_VEZ en vuelo, y un DataFrame de 500 filas.
+# El límite es propio y por debajo del de la sesión: una cartera grande no
+# acapara los hilos compartidos con las demás sesiones.
+# Se cachea por asesor y trimestre (core/cache.py) bajo la pseudo-tabla
+# CARTERA; "Actualizar" la vacía.
+
+CARTERA = "cartera"
+LOTE_CLIENTES = 100   # user_id por petición (van en la URL de PostgREST)
+LOTES_A_LA_VEZ = 2    # peticiones de la cartera en vuelo a la vez
+MAX_FILAS = 1000      # max-rows de PostgREST al listar los vínculos
+
+
+def clientes(client, gestor_id):
+    # DataFrame (cliente_id, alias) de los clientes vinculados al asesor
+    def cargar():
+        filas, desde = [], 0
+        while True:
+            with fase("datos"):
+                resp = (client.table('gestor_clientes').select('cliente_id, alias')
+                        .eq('gestor_id', gestor_id).order('cliente_id')
+                        .range(desde, desde + MAX_FILAS - 1).execute())
+            filas += resp.data or []
+            if len(resp.data or []) < MAX_FILAS:
+                break
+            desde += MAX_FILAS
+        df = pd.DataFrame(filas, columns=['cliente_id', 'alias'])
+        df['alias'] = df['alias'].fillna(df['cliente_id'].str[:8])
+        return df
+    return cache_usuario().obtener(gestor_id, CARTERA, "clientes", None, cargar)
+
+
+def _libro(client, ids, anio, trimestre):
+    with fase("datos"):
+        resp = (client.table('resumen_trimestral').select('user_id, ' + ', '.join(TOTALES))
+                .in_('user_id', ids).eq('anio', anio).eq('trimestre', trimestre).execute())
+    return resp.data or []
+
+
+def cartera(client, gestor_id, anio, trimestre):
+    # Una fila por cliente con TOTALES y MODELOS del trimestre en céntimos (ceros si no tiene movimientos)
+    def cargar():
+        vinculos = clientes(client, gestor_id)
+        ids = vinculos['cliente_id'].tolist()
+        lotes, fallos = a_la_vez({
+            i: (lambda lote=ids[i:i + LOTE_CLIENTES]: _libro(client, lote, anio, trimestre))
+            for i in range(0, len(ids), LOTE_CLIENTES)
+        }, simultaneas=LOTES_A_LA_VEZ)
+        if fallos:
+            # Una cartera a medias daría totales falsos: no se cachea, se reintenta
+            raise next(iter(fallos.values()))
+
+        with fase("calculo"):
+            libro = pd.DataFrame([f for parte in lotes.values() for f in parte], columns=['user_id', *TOTALES])
+            t = vinculos.merge(libro, left_on='cliente_id', right_on='user_id', how='left')
+            t[list(TOTALES)] = t[list(TOTALES)].apply(centimos_serie)
+            t = modelos(t)
+        return t[['cliente_id', 'alias', *MODELOS]]
+    return cache_usuario().obtener(gestor_id, CARTERA, "modelos", (anio, trimestre), cargar)
+
+
+def actualizar(gestor_id):
+    cache_usuario().invalidar(gestor_id, CARTERA)
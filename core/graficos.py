@@ -0,0 +1,76 @@
+from core.arranque import perezoso
+from core.cache import cache_usuario
+from core.datos import RESUMEN, resumen_fiscal
+from core.dinero import euros
+
+pd = perezoso("pandas")
+
+# --- GRÁFICO "EVOLUCIÓN" DEL DASHBOARD ---
+# La serie (ya remuestreada, sin huecos) y la figura de Plotly se guardan en la
+# caché por usuario bajo RESUMEN, que se vacía en cada alta o baja: es decir,
+# se construyen una vez por versión de los datos y los reruns que no tocan
+# datos las reutilizan. Las sumas vienen agregadas de Postgres, así que el
+# coste no crece con el número de facturas sino con el número de periodos.
+
+GRANULARIDADES = {"Semanal": "week", "Mensual": "month", "Trimestral": "quarter", "Anual": "year"}
+
+_FRECUENCIA = {'week': 'W-MON', 'month': 'MS', 'quarter': 'QS', 'year': 'YS'}
+_ETIQUETA = {
+    'week': lambda p: p.strftime('%Y-%m-%d'),
+    'month': lambda p: p.strftime('%Y-%m'),
+    'quarter': lambda p: f"{p.year}-{p.quarter}T",
+    'year': lambda p: str(p.year),
+}
+
+
+def serie(client, user_id, granularidad='month', desde=None, hasta=None):
+    # DataFrame (Periodo, Ingresos, Gastos) en euros con todos los periodos del rango, también los vacíos
+    def cargar():
+        filas = resumen_fiscal(client, user_id, granularidad, desde, hasta)
+        if not filas:
+            return pd.DataFrame(columns=['Periodo', 'Ingresos', 'Gastos'])
+        s = pd.DataFrame(filas)
+        s.index = pd.to_datetime(s['periodo'])
+        rango = pd.date_range(s.index.min(), s.index.max(), freq=_FRECUENCIA[granularidad])
+        s = euros(s[['base_ingresos', 'base_gastos']].reindex(rango, fill_value=0))
+        s.columns = ['Ingresos', 'Gastos']
+        s.insert(0, 'Periodo', s.index.map(_ETIQUETA[granularidad]))
+        return s.reset_index(drop=True)
+    return cache_usuario().obtener(user_id, RESUMEN, "serie", (granularidad, desde, hasta), cargar)
+
+
+def figura_evolucion(client, user_id, granularidad='month', desde=None, hasta=None):
+    # Figura lista para st.plotly_chart, o None si no hay datos
+    def cargar():
+        import plotly.express as px  # solo se importa si hay gráfico que pintar
+
+        s = serie(client, user_id, granularidad, desde, hasta)
+        if s.empty:
+            return None
+        chart_data = s.melt(id_vars='Periodo', value_vars=['Ingresos', 'Gastos'], var_name='Tipo', value_name='base')
+
+        # COLORES MÁS MODERNOS
+        fig = px.bar(chart_data, x='Periodo', y='base', color='Tipo', barmode='group',
+                     color_discrete_map={'Ingresos': '#10B981', 'Gastos': '#F43F5E'})
+
+        # ESTILIZADO PROFUNDO DEL GRÁFICO
+        fig.update_layout(
+            paper_bgcolor="rgba(0,0,0,0)",
+            plot_bgcolor="rgba(0,0,0,0)",
+            xaxis_title=None, # Quitar título eje X
+            yaxis_title=None, # Quitar título eje Y
+            showlegend=True,  # Mantener leyenda
+            legend=dict(
+                orientation="h", # Leyenda horizontal
+                yanchor="bottom", y=1.02,
+                xanchor="right", x=1,
+                title=None # Quitar título de leyenda
+            ),
+            margin=dict(l=0, r=0, t=20, b=0),
+            height=320
+        )
+        # Quitar líneas feas
+        fig.update_xaxes(showgrid=False, type='category')
+        fig.update_yaxes(showgrid=True, gridcolor='#F1F5F9', zeroline=False)
+        return fig
+    return cache_usuario().obtener(user_id, RESUMEN, "figura", (granularidad, desde, hasta), cargar)
@@ -0,0 +1,271 @@
+import csv
+import io
+import zipfile
+
+from core.arranque import perezoso
+from core.cuotas import CuotaAgotada, disponibles
+from core.datos import insertar_varios
+from core.dinero import centimos_serie, euros, porcentajes
+
+np = perezoso("numpy")
+pd = perezoso("pandas")
+
+# --- IMPORTACIÓN MASIVA DE INGRESOS / GASTOS ---
+# El archivo se lee por bloques (CSV con chunksize, Excel en modo read_only),
+# cada bloque se valida y se calcula de forma vectorizada y se inserta en
+# lotes. Las filas con errores no paran la importación: se devuelven con su
+# número de línea y el motivo. Si se acaba el cupo del plan, se guarda lo
+# que cabe y el resto del archivo no se lee.
+
+TAMANO_BLOQUE = 500
+
+IVAS = (0, 4, 10, 21)
+IRPFS = {'ingresos': (0, 7, 15), 'gastos': (0, 7, 15, 19)}
+CATEGORIAS = ["Servicios", "Suministros", "Alquiler", "Herramientas", "Gestoría", "Otros"]
+
+FORMATOS = ["Detectar automáticamente", "Plantilla Gestor PRO", "Extracto Revolut Business"]
+
+# Columnas del extracto CSV de Revolut Business
+_REVOLUT = ('Date completed (UTC)', 'Description', 'Amount')
+
+PLANTILLA = {
+    'ingresos': "fecha,cliente,base,iva_pct,irpf_pct\n2025-01-15,Cliente Ejemplo SL,1000,21,15\n",
+    'gastos': "fecha,proveedor,categoria,base,iva_pct,irpf_pct\n2025-01-20,Proveedor Ejemplo,Servicios,100,21,0\n",
+}
+
+
+class ArchivoNoValido(Exception):
+    # El archivo entero no se puede leer (no es un Excel, CSV sin separador...)
+    pass
+
+
+def leer_bloques(archivo, nombre, tamano=TAMANO_BLOQUE):
+    # Generador de (DataFrame de 'tamano' filas como texto, fracción leída 0..1)
+    if nombre.lower().endswith(('.xlsx', '.xlsm')):
+        try:
+            yield from _bloques_excel(archivo, tamano)
+        except (zipfile.BadZipFile, KeyError) as e:  # KeyError: zip sin las partes de un libro
+            raise ArchivoNoValido("El archivo no es un Excel válido (.xlsx). "
+                                  "Ábrelo y guárdalo de nuevo como libro de Excel o como CSV.") from e
+        return
+    archivo.seek(0, io.SEEK_END)
+    total = archivo.tell() or 1
+    archivo.seek(0)
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', errors='replace', newline='')
+    try:
+        # sep=None detecta ',' o ';' (los Excel en español suelen exportar con ';')
+        for bloque in pd.read_csv(texto, sep=None, engine='python', dtype=str,
+                                  chunksize=tamano, skip_blank_lines=True):
+            yield bloque, min(archivo.tell() / total, 1.0)
+    except pd.errors.EmptyDataError as e:
+        raise ArchivoNoValido("El archivo está vacío.") from e
+    except (csv.Error, pd.errors.ParserError) as e:
+        raise ArchivoNoValido("No se entiende el CSV: hace falta una fila de cabecera y columnas "
+                              "separadas por ',' o ';' (descarga la plantilla para ver un ejemplo).") from e
+    finally:
+        # También si el generador se abandona a medias (la vista previa solo
+        # lee el primer bloque): al recolectarlo, el TextIOWrapper cerraría
+        # el archivo subido y la importación ya no podría leerlo
+        texto.detach()
+
+
+def _bloques_excel(archivo, tamano):
+    from openpyxl import load_workbook
+
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    hoja = libro.active
+    total = hoja.max_row or 1
+    filas = hoja.iter_rows(values_only=True)
+    cabecera = [str(c).strip() if c is not None else '' for c in next(filas, [])]
+    # El índice de cada bloque es la posición de la fila (como en read_csv)
+    bloque, indices, leidas = [], [], 1
+    try:
+        for fila in filas:
+            leidas += 1
+            if all(v is None for v in fila):
+                continue
+            bloque.append(['' if v is None else str(v) for v in fila])
+            indices.append(leidas - 2)
+            if len(bloque) == tamano:
+                yield pd.DataFrame(bloque, columns=cabecera, index=indices), min(leidas / total, 1.0)
+                bloque, indices = [], []
+        if bloque:
+            yield pd.DataFrame(bloque, columns=cabecera, index=indices), 1.0
+    finally:
+        libro.close()
+
+
+def detectar_formato(df):
+    if all(c in df.columns for c in _REVOLUT):
+        return "Extracto Revolut Business"
+    return "Plantilla Gestor PRO"
+
+
+def _numero(serie):
+    # "1.234,56 €" / "1234.56" / "-12,5" -> float (NaN si no se entiende)
+    s = serie.fillna('').astype(str).str.replace(r'[€\s]', '', regex=True)
+    europeo = s.str.contains(r',\d{1,2}$')
+    s = s.where(~europeo, s.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    return pd.to_numeric(s, errors='coerce')
+
+
+def _porcentaje(df, columna, defecto):
+    # Celdas vacías (o sin columna) -> valor por defecto; lo que no se entiende
+    # queda NaN para que la validación lo rechace
+    if columna not in df.columns:
+        return pd.Series(defecto, index=df.index, dtype='float64')
+    vacia = df[columna].fillna('').astype(str).str.strip() == ''
+    return _numero(df[columna]).mask(vacia, defecto)
+
+
+def _fecha(serie):
+    # ISO (2025-01-31, extractos bancarios) primero; el resto como fecha española (31/01/2025)
+    iso = pd.to_datetime(serie, errors='coerce', format='ISO8601')
+    resto = pd.to_datetime(serie.where(iso.isna()), errors='coerce', dayfirst=True, format='mixed')
+    return iso.fillna(resto)
+
+
+def normalizar(df, tabla, formato, iva_defecto, irpf_defecto, categoria_defecto="Otros"):
+    # Bloque crudo -> (filas listas para insertar, errores [(índice, motivo)])
+    df = df.rename(columns=lambda c: str(c).strip())
+    if formato == "Detectar automáticamente":
+        formato = detectar_formato(df)
+
+    out = pd.DataFrame(index=df.index)
+    errores = pd.Series('', index=df.index)
+
+    # Columnas sin las que no se puede leer un extracto (la fecha puede ser la de inicio)
+    faltan = [c for c in _REVOLUT if c not in df.columns
+              and not (c == 'Date completed (UTC)' and 'Date started (UTC)' in df.columns)]
+    if formato == "Extracto Revolut Business" and faltan:
+        errores[:] = f"Faltan columnas del extracto de Revolut: {', '.join(map(repr, faltan))}"
+        out['fecha'], out['nombre'], out['base'] = pd.NaT, '', np.nan
+        iva = pd.Series(iva_defecto, index=df.index, dtype='float64')
+        irpf = pd.Series(irpf_defecto, index=df.index, dtype='float64')
+        categoria = pd.Series(categoria_defecto, index=df.index)
+    elif formato == "Extracto Revolut Business":
+        # Los importes del extracto son totales con IVA: positivos = cobros, negativos = pagos
+        fecha_col = df.get('Date completed (UTC)', pd.Series('', index=df.index))
+        if 'Date started (UTC)' in df.columns:
+            fecha_col = fecha_col.where(fecha_col.fillna('') != '', df['Date started (UTC)'])
+        out['fecha'] = _fecha(fecha_col)
+        importe = _numero(df['Amount'])
+        signo = 1 if tabla == 'ingresos' else -1
+        relevantes = (importe * signo) > 0
+        if 'State' in df.columns:
+            relevantes &= df['State'].fillna('').str.upper().isin(['COMPLETED', ''])
+        df, out, errores, importe = df[relevantes], out[relevantes], errores[relevantes], importe[relevantes]
+        contraparte = df['Description'].fillna('')
+        if tabla == 'ingresos' and 'Payer' in df.columns:
+            contraparte = df['Payer'].fillna('').where(df['Payer'].fillna('') != '', contraparte)
+        out['total_bruto'] = importe.abs()
+        out['nombre'] = contraparte
+        iva = pd.Series(iva_defecto, index=df.index, dtype='float64')
+        irpf = pd.Series(irpf_defecto, index=df.index, dtype='float64')
+        categoria = pd.Series(categoria_defecto, index=df.index)
+    else:
+        out['fecha'] = _fecha(df['fecha']) if 'fecha' in df.columns else pd.NaT
+        nombre_col = 'cliente' if tabla == 'ingresos' else 'proveedor'
+        out['nombre'] = df[nombre_col].fillna('') if nombre_col in df.columns else ''
+        iva = _porcentaje(df, 'iva_pct', iva_defecto)
+        irpf = _porcentaje(df, 'irpf_pct', irpf_defecto)
+        categoria = df['categoria'].fillna(categoria_defecto) if 'categoria' in df.columns else pd.Series(categoria_defecto, index=df.index)
+        if 'base' in df.columns:
+            out['base'] = _numero(df['base'])
+        elif 'total' in df.columns:
+            out['total_bruto'] = _numero(df['total'])
+        else:
+            errores[:] = "Falta la columna 'base' o 'total'"
+
+    # Base desde el total cuando solo hay total: total = base * (1 + iva - irpf)
+    if 'base' not in out.columns:
+        out['base'] = out.get('total_bruto', np.nan) / (1 + iva / 100 - irpf / 100)
+
+    # --- VALIDACIÓN (vectorizada, el primer motivo que falle se queda) ---
+    reglas = [
+        (out['fecha'].isna(), "Fecha no válida"),
+        # IVA/IRPF antes que el importe: con solo 'total', un porcentaje ilegible deja la base en NaN
+        (~iva.isin(IVAS), f"IVA no permitido (usa {', '.join(map(str, IVAS))})"),
+        (~irpf.isin(IRPFS[tabla]), f"IRPF no permitido (usa {', '.join(map(str, IRPFS[tabla]))})"),
+        (out['base'].isna(), "Importe no válido"),
+    ]
+    if tabla == 'gastos':
+        reglas.append((~categoria.isin(CATEGORIAS), "Categoría desconocida"))
+    for mascara, motivo in reglas:
+        errores = errores.where((errores != '') | ~mascara, motivo)
+
+    # Importes en céntimos con el mismo redondeo que el formulario (core/dinero.py)
+    ok = errores == ''
+    base = centimos_serie(out['base'][ok])
+    c_iva = porcentajes(base, iva[ok].astype(int))
+    ret = porcentajes(base, irpf[ok].astype(int))
+    filas = pd.DataFrame({
+        'fecha': out['fecha'][ok].dt.strftime('%Y-%m-%d'),
+        ('cliente' if tabla == 'ingresos' else 'proveedor'): out['nombre'][ok].astype(str).str.strip(),
+        'base': euros(base), 'iva_pct': iva[ok].astype(int), 'cuota_iva': euros(c_iva),
+        'irpf_pct': irpf[ok].astype(int), 'retencion': euros(ret), 'total': euros(base + c_iva - ret),
+    })
+    if tabla == 'gastos':
+        filas.insert(2, 'categoria', categoria[ok])
+    return filas, list(errores[~ok].items())
+
+
+def _sin_confirmar(error):
+    return f"Sin confirmar (error de conexión: {error}); comprueba si se ha guardado"
+
+
+def importar(client, user_id, tabla, archivo, nombre, formato, iva_defecto, irpf_defecto,
+             categoria_defecto="Otros", tamano=TAMANO_BLOQUE, progreso=None):
+    # Lee, valida e inserta por bloques. Devuelve (nº insertadas, errores [(línea, motivo)])
+    from postgrest.exceptions import APIError  # viene con supabase; solo se carga al importar
+
+    insertadas, errores = 0, []
+    bloques = leer_bloques(archivo, nombre, tamano)
+    for bloque, fraccion in bloques:
+        filas, errores_bloque = normalizar(bloque, tabla, formato, iva_defecto, irpf_defecto, categoria_defecto)
+        # +2: la cabecera es la línea 1 y el índice empieza en 0
+        errores += [(i + 2, motivo) for i, motivo in errores_bloque]
+
+        registros = filas.to_dict('records')
+        quedan = disponibles(client, user_id)  # contadores en caché: sin consulta por bloque
+        agotado = quedan is not None and quedan < len(registros)
+        if agotado:
+            errores += [(i + 2, "Límite del plan alcanzado") for i in filas.index[quedan:]]
+            filas, registros = filas.iloc[:quedan], registros[:quedan]
+        cortado = None
+        try:
+            insertadas += len(insertar_varios(client, user_id, tabla, registros))
+        except APIError:
+            # PostgREST ha rechazado el lote entero (nada guardado): fila a fila para saber cuáles fallan.
+            # Si se acaba el cupo o se corta la conexión a mitad, el resto del bloque ya no se envía.
+            for n, (i, registro) in enumerate(zip(filas.index, registros)):
+                try:
+                    insertadas += len(insertar_varios(client, user_id, tabla, [registro]))
+                except APIError as e:
+                    errores.append((i + 2, f"Error al guardar: {e}"))
+                except CuotaAgotada as e:
+                    errores += [(j + 2, str(e)) for j in filas.index[n:]]
+                    agotado = True
+                    break
+                except Exception as e:
+                    errores.append((i + 2, _sin_confirmar(e)))
+                    errores += [(j + 2, "No importada: error de conexión") for j in filas.index[n + 1:]]
+                    cortado = "Error de conexión: el resto del archivo no se ha importado"
+                    break
+        except CuotaAgotada as e:  # los contadores en caché estaban atrasados: no se ha enviado nada
+            errores += [(i + 2, str(e)) for i in filas.index]
+            agotado = True
+        except Exception as e:
+            # Timeout, conexión cortada...: el servidor puede haber guardado el lote
+            # igualmente, así que no se reintenta (se duplicaría) y se para aquí
+            errores += [(i + 2, _sin_confirmar(e)) for i in filas.index]
+            cortado = "Error de conexión: el resto del archivo no se ha importado"
+        if agotado:
+            cortado = "Límite del plan alcanzado: el resto del archivo no se ha importado"
+        if progreso:
+            progreso(fraccion, insertadas, len(errores))
+        if cortado:
+            if next(bloques, None) is not None:
+                errores.append((bloque.index[-1] + 3, cortado))
+            break
+    return insertadas, sorted(errores)
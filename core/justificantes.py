@@ -0,0 +1,300 @@
+import base64
+import concurrent.futures
+import io
+import logging
+import os
+import threading
+import time
+import uuid
+
+import streamlit as st
+
+from core.arranque import perezoso
+from core.cache import cache_usuario
+from core.metricas import fase
+
+Image = perezoso("PIL.Image")
+ImageOps = perezoso("PIL.ImageOps")
+
+_log = logging.getLogger(__name__)
+
+# --- JUSTIFICANTES DE LOS GASTOS (FOTO O PDF) ---
+# Cada gasto puede llevar un justificante. Las fotos se reducen y se
+# recomprimen aquí antes de subirlas (una foto de móvil de 4 MB se queda en
+# unos 300 KB); los PDF se guardan tal cual. La miniatura de la tabla la
+# hacen unos pocos hilos del proceso en segundo plano, así guardar un gasto
+# no espera por ella.
+#
+# La tabla de gastos solo pide los justificantes de la página visible: una
+# consulta y, con Supabase Storage, una sola petición de URLs firmadas. Las
+# miniaturas las descarga el navegador desde esas URLs, no pasan por aquí.
+# Las fotos que aún no tienen miniatura (p.ej. si falló el hilo) se encargan
+# al verlas. "miniatura" es null mientras está pendiente y '' si la foto no
+# se puede decodificar: esas ya no se vuelven a intentar. Si falla el
+# almacén o la red, se reintenta al verla pasados REINTENTO_MINIATURA segundos.
+#
+# Por defecto se guardan en el bucket "justificantes" de Supabase Storage.
+# Para desarrollo o pruebas, una carpeta local hace de almacén:
+#
+#   [justificantes]                          # en secrets.toml
+#   carpeta = "/var/lib/gestor/justificantes"
+
+JUSTIFICANTES = "justificantes"  # tabla y pseudo-tabla en la caché por usuario
+BUCKET = "justificantes"
+MAX_MB = 10                # tamaño máximo del archivo subido
+MAX_LADO = 2000            # px del lado mayor de la foto guardada (legible impresa en A4)
+CALIDAD = 82               # JPEG de la foto guardada
+LADO_MINIATURA = 160       # px de la miniatura de la tabla
+HILOS_MINIATURAS = 2       # hilos del proceso que generan miniaturas
+REINTENTO_MINIATURA = 600  # segundos antes de volver a encargar una miniatura que falló
+CADUCIDAD_URL = 3600       # segundos que valen las URLs firmadas (más que CACHE_TTL)
+
+TIPOS = {
+    'jpg': 'image/jpeg', 'jpeg': 'image/jpeg', 'png': 'image/png', 'webp': 'image/webp',
+    'pdf': 'application/pdf',
+}
+EXTENSIONES = list(TIPOS)
+
+# Icono de la columna para los PDF (no se renderizan)
+ICONO_PDF = "data:image/svg+xml;base64," + base64.b64encode(
+    b'<svg xmlns="http://www.w3.org/2000/svg" width="32" height="32"><rect width="32" height="32" rx="4" '
+    b'fill="#e74c3c"/><text x="16" y="21" font-family="sans-serif" font-size="10" font-weight="bold" '
+    b'fill="#fff" text-anchor="middle">PDF</text></svg>').decode()
+
+
+# --- ALMACENES ---
+class AlmacenSupabase:
+    def __init__(self, client):
+        self._bucket = client.storage.from_(BUCKET)
+
+    def subir(self, ruta, datos, tipo):
+        self._bucket.upload(ruta, datos, {"content-type": tipo, "upsert": "true"})
+
+    def leer(self, ruta):
+        return self._bucket.download(ruta)
+
+    def urls(self, rutas):
+        # {ruta: URL firmada}, todas en una petición
+        if not rutas:
+            return {}
+        return {u['path']: u['signedURL'] for u in self._bucket.create_signed_urls(rutas, CADUCIDAD_URL)
+                if not u.get('error')}
+
+    def borrar(self, rutas):
+        if rutas:
+            self._bucket.remove(rutas)
+
+
+class AlmacenLocal:
+    # Las mismas operaciones sobre una carpeta; las URLs son data: URLs
+    def __init__(self, carpeta):
+        self.carpeta = carpeta
+
+    def _fichero(self, ruta):
+        return os.path.join(self.carpeta, *ruta.split('/'))
+
+    def subir(self, ruta, datos, tipo):
+        fichero = self._fichero(ruta)
+        os.makedirs(os.path.dirname(fichero), exist_ok=True)
+        with open(fichero + '.tmp', 'wb') as f:
+            f.write(datos)
+        os.replace(fichero + '.tmp', fichero)
+
+    def leer(self, ruta):
+        with open(self._fichero(ruta), 'rb') as f:
+            return f.read()
+
+    def urls(self, rutas):
+        urls = {}
+        for ruta in rutas:
+            if os.path.exists(self._fichero(ruta)):
+                tipo = TIPOS[ruta.rsplit('.', 1)[-1]]
+                urls[ruta] = f"data:{tipo};base64," + base64.b64encode(self.leer(ruta)).decode()
+        return urls
+
+    def borrar(self, rutas):
+        for ruta in rutas:
+            if os.path.exists(self._fichero(ruta)):
+                os.remove(self._fichero(ruta))
+
+
+def almacen(client):
+    try:
+        carpeta = st.secrets["justificantes"]["carpeta"]
+    except Exception:
+        carpeta = None
+    return AlmacenLocal(carpeta) if carpeta else AlmacenSupabase(client)
+
+
+# --- IMÁGENES ---
+def _abrir(datos, lado):
+    img = Image.open(io.BytesIO(datos))
+    img.draft('RGB', (lado, lado))  # JPEG: se decodifica ya reducido (1/2, 1/4 o 1/8)
+    img = ImageOps.exif_transpose(img)  # fotos de móvil giradas
+    img.thumbnail((lado, lado))
+    return img
+
+
+def _jpeg(img, calidad):
+    if img.mode in ('RGBA', 'LA', 'P'):  # capturas con transparencia: sobre fondo blanco
+        img = img.convert('RGBA')
+        fondo = Image.new('RGB', img.size, 'white')
+        fondo.paste(img, mask=img.getchannel('A'))
+        img = fondo
+    elif img.mode != 'RGB':
+        img = img.convert('RGB')
+    salida = io.BytesIO()
+    img.save(salida, 'JPEG', quality=calidad, optimize=True, progressive=True)
+    return salida.getvalue()
+
+
+def comprimir(datos, tipo):
+    # Foto -> JPEG de como mucho MAX_LADO px (o la original si ya pesa menos); PDF tal cual.
+    # Devuelve (datos, tipo, extensión)
+    if tipo == 'application/pdf':
+        if not datos.startswith(b'%PDF'):
+            raise ValueError("El archivo no es un PDF válido")
+        return datos, tipo, 'pdf'
+    try:
+        img = _abrir(datos, MAX_LADO)
+        reducida = _jpeg(img, CALIDAD)
+    except Exception:
+        raise ValueError("El archivo no es una imagen válida")
+    if tipo == 'image/jpeg' and len(datos) <= len(reducida) and max(img.size) < MAX_LADO:
+        return datos, tipo, 'jpg'
+    return reducida, 'image/jpeg', 'jpg'
+
+
+def miniatura(datos):
+    return _jpeg(_abrir(datos, LADO_MINIATURA), 70)
+
+
+# --- MINIATURAS EN SEGUNDO PLANO ---
+_encargadas = set()
+_fallidas = {}  # ruta -> instante del último fallo del almacén o de la red
+_encargadas_lock = threading.Lock()
+
+
+@st.cache_resource
+def _taller():
+    # Un único grupo de hilos por proceso, compartido por todas las sesiones
+    return concurrent.futures.ThreadPoolExecutor(HILOS_MINIATURAS, thread_name_prefix="miniaturas")
+
+
+def _hacer_miniatura(client, alm, cache, user_id, gasto_id, ruta, datos):
+    try:
+        original = datos if datos is not None else alm.leer(ruta)
+        try:
+            contenido = miniatura(original)
+        except Exception:
+            _log.warning("Justificante %s: la imagen no se puede decodificar, se queda sin miniatura",
+                         ruta, exc_info=True)
+            mini = ''
+        else:
+            mini = ruta.rsplit('.', 1)[0] + '_mini.jpg'
+            alm.subir(mini, contenido, 'image/jpeg')
+        # Solo si el justificante sigue siendo el mismo (se puede haber cambiado mientras)
+        (client.table(JUSTIFICANTES).update({'miniatura': mini})
+         .eq('gasto_id', gasto_id).eq('ruta', ruta).execute())
+        cache.invalidar(user_id, JUSTIFICANTES)
+    except Exception:
+        _log.exception("Justificante %s: no se ha podido guardar la miniatura", ruta)
+        with _encargadas_lock:
+            _fallidas[ruta] = time.monotonic()
+    else:
+        with _encargadas_lock:
+            _fallidas.pop(ruta, None)
+    finally:
+        with _encargadas_lock:
+            _encargadas.discard(ruta)
+
+
+def _encargar(client, user_id, gasto_id, ruta, datos=None):
+    # Encola la miniatura de una foto (una sola vez aunque varias sesiones la pidan)
+    with _encargadas_lock:
+        if ruta in _encargadas or time.monotonic() - _fallidas.get(ruta, -REINTENTO_MINIATURA) < REINTENTO_MINIATURA:
+            return None
+        _encargadas.add(ruta)
+    return _taller().submit(_hacer_miniatura, client, almacen(client), cache_usuario(),
+                            user_id, gasto_id, ruta, datos)
+
+
+# --- ALTA Y CONSULTA ---
+def adjuntar(client, user_id, gasto_id, nombre, datos):
+    # Sube (o sustituye) el justificante de un gasto. Devuelve el Future de la miniatura (o None)
+    tipo = TIPOS.get(nombre.rsplit('.', 1)[-1].lower())
+    if tipo is None:
+        raise ValueError("Solo se admiten fotos (JPG, PNG, WebP) o PDF")
+    if len(datos) > MAX_MB * 1024 * 1024:
+        raise ValueError(f"El justificante pasa de {MAX_MB} MB")
+    with fase("calculo"):
+        datos, tipo, extension = comprimir(datos, tipo)
+
+    alm = almacen(client)
+    ruta = f"{user_id}/{gasto_id}/{uuid.uuid4().hex}.{extension}"
+    with fase("datos"):
+        # El gasto tiene que ser del usuario antes de subir nada a su carpeta
+        if not (client.table('gastos').select('id').eq('id', gasto_id).eq('user_id', user_id)
+                .execute().data):
+            raise ValueError("El gasto no existe")
+        anterior = (client.table(JUSTIFICANTES).select('ruta, miniatura')
+                    .eq('gasto_id', gasto_id).eq('user_id', user_id).execute().data or [])
+        alm.subir(ruta, datos, tipo)
+        client.table(JUSTIFICANTES).upsert({
+            'gasto_id': gasto_id, 'user_id': user_id, 'ruta': ruta, 'miniatura': None,
+            'tipo': tipo, 'nombre': nombre, 'bytes': len(datos),
+        }, on_conflict='gasto_id').execute()
+    cache_usuario().invalidar(user_id, JUSTIFICANTES)
+
+    for f in anterior:  # el archivo sustituido ya no lo referencia nadie
+        try:
+            alm.borrar([r for r in (f['ruta'], f['miniatura']) if r])
+        except Exception:
+            pass
+    return _encargar(client, user_id, gasto_id, ruta, datos) if tipo != 'application/pdf' else None
+
+
+def de_pagina(client, user_id, ids):
+    # {gasto_id: {ruta, miniatura, tipo, nombre, url}} de los gastos visibles (url = la de la miniatura)
+    ids = tuple(sorted(int(i) for i in ids))
+
+    def cargar():
+        if not ids:
+            return {}
+        with fase("datos"):
+            filas = (client.table(JUSTIFICANTES).select('gasto_id, ruta, miniatura, tipo, nombre')
+                     .eq('user_id', user_id).in_('gasto_id', list(ids)).execute().data or [])
+            urls = almacen(client).urls([f['miniatura'] for f in filas if f['miniatura']])
+        return {int(f['gasto_id']): {**f, 'url': urls.get(f['miniatura'])} for f in filas}
+    return cache_usuario().obtener(user_id, JUSTIFICANTES, "pagina", ids, cargar)
+
+
+def columna(client, user_id, filas):
+    # Añade la columna de miniaturas a las filas visibles de la tabla de gastos
+    try:
+        justificantes = de_pagina(client, user_id, filas['id'])
+    except Exception:  # sin miniaturas, pero la tabla se sigue viendo
+        return filas, None
+    celdas = []
+    for gasto_id in filas['id']:
+        j = justificantes.get(int(gasto_id))
+        if j and j['tipo'] == 'application/pdf':
+            celdas.append(ICONO_PDF)
+        elif j and j['miniatura'] is None:
+            _encargar(client, user_id, int(gasto_id), j['ruta'])
+            celdas.append(None)
+        else:
+            celdas.append(j and j['url'])
+    vista = filas.copy()
+    vista.insert(0, 'justificante', celdas)
+    return vista, {'justificante': st.column_config.ImageColumn("📎", width="small")}
+
+
+def url(client, ruta):
+    # URL para ver el archivo completo (firmada o data: URL)
+    return almacen(client).urls([ruta]).get(ruta)
+
+
+def leer(client, ruta):
+    with fase("datos"):
+        return almacen(client).leer(ruta)
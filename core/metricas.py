@@ -0,0 +1,243 @@
+import contextvars
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+import streamlit as st
+
+# --- MÉTRICAS DE RENDIMIENTO POR PÁGINA / USUARIO / FASE ---
+# Cada página marca sus fases con
+#
+#   with fase("datos"):   ...   # lecturas de Supabase (core.datos ya lo hace solo)
+#   with fase("calculo"): ...   # pandas / motor fiscal
+#   with fase("render"):  ...   # st.* que pintan tablas, gráficos, tarjetas
+#
+# y aquí se guarda el tiempo PROPIO de cada fase (si una fase "datos" ocurre
+# dentro de "calculo", se resta de "calculo"). Por cada (página, usuario,
+# fase) hay un histograma acumulado, para Prometheus, y una ventana con las
+# últimas muestras para ver percentiles recientes en la página de admin.
+
+FASES = ("datos", "calculo", "render")
+CUBOS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+VENTANA = 200            # muestras recientes por serie
+VENTANA_SEGUNDOS = 3600  # y como mucho de la última hora
+MAX_SERIES = 2000        # (página, usuario, fase) distintas antes de expulsar la más antigua
+INTERVALO_VOLCADO = 15   # segundos entre escrituras del fichero para Prometheus
+
+_contexto = contextvars.ContextVar('metricas_contexto', default=None)
+_PERFIL = "_perfil_pagina"  # clave de session_state con el cProfile de perfilar_pagina()
+
+
+class _Serie:
+    def __init__(self):
+        self.cubos = [0] * (len(CUBOS_MS) + 1)  # el último es +Inf
+        self.suma_ms = 0.0
+        self.n = 0
+        self.recientes = deque(maxlen=VENTANA)   # (instante, ms)
+
+    def anotar(self, ms, ahora):
+        i = next((i for i, limite in enumerate(CUBOS_MS) if ms <= limite), len(CUBOS_MS))
+        self.cubos[i] += 1
+        self.suma_ms += ms
+        self.n += 1
+        self.recientes.append((ahora, ms))
+
+    def ventana(self, ahora):
+        return [ms for t, ms in self.recientes if ahora - t <= VENTANA_SEGUNDOS]
+
+
+class Metricas:
+    def __init__(self, max_series=MAX_SERIES, fichero=None):
+        self.max_series = max_series
+        self.fichero = fichero  # textfile collector de node_exporter (opcional)
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+        self._ultimo_volcado = 0.0
+        self._extras = []  # funciones que añaden sus propias líneas al volcado (p.ej. core/conexiones.py)
+
+    def anotar(self, pagina, usuario, nombre, ms):
+        clave = (pagina, usuario, nombre)
+        ahora = time.time()
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = _Serie()
+                while len(self._series) > self.max_series:
+                    self._series.popitem(last=False)
+            self._series.move_to_end(clave)
+            serie.anotar(ms, ahora)
+            volcar = self.fichero and ahora - self._ultimo_volcado >= INTERVALO_VOLCADO
+            if volcar:
+                self._ultimo_volcado = ahora
+        if volcar:
+            self.volcar(self.fichero)
+
+    def volcar(self, ruta):
+        # Escritura atómica: Prometheus nunca lee un fichero a medias
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus())
+        os.replace(temporal, ruta)
+
+    def resumen(self, usuario=None):
+        # Filas (página, usuario, fase, n, p50, p95, máx) de la ventana reciente
+        ahora = time.time()
+        with self._lock:
+            series = [(c, s.ventana(ahora)) for c, s in self._series.items()
+                      if usuario is None or c[1] == usuario]
+        filas = []
+        for (pagina, usr, nombre), muestras in series:
+            if not muestras:
+                continue
+            muestras.sort()
+            filas.append({
+                'pagina': pagina, 'usuario': usr, 'fase': nombre, 'n': len(muestras),
+                'p50_ms': round(_percentil(muestras, 0.50), 1),
+                'p95_ms': round(_percentil(muestras, 0.95), 1),
+                'max_ms': round(muestras[-1], 1),
+            })
+        return sorted(filas, key=lambda f: (f['pagina'], f['fase'], -f['p95_ms']))
+
+    def histograma(self, pagina, nombre, usuario=None):
+        # {límite: nº de muestras} de la ventana, sumando usuarios si no se filtra
+        ahora = time.time()
+        conteo = OrderedDict((f"≤{c}", 0) for c in CUBOS_MS)
+        conteo[f">{CUBOS_MS[-1]}"] = 0
+        etiquetas = list(conteo)
+        with self._lock:
+            muestras = [ms for (p, u, f), s in self._series.items()
+                        if p == pagina and f == nombre and usuario in (None, u)
+                        for ms in s.ventana(ahora)]
+        for ms in muestras:
+            i = next((i for i, limite in enumerate(CUBOS_MS) if ms <= limite), len(CUBOS_MS))
+            conteo[etiquetas[i]] += 1
+        return conteo
+
+    def json(self):
+        with self._lock:
+            return [{
+                'pagina': p, 'usuario': u, 'fase': f, 'n': s.n, 'suma_ms': round(s.suma_ms, 1),
+                'cubos_ms': dict(zip([*map(str, CUBOS_MS), '+Inf'], s.cubos)),
+                'recientes_ms': [round(ms, 1) for _, ms in s.recientes],
+            } for (p, u, f), s in self._series.items()]
+
+    def prometheus(self):
+        # Formato de texto de Prometheus (histograma acumulado en segundos)
+        lineas = [
+            "# HELP gestor_fase_segundos Tiempo propio de cada fase de una página por rerun.",
+            "# TYPE gestor_fase_segundos histogram",
+        ]
+        with self._lock:
+            series = [(c, list(s.cubos), s.suma_ms, s.n) for c, s in self._series.items()]
+        for (pagina, usuario, nombre), cubos, suma_ms, n in series:
+            etiquetas = f'pagina="{_escapar(pagina)}",usuario="{_escapar(usuario)}",fase="{_escapar(nombre)}"'
+            acumulado = 0
+            for limite, cuenta in zip([*(c / 1000 for c in CUBOS_MS), '+Inf'], cubos):
+                acumulado += cuenta
+                lineas.append(f'gestor_fase_segundos_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+            lineas.append(f'gestor_fase_segundos_sum{{{etiquetas}}} {suma_ms / 1000:.6f}')
+            lineas.append(f'gestor_fase_segundos_count{{{etiquetas}}} {n}')
+        return "\n".join(lineas) + "\n" + "".join(extra() for extra in self._extras)
+
+    def anadir(self, extra):
+        self._extras.append(extra)
+
+    def vaciar(self):
+        with self._lock:
+            self._series.clear()
+
+
+def _percentil(ordenadas, q):
+    return ordenadas[min(int(q * len(ordenadas)), len(ordenadas) - 1)]
+
+
+def _escapar(texto):
+    return str(texto).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+@st.cache_resource
+def metricas():
+    # Una única instancia por proceso, compartida por todas las sesiones.
+    # Con [metricas] fichero_prometheus = "/ruta/gestor.prom" en secrets.toml
+    # se vuelca también a disco para el textfile collector de node_exporter.
+    try:
+        fichero = st.secrets["metricas"]["fichero_prometheus"]
+    except Exception:
+        fichero = None
+    return Metricas(fichero=fichero)
+
+
+def empezar_pagina(pagina, usuario):
+    # Lo llama iniciar_pagina(): a partir de aquí las fases se anotan a esta página
+    _contexto.set({'pagina': pagina, 'usuario': usuario or "anónimo", 'pila': []})
+    # Y si es la sesión de perfilar_pagina(), el perfil empieza en este hilo
+    perfil = st.session_state.pop(_PERFIL, None)
+    if perfil is not None:
+        perfil.enable()
+
+
+def en_hilo(funcion):
+    # Envuelve una función que se ejecutará en otro hilo para que sus fases se
+    # anoten a la misma página y usuario (con su propia pila de fases)
+    ctx = _contexto.get()
+
+    def envuelta():
+        # El hilo es de un pool: al acabar se deja como estaba para la siguiente tarea
+        token = _contexto.set({**ctx, 'pila': []} if ctx else None)
+        try:
+            return funcion()
+        finally:
+            _contexto.reset(token)
+    return envuelta
+
+
+@contextmanager
+def fase(nombre):
+    ctx = _contexto.get()
+    if ctx is None:  # fuera de una página (scripts, bench...): no se mide
+        yield
+        return
+    marco = {'hijos': 0.0}
+    ctx['pila'].append(marco)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracion = time.perf_counter() - t0
+        ctx['pila'].pop()
+        if ctx['pila']:
+            ctx['pila'][-1]['hijos'] += duracion
+        metricas().anotar(ctx['pagina'], ctx['usuario'], nombre, (duracion - marco['hijos']) * 1000)
+
+
+def perfilar_pagina(ruta, client, user, lineas=40):
+    # Ejecuta una vez la página con AppTest bajo cProfile, con la sesión de
+    # quien lo pide. Devuelve (informe de texto, fichero .prof) o lanza la
+    # excepción de la página si falla.
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(ruta, default_timeout=120)
+    at.session_state['supabase'] = client
+    at.session_state['user'] = user
+
+    # AppTest ejecuta el script en un hilo suyo. El perfil viaja en la sesión
+    # de esta ejecución y lo activa empezar_pagina() dentro de ese hilo: no
+    # se cuela ninguna otra sesión del proceso (cProfile solo mide el hilo
+    # que lo activa). Lo anterior a iniciar_pagina() (imports) no se mide.
+    perfil = cProfile.Profile()
+    at.session_state[_PERFIL] = perfil
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    if _PERFIL in at.session_state:
+        raise RuntimeError("La página no llama a iniciar_pagina(): no se ha podido perfilar")
+
+    texto = io.StringIO()
+    pstats.Stats(perfil, stream=texto).strip_dirs().sort_stats('cumulative').print_stats(lineas)
+    return texto.getvalue(), marshal.dumps(perfil.stats)
@@ -0,0 +1,60 @@
+import functools
+import json
+import os
+
+# --- IMÁGENES Y FUENTES DE static/ ---
+# Las genera scripts/recursos.py (AVIF/WebP/JPEG a varios anchos y el
+# subconjunto de Inter) y Streamlit las sirve tal cual desde app/static/
+# ([server] enableStaticServing en .streamlit/config.toml). Las rutas llevan
+# el hash del contenido, así que el navegador (o el proxy de delante) puede
+# guardarlas sin volver a preguntar.
+#
+# Se pintan con HTML (<picture>) en lugar de st.image: el navegador elige el
+# formato y el ancho que le sirven, reserva el hueco antes de descargarla y
+# el script no tiene que leer ni recodificar la imagen en cada sesión.
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MANIFIESTO = os.path.join(RAIZ, "static", "recursos.json")
+URL = "app/static/"  # relativa: funciona también con server.baseUrlPath
+
+
+@functools.cache
+def _manifiesto():
+    try:
+        with open(MANIFIESTO, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"img": {}, "fuentes": {}}
+
+
+def icono(nombre, ancho, respaldo):
+    # URL para page_icon (Streamlit la usa tal cual si empieza por /app/static/)
+    variantes = _manifiesto()["img"].get(nombre, {}).get("variantes", {}).get("jpg", {})
+    return "/" + URL + variantes[str(ancho)] if str(ancho) in variantes else respaldo
+
+
+def imagen(nombre, alt, tamanos="100vw", perezosa=False, estilo=""):
+    # <picture> con AVIF y WebP (y JPEG para los navegadores viejos)
+    entrada = _manifiesto()["img"][nombre]
+    variantes = entrada["variantes"]
+    srcset = lambda formato: ", ".join(f"{URL}{ruta} {ancho}w" for ancho, ruta in variantes[formato].items())
+    mayor = max(variantes["jpg"], key=int)
+    fuentes = "".join(f'<source type="image/{formato}" srcset="{srcset(formato)}" sizes="{tamanos}">'
+                      for formato in ("avif", "webp"))
+    return (f'<picture>{fuentes}<img src="{URL}{variantes["jpg"][mayor]}" srcset="{srcset("jpg")}" '
+            f'sizes="{tamanos}" width="{entrada["ancho"]}" height="{entrada["alto"]}" alt="{alt}" '
+            f'decoding="async" loading="{"lazy" if perezosa else "eager"}" '
+            f'style="width: 100%; height: auto; {estilo}"></picture>')
+
+
+def fuentes():
+    # @font-face de las fuentes propias (vacío si no se han generado)
+    css = ""
+    for familia, fuente in _manifiesto()["fuentes"].items():
+        minimo, maximo = fuente["pesos"]
+        css += f"""
+    @font-face {{
+        font-family: '{familia.capitalize()}'; font-style: normal; font-weight: {minimo} {maximo};
+        font-display: swap; src: url('{URL}{fuente["fichero"]}') format('woff2');
+    }}"""
+    return css
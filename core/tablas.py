@@ -0,0 +1,148 @@
+import datetime
+import math
+
+import streamlit as st
+
+from core.concurrente import a_la_vez
+from core.datos import COLUMNAS, a_dataframe, pagina, contar, cursor_siguiente, borrar_varios, restaurar
+from core.dinero import a_euros, centimos
+from core.metricas import fase
+
+# --- TABLA PAGINADA DE INGRESOS / GASTOS ---
+# Solo se descarga la página visible (ver core.datos.pagina). Los cursores de
+# las páginas ya visitadas se guardan en session_state para poder volver atrás.
+# Las filas se marcan con la casilla de la tabla y se borran de una vez
+# (borrado_multiple), con opción de deshacer mientras dure la sesión.
+# decorar(filas) -> (vista, column_config) añade columnas solo para pintar
+# (p.ej. las miniaturas de los justificantes de gastos).
+# Los botones actúan en callbacks (on_click): el cambio ya está hecho cuando
+# se vuelve a pintar, sin un st.rerun() de más, y dentro de un st.fragment
+# solo se repinta el fragmento.
+# Encima de la tabla va la búsqueda (texto, fechas y total): la resuelve el
+# servidor con el mismo cursor, así que buscar en 100.000 filas también es
+# pedir una sola página (ver core.datos.pagina y la migración de búsqueda).
+
+TAMANOS_PAGINA = [25, 50, 100]
+BUSCAR = {'ingresos': "Cliente", 'gastos': "Proveedor o categoría"}
+
+
+def _busqueda(tabla):
+    # Caja de búsqueda y filtros. Devuelve el filtro de core.datos.pagina ({} = sin filtro)
+    c_txt, c_fechas, c_min, c_max = st.columns([2, 2, 1, 1])
+    texto = c_txt.text_input("🔍 Buscar", key=f"buscar_{tabla}", placeholder=BUSCAR[tabla])
+    fechas = c_fechas.date_input("Fechas", value=(), min_value=datetime.date(2000, 1, 1), format="DD/MM/YYYY",
+                                 key=f"fechas_{tabla}")
+    minimo = c_min.number_input("Total desde (€)", value=None, step=10.0, key=f"min_{tabla}")
+    maximo = c_max.number_input("Total hasta (€)", value=None, step=10.0, key=f"max_{tabla}")
+
+    filtro = {}
+    if texto.strip():
+        filtro['texto'] = texto.strip()
+    if len(fechas) > 0:  # con una sola fecha marcada, desde ese día
+        filtro['desde'] = fechas[0]
+    if len(fechas) > 1:
+        filtro['hasta'] = fechas[1]
+    if minimo is not None:
+        filtro['minimo'] = centimos(minimo)
+    if maximo is not None:
+        filtro['maximo'] = centimos(maximo)
+    return filtro
+
+
+def _vacia(tabla):
+    return a_dataframe([], COLUMNAS[tabla])
+
+
+def tabla_paginada(client, user_id, tabla, decorar=None):
+    filtro = _busqueda(tabla)
+    clave = f"cursores_{tabla}"
+    tam = st.session_state.get(f"tam_{tabla}", TAMANOS_PAGINA[0])
+    # Otro tamaño de página u otra búsqueda: se vuelve a la primera página
+    estado = (tam, sorted(filtro.items()))
+    if clave not in st.session_state or st.session_state.get(f"{clave}_estado") != estado:
+        st.session_state[clave] = [None]
+        st.session_state[f"{clave}_estado"] = estado
+        st.session_state[f"busquedas_{tabla}"] = st.session_state.get(f"busquedas_{tabla}", 0) + 1
+    cursores = st.session_state[clave]
+
+    # La página y el contador (libro trimestral) se piden a la vez.
+    # Buscando no hay contador: el libro no sabe cuántas filas coinciden.
+    cargas, fallos = a_la_vez({
+        'pagina': lambda: pagina(client, user_id, tabla, tam, cursores[-1], filtro),
+        **({} if filtro else {'total': lambda: contar(client, user_id, tabla)}),
+    })
+    if 'pagina' in fallos:
+        st.error(f"❌ No se han podido cargar los registros ({fallos['pagina']}). Prueba a recargar.")
+        return _vacia(tabla), _vacia(tabla)
+    filas, hay_mas = cargas['pagina']
+    if filas.empty and len(cursores) > 1:
+        # La página se ha quedado vacía (p.ej. tras borrar): volvemos a la anterior
+        cursores.pop()
+        filas, hay_mas = pagina(client, user_id, tabla, tam, cursores[-1], filtro)
+
+    # Sin contador se sigue pudiendo navegar; solo se pierde el "Página X de Y"
+    total = cargas.get('total')
+    seleccion = filas.iloc[0:0]
+    if not filas.empty:
+        # La selección va por posición: cambia de clave con la página para no arrastrarla
+        clave_tabla = (f"tabla_{tabla}_{len(cursores)}_{st.session_state[f'busquedas_{tabla}']}"
+                       f"_{st.session_state.get(f'borrados_{tabla}', 0)}")
+        vista, config = decorar(filas) if decorar else (filas, None)
+        vista = a_euros(vista)  # los importes van en céntimos hasta aquí
+        with fase("render"):
+            evento = st.dataframe(vista, use_container_width=True, hide_index=True, key=clave_tabla,
+                                  column_config=config, on_select="rerun", selection_mode="multi-row")
+        seleccion = filas.iloc[[i for i in evento.selection.rows if i < len(filas)]]
+    elif filtro:
+        st.info("🔍 Ningún registro coincide con la búsqueda.")
+
+    c_tam, c_info, c_ant, c_sig = st.columns([1.2, 2, 1, 1])
+    c_tam.selectbox("Filas por página", TAMANOS_PAGINA, key=f"tam_{tabla}", label_visibility="collapsed")
+    if filtro:
+        c_info.caption(f"Página {len(cursores)} · resultados de la búsqueda")
+    elif total is None:
+        c_info.caption(f"Página {len(cursores)}")
+    else:
+        c_info.caption(f"Página {len(cursores)} de {max(1, math.ceil(total / tam))} · {total} registros")
+    c_ant.button("⬅️ Anterior", disabled=len(cursores) == 1, key=f"ant_{tabla}", use_container_width=True,
+                 on_click=cursores.pop)
+    c_sig.button("Siguiente ➡️", disabled=not hay_mas, key=f"sig_{tabla}", use_container_width=True,
+                 on_click=lambda: cursores.append(cursor_siguiente(filas)))
+
+    return filas, seleccion
+
+
+def _borrar(client, user_id, tabla, ids):
+    try:
+        st.session_state[f"deshacer_{tabla}"] = borrar_varios(client, user_id, tabla, ids)
+    except Exception as e:  # p.ej. alguna fila es de un periodo ya cerrado
+        st.session_state[f"error_borrado_{tabla}"] = f"No se han podido eliminar: {e}"
+    else:
+        st.session_state[f"borrados_{tabla}"] = st.session_state.get(f"borrados_{tabla}", 0) + 1
+
+
+def _deshacer(client, user_id, tabla):
+    try:
+        restaurar(client, user_id, tabla, st.session_state[f"deshacer_{tabla}"])
+    except Exception as e:  # p.ej. sin cupo en el plan
+        st.session_state[f"error_borrado_{tabla}"] = f"No se han podido recuperar: {e}"
+    else:
+        del st.session_state[f"deshacer_{tabla}"]
+
+
+def borrado_multiple(client, user_id, tabla, seleccion, nombre="registros"):
+    # Botón de borrar las filas marcadas + aviso con "Deshacer" del último borrado
+    if not seleccion.empty:
+        n = len(seleccion)
+        st.button(f"🗑️ Eliminar {n} {nombre if n > 1 else nombre[:-1]}", type="primary", key=f"borrar_{tabla}",
+                  on_click=_borrar, args=(client, user_id, tabla, seleccion['id'].tolist()))
+    error = st.session_state.pop(f"error_borrado_{tabla}", None)
+    if error:
+        st.error(f"❌ {error}")
+
+    borradas = st.session_state.get(f"deshacer_{tabla}")
+    if borradas:
+        c_msg, c_undo = st.columns([3, 1])
+        c_msg.success(f"✅ {len(borradas)} eliminados")
+        c_undo.button("↩️ Deshacer", key=f"deshacer_btn_{tabla}", use_container_width=True,
+                      on_click=_deshacer, args=(client, user_id, tabla))
@@ -0,0 +1,91 @@
+import glob
+import json
+import os
+import streamlit as st
+from core.arranque import cliente, es_admin, iniciar_pagina, perezoso
+from core.estilos import BASE, TARJETAS
+from core.conexiones import estadisticas
+from core.metricas import FASES, metricas, perfilar_pagina
+
+pd = perezoso("pandas")
+
+# --- 1. CONFIGURACIÓN Y SEGURIDAD (solo [admin] emails de secrets.toml) ---
+iniciar_pagina("Rendimiento", "📈", layout="wide", estilos=(BASE, TARJETAS))
+if not es_admin():
+    st.error("⛔ Esta página es solo para administradores.")
+    st.stop()
+
+registro = metricas()
+
+st.title("📈 Rendimiento")
+st.write("Tiempo propio de cada fase (datos, cálculo, render) por página y usuario, en la última hora.")
+
+# --- 2. RESUMEN POR PÁGINA / FASE ---
+with st.container(border=True):
+    todas = registro.resumen()
+    usuarios = sorted({f['usuario'] for f in todas})
+    c_usr, c_acc = st.columns([3, 1])
+    usuario = c_usr.selectbox("Usuario", ["Todos"] + usuarios)
+    if c_acc.button("🧹 Vaciar métricas", use_container_width=True):
+        registro.vaciar()
+        st.rerun()
+
+    filas = registro.resumen(None if usuario == "Todos" else usuario)
+    if filas:
+        st.dataframe(pd.DataFrame(filas), use_container_width=True, hide_index=True)
+    else:
+        st.info("Todavía no hay muestras. Navega por la app y vuelve aquí.")
+
+# --- 3. HISTOGRAMA ---
+if filas:
+    with st.container(border=True):
+        st.subheader("📊 Histograma")
+        c_pag, c_fase = st.columns(2)
+        pagina = c_pag.selectbox("Página", sorted({f['pagina'] for f in filas}))
+        nombre_fase = c_fase.radio("Fase", FASES, horizontal=True)
+        conteo = registro.histograma(pagina, nombre_fase, None if usuario == "Todos" else usuario)
+        st.bar_chart(pd.DataFrame({"ms": list(conteo), "reruns": list(conteo.values())}).set_index("ms"))
+
+# --- 4. VOLCADOS ---
+with st.container(border=True):
+    st.subheader("📤 Volcados")
+    c_json, c_prom = st.columns(2)
+    c_json.download_button("⬇️ JSON", data=lambda: json.dumps(registro.json(), ensure_ascii=False, indent=2),
+                           file_name="metricas.json", mime="application/json", use_container_width=True)
+    c_prom.download_button("⬇️ Prometheus (texto)", data=lambda: registro.prometheus(),
+                           file_name="metricas.prom", mime="text/plain", use_container_width=True)
+
+# --- 5. CONEXIONES CON SUPABASE (pool compartido, ver core/conexiones.py) ---
+with st.container(border=True):
+    st.subheader("🔌 Conexiones")
+    pool = estadisticas().resumen()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Abiertas", f"{pool['abiertas']} / {pool['maximo']}", f"{pool['en_uso']} en uso", delta_color="off")
+    c2.metric("Reutilización", "—" if pool['reutilizacion'] is None else f"{pool['reutilizacion']} %",
+              f"{pool['peticiones']} peticiones", delta_color="off")
+    c3.metric("Espera p95", "—" if pool['espera_p95_ms'] is None else f"{pool['espera_p95_ms']} ms",
+              f"p50 {pool['espera_p50_ms']} ms", delta_color="off")
+    c4.metric("Conexión nueva p95", "—" if pool['conexion_p95_ms'] is None else f"{pool['conexion_p95_ms']} ms",
+              f"{pool['errores']} errores", delta_color="off")
+    st.caption("HTTP/2 activo." if pool['http2'] else "HTTP/1.1 (instala h2 para HTTP/2).")
+
+# --- 6. PERFIL DE UNA EJECUCIÓN (cProfile) ---
+with st.container(border=True):
+    st.subheader("🔬 Perfilar una página")
+    st.caption("Ejecuta una vez la página elegida con tus datos bajo cProfile. Solo cuando lo pides.")
+    rutas = {os.path.basename(r)[:-3]: r for r in sorted(glob.glob(os.path.join(os.path.dirname(__file__), "*.py")))
+             if os.path.abspath(r) != os.path.abspath(__file__)}
+    c_sel, c_btn = st.columns([3, 1])
+    elegida = c_sel.selectbox("Página", list(rutas), label_visibility="collapsed")
+    if c_btn.button("▶️ Perfilar", type="primary", use_container_width=True):
+        with st.spinner("Ejecutando con cProfile..."):
+            try:
+                st.session_state['perfil'] = (elegida, *perfilar_pagina(rutas[elegida], cliente(), st.session_state['user']))
+            except Exception as e:
+                st.error(f"Error: {e}")
+
+    if 'perfil' in st.session_state:
+        nombre, informe, fichero = st.session_state['perfil']
+        st.code(informe, language=None)
+        st.download_button("⬇️ Descargar .prof (snakeviz, pstats)", fichero,
+                           file_name=f"{nombre}.prof", mime="application/octet-stream")
@@ -0,0 +1,81 @@
+import datetime
+import streamlit as st
+from core.arranque import cliente, iniciar_pagina
+from core.cache import CACHE_TTL
+from core.dinero import a_euros, formato
+from core.estilos import BASE, TARJETAS
+from core.fiscal import MODELOS
+from core.gestoria import actualizar, cartera
+from core.metricas import fase
+
+# --- 1. CONFIGURACIÓN, ESTILOS Y SEGURIDAD ---
+iniciar_pagina("Gestoría", "🗂️", layout="wide", estilos=(BASE, TARJETAS))
+
+client = cliente()
+gestor_id = st.session_state['user'].id
+
+st.title("🗂️ Mis Clientes")
+st.write("Lo que le toca pagar a cada cliente en el trimestre (modelos 303, 130 y 111).")
+
+# --- 2. TRIMESTRE Y ORDEN ---
+hoy = datetime.date.today()
+trimestres = {}
+anio, trim = hoy.year, (hoy.month - 1) // 3 + 1
+for _ in range(8):  # el actual y los siete anteriores
+    trimestres[f"{anio} · {trim}T"] = (anio, trim)
+    anio, trim = (anio, trim - 1) if trim > 1 else (anio - 1, 4)
+
+ORDEN = {"💰 Total a pagar": 'hucha', "Modelo 303 (IVA)": 'mod_303', "Modelo 130 (IRPF)": 'mod_130',
+         "Modelo 111": 'mod_111', "Facturado": 'facturado', "Cliente": 'alias'}
+
+c_per, c_orden, c_buscar, c_act = st.columns([1.2, 1.5, 2, 1])
+periodo = c_per.selectbox("Trimestre", list(trimestres))
+orden = c_orden.selectbox("Ordenar por", list(ORDEN))
+buscar = c_buscar.text_input("Buscar cliente", placeholder="🔎 Buscar cliente", label_visibility="collapsed")
+if c_act.button("🔄 Actualizar", use_container_width=True):
+    actualizar(gestor_id)
+
+# --- 3. CARTERA (cacheada por trimestre, ver core/gestoria.py) ---
+try:
+    with st.spinner("Calculando la cartera..."):
+        t = cartera(client, gestor_id, *trimestres[periodo])
+except Exception as e:
+    st.error(f"❌ No se ha podido cargar la cartera ({e}). Prueba a actualizar.")
+    st.stop()
+
+if t.empty:
+    st.info("Todavía no tienes clientes vinculados. Escríbenos desde Soporte para dar de alta tu gestoría.")
+    st.stop()
+
+# --- 4. TOTALES ---
+k1, k2, k3, k4 = st.columns(4)
+with fase("render"):
+    k1.metric("👥 Clientes", len(t))
+    k2.metric("🏛️ 303 (IVA)", formato(t['mod_303'].sum()))
+    k3.metric("📑 130 (IRPF)", formato(t['mod_130'].sum()))
+    k4.metric("🧾 111", formato(t['mod_111'].sum()))
+
+# --- 5. TABLA ---
+vista = t
+if buscar:
+    vista = vista[vista['alias'].str.contains(buscar, case=False, regex=False)]
+columna = ORDEN[orden]
+vista = vista.sort_values(columna, ascending=columna == 'alias', ignore_index=True)
+vista = a_euros(vista, MODELOS)  # céntimos -> euros solo para pintar y descargar
+
+euros = lambda titulo: st.column_config.NumberColumn(titulo, format="%.2f €")
+with fase("render"):
+    st.dataframe(
+        vista[['alias', 'hucha', 'mod_303', 'mod_130', 'mod_111', 'facturado', 'gastos', 'beneficio']],
+        use_container_width=True, hide_index=True, height=min(38 + 35 * len(vista), 640),
+        column_config={
+            'alias': st.column_config.TextColumn("Cliente"),
+            'hucha': euros("💰 A pagar"), 'mod_303': euros("303"), 'mod_130': euros("130"),
+            'mod_111': euros("111"), 'facturado': euros("Facturado"), 'gastos': euros("Gastos"),
+            'beneficio': euros("Beneficio"),
+        },
+    )
+st.caption(f"{len(vista)} de {len(t)} clientes · Datos de hace como mucho {CACHE_TTL // 60} minutos (🔄 para refrescar)")
+
+st.download_button("⬇️ Descargar cartera (CSV)", data=lambda: vista.to_csv(index=False).encode('utf-8'),
+                   file_name=f"cartera_{periodo.replace(' · ', '_')}.csv", mime="text/csv")
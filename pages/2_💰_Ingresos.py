@@ -1,66 +1,70 @@
 import streamlit as st
 import datetime
-from supabase import create_client
+from core.arranque import cliente, iniciar_pagina
+from core.cuotas import CuotaAgotada, disponibles
+from core.datos import insertar, sugerencias
+from core.dinero import centimos, desglose, euros
+from core.tablas import tabla_paginada, borrado_multiple
 
-st.set_page_config(page_title="Ingresos", page_icon="💰")
+# CONEXIÓN Y SEGURIDAD (core/arranque.py)
+iniciar_pagina("Ingresos", "💰")
 
-# CONEXIÓN
-if 'supabase' not in st.session_state:
-    try:
-        url = st.secrets["supabase"]["url"]
-        key = st.secrets["supabase"]["key"]
-        st.session_state['supabase'] = create_client(url, key)
-    except: st.error("Error conexión")
+st.title("💰 Registrar Ingresos")
 
-if 'user' not in st.session_state or st.session_state['user'] is None:
-    st.warning("⚠️ Inicia sesión primero."); st.stop()
+# --- FORMULARIO + TABLA (un fragmento: guardar, paginar o borrar solo repinta esto) ---
+@st.fragment
+def registro(client, user_id):
+    cupo = st.empty()  # se rellena después del formulario, con el alta ya contada
 
-st.title("💰 Registrar Ingresos")
+    # Clientes que ya has usado, los más frecuentes primero: se filtran al escribir
+    # en el propio navegador (sin una petición por tecla) y se puede poner uno nuevo.
+    # Con key fija el valor no se pierde cuando la lista cambia tras un alta
+    try:
+        habituales = sugerencias(client, user_id, 'ingresos')
+    except Exception:
+        habituales = []
 
-# TU FORMULARIO
-with st.form("fi"):
-    c1,c2 = st.columns(2)
-    fecha = c1.date_input("Fecha")
-    cli = c2.text_input("Cliente")
-    c3,c4,c5 = st.columns(3)
-    base = c3.number_input("Base (€)", step=10.0)
-    iva = c4.selectbox("IVA %", [0,4,10,21], index=3)
-    irpf = c5.selectbox("IRPF %", [0,7,15], index=0)
-    
-    if st.form_submit_button("Guardar Factura"):
-        # TUS CÁLCULOS
-        c_iva = base * (iva/100)
-        ret = base * (irpf/100)
-        tot = base + c_iva - ret
+    # TU FORMULARIO
+    with st.form("fi"):
+        c1,c2 = st.columns(2)
+        fecha = c1.date_input("Fecha")
+        cli = c2.selectbox("Cliente", habituales, index=None, accept_new_options=True,
+                           placeholder="Escribe o elige uno de la lista", key="cliente_fi")
+        c3,c4,c5 = st.columns(3)
+        base = c3.number_input("Base (€)", step=10.0)
+        iva = c4.selectbox("IVA %", [0,4,10,21], index=3)
+        irpf = c5.selectbox("IRPF %", [0,7,15], index=0)
         
-        try:
-            st.session_state['supabase'].table('ingresos').insert({
-                "user_id": st.session_state['user'].id, 
-                "fecha": str(fecha), "cliente": cli,
-                "base": base, "iva_pct": iva, "cuota_iva": c_iva, 
-                "irpf_pct": irpf, "retencion": ret, "total": tot
-            }).execute()
-            st.success("✅ Guardado correctamente")
-            st.rerun()
-        except Exception as e: st.error(f"Error: {e}")
+        if st.form_submit_button("Guardar Factura"):
+            # TUS CÁLCULOS
+            # En céntimos y con el redondeo de core/dinero.py (IVA y retención sobre la base redondeada)
+            base_c = centimos(base)
+            importes = desglose(base_c, iva, irpf)
+            
+            try:
+                insertar(client, user_id, 'ingresos', {
+                    "fecha": str(fecha), "cliente": cli or "",
+                    "base": euros(base_c), "iva_pct": iva, "cuota_iva": euros(importes['cuota_iva']),
+                    "irpf_pct": irpf, "retencion": euros(importes['retencion']), "total": euros(importes['total'])
+                })
+                st.success("✅ Guardado correctamente")
+            except CuotaAgotada as e:
+                st.warning(f"💎 {e}")
+                st.page_link("pages/4_💎_Suscripción.py", label="Mejorar plan", icon="🚀")
+            except Exception as e: st.error(f"Error: {e}")
+
+    # Cupo del plan (contadores cacheados, ver core/cuotas.py)
+    quedan = disponibles(client, user_id)
+    if quedan is not None:
+        cupo.caption(f"💎 Te quedan {quedan} registros en tu plan." if quedan else "💎 Has agotado los registros de tu plan.")
+
+    st.divider()
+
+    # TU TABLA Y BORRADO (la tabla ya incluye lo que se acaba de guardar)
+    filas, seleccion = tabla_paginada(client, user_id, 'ingresos')
 
-st.divider()
+    # Marca las casillas de la tabla para borrar varias a la vez
+    borrado_multiple(client, user_id, 'ingresos', seleccion, "facturas")
 
-# TU TABLA Y BORRADO
-client = st.session_state['supabase']
-resp = client.table('ingresos').select('*').eq('user_id', st.session_state['user'].id).execute()
 
-if resp.data:
-    st.dataframe(resp.data, use_container_width=True)
-    
-    st.markdown("---")
-    st.subheader("🗑️ Borrar Factura")
-    opciones = [f"{row['id']} | {row['fecha']} - {row['cliente']} ({row['total']} €)" for row in resp.data]
-    col_del1, col_del2 = st.columns([3, 1])
-    seleccion = col_del1.selectbox("Selecciona cuál borrar:", opciones, label_visibility="collapsed")
-    
-    if col_del2.button("Eliminar", type="primary"):
-        id_borrar = seleccion.split(" | ")[0]
-        client.table('ingresos').delete().eq('id', id_borrar).execute()
-        st.success("✅ Eliminado")
-        st.rerun()
+registro(cliente(), st.session_state['user'].id)
@@ -1,63 +1,99 @@
 import streamlit as st
 import datetime
-from supabase import create_client
+from core.arranque import cliente, iniciar_pagina
+from core.cuotas import CuotaAgotada, disponibles
+from core.datos import insertar, sugerencias
+from core.dinero import centimos, desglose, euros
+from core.justificantes import EXTENSIONES, MAX_MB, adjuntar, columna, de_pagina, leer, url
+from core.tablas import tabla_paginada, borrado_multiple
 
-st.set_page_config(page_title="Gastos", page_icon="💸")
+# CONEXIÓN Y SEGURIDAD (core/arranque.py)
+iniciar_pagina("Gastos", "💸")
 
-if 'supabase' not in st.session_state:
-    try:
-        url = st.secrets["supabase"]["url"]
-        key = st.secrets["supabase"]["key"]
-        st.session_state['supabase'] = create_client(url, key)
-    except: st.error("Error conexión")
+st.title("💸 Registrar Gastos")
 
-if 'user' not in st.session_state or st.session_state['user'] is None:
-    st.warning("⚠️ Inicia sesión primero."); st.stop()
+# --- FORMULARIO + TABLA (un fragmento: guardar, paginar o borrar solo repinta esto) ---
+@st.fragment
+def registro(client, user_id):
+    cupo = st.empty()  # se rellena después del formulario, con el alta ya contada
 
-st.title("💸 Registrar Gastos")
+    # Proveedores que ya has usado, los más frecuentes primero: se filtran al escribir
+    # en el propio navegador (sin una petición por tecla) y se puede poner uno nuevo.
+    # Con key fija el valor no se pierde cuando la lista cambia tras un alta
+    try:
+        habituales = sugerencias(client, user_id, 'gastos')
+    except Exception:
+        habituales = []
 
-with st.form("fg"):
-    c1,c2 = st.columns(2)
-    fecha = c1.date_input("Fecha")
-    prov = c2.text_input("Proveedor")
-    cat = st.selectbox("Categoría", ["Servicios", "Suministros", "Alquiler", "Herramientas", "Gestoría", "Otros"])
-    c3,c4,c5 = st.columns(3)
-    base = c3.number_input("Base (€)", step=10.0)
-    iva = c4.selectbox("IVA %", [0,4,10,21], index=3)
-    irpf = c5.selectbox("IRPF %", [0,7,15,19], index=0)
-    
-    if st.form_submit_button("Guardar Gasto"):
-        c_iva = base * (iva/100)
-        ret = base * (irpf/100)
-        tot = base + c_iva - ret
+    with st.form("fg"):
+        c1,c2 = st.columns(2)
+        fecha = c1.date_input("Fecha")
+        prov = c2.selectbox("Proveedor", habituales, index=None, accept_new_options=True,
+                            placeholder="Escribe o elige uno de la lista", key="proveedor_fg")
+        cat = st.selectbox("Categoría", ["Servicios", "Suministros", "Alquiler", "Herramientas", "Gestoría", "Otros"])
+        c3,c4,c5 = st.columns(3)
+        base = c3.number_input("Base (€)", step=10.0)
+        iva = c4.selectbox("IVA %", [0,4,10,21], index=3)
+        irpf = c5.selectbox("IRPF %", [0,7,15,19], index=0)
+        archivo = st.file_uploader(f"📎 Justificante (foto o PDF, hasta {MAX_MB} MB)", type=EXTENSIONES)
         
-        try:
-            st.session_state['supabase'].table('gastos').insert({
-                "user_id": st.session_state['user'].id,
-                "fecha": str(fecha), "proveedor": prov, "categoria": cat,
-                "base": base, "iva_pct": iva, "cuota_iva": c_iva, 
-                "irpf_pct": irpf, "retencion": ret, "total": tot
-            }).execute()
-            st.success("✅ Gasto registrado")
-            st.rerun()
-        except Exception as e: st.error(f"Error: {e}")
-
-st.divider()
-
-client = st.session_state['supabase']
-resp = client.table('gastos').select('*').eq('user_id', st.session_state['user'].id).execute()
-
-if resp.data:
-    st.dataframe(resp.data, use_container_width=True)
-    
-    st.markdown("---")
-    st.subheader("🗑️ Borrar Gasto")
-    opciones = [f"{row['id']} | {row['fecha']} - {row['proveedor']} ({row['total']} €)" for row in resp.data]
-    col_del1, col_del2 = st.columns([3, 1])
-    seleccion = col_del1.selectbox("Selecciona cuál borrar:", opciones, label_visibility="collapsed")
-    
-    if col_del2.button("Eliminar", type="primary"):
-        id_borrar = seleccion.split(" | ")[0]
-        client.table('gastos').delete().eq('id', id_borrar).execute()
-        st.success("✅ Eliminado")
-        st.rerun()
+        if st.form_submit_button("Guardar Gasto"):
+            # En céntimos y con el redondeo de core/dinero.py (IVA y retención sobre la base redondeada)
+            base_c = centimos(base)
+            importes = desglose(base_c, iva, irpf)
+            
+            try:
+                nuevo = insertar(client, user_id, 'gastos', {
+                    "fecha": str(fecha), "proveedor": prov or "", "categoria": cat,
+                    "base": euros(base_c), "iva_pct": iva, "cuota_iva": euros(importes['cuota_iva']),
+                    "irpf_pct": irpf, "retencion": euros(importes['retencion']), "total": euros(importes['total'])
+                })
+                try:
+                    if archivo:
+                        adjuntar(client, user_id, nuevo[0]['id'], archivo.name, archivo.getvalue())
+                    st.success("✅ Gasto registrado")
+                except Exception as e:
+                    st.warning(f"✅ Gasto registrado, pero el justificante no se ha guardado: {e}")
+            except CuotaAgotada as e:
+                st.warning(f"💎 {e}")
+                st.page_link("pages/4_💎_Suscripción.py", label="Mejorar plan", icon="🚀")
+            except Exception as e: st.error(f"Error: {e}")
+
+    # Cupo del plan (contadores cacheados, ver core/cuotas.py)
+    quedan = disponibles(client, user_id)
+    if quedan is not None:
+        cupo.caption(f"💎 Te quedan {quedan} registros en tu plan." if quedan else "💎 Has agotado los registros de tu plan.")
+
+    st.divider()
+
+    # Las miniaturas solo se piden para las filas de la página visible
+    filas, seleccion = tabla_paginada(client, user_id, 'gastos', decorar=lambda f: columna(client, user_id, f))
+
+    # Con una sola fila marcada: ver, descargar o cambiar su justificante
+    if len(seleccion) == 1:
+        gasto_id = int(seleccion['id'].iloc[0])
+        with st.expander("📎 Justificante", expanded=True):
+            try:
+                j = de_pagina(client, user_id, filas['id']).get(gasto_id)
+            except Exception as e:
+                j = None
+                st.error(f"❌ No se ha podido cargar el justificante ({e})")
+            if j:
+                if j['tipo'].startswith('image/'):
+                    st.image(url(client, j['ruta']), use_container_width=True)
+                st.download_button(f"⬇️ {j['nombre'] or 'Descargar'}", data=lambda: leer(client, j['ruta']),
+                                   file_name=j['nombre'] or j['ruta'].rsplit('/', 1)[-1], mime=j['tipo'])
+            nuevo = st.file_uploader("Cambiar justificante" if j else "Adjuntar justificante", type=EXTENSIONES,
+                                     key=f"justificante_{gasto_id}")
+            if nuevo and st.button("📎 Guardar justificante", key=f"guardar_justificante_{gasto_id}"):
+                try:
+                    adjuntar(client, user_id, gasto_id, nuevo.name, nuevo.getvalue())
+                    st.rerun(scope="fragment")
+                except Exception as e:
+                    st.error(f"❌ {e}")
+
+    # Marca las casillas de la tabla para borrar varias a la vez
+    borrado_multiple(client, user_id, 'gastos', seleccion, "gastos")
+
+
+registro(cliente(), st.session_state['user'].id)
@@ -1,18 +1,9 @@
 import streamlit as st
+from core.arranque import iniciar_pagina
+from core.estilos import PLANES
 
-st.set_page_config(page_title="Suscripción", page_icon="💎")
-
-# --- TUS ESTILOS EXACTOS DE PLANES ---
-st.markdown("""
-<style>
-    .plan-header {
-        padding: 15px; border-radius: 12px 12px 0 0; color: white;
-        text-align: center; font-weight: 800; font-size: 1.1em;
-        margin: -16px -16px 15px -16px; text-transform: uppercase; letter-spacing: 1px;
-    }
-    .stButton > button { width: 100%; }
-</style>
-""", unsafe_allow_html=True)
+# --- TUS ESTILOS EXACTOS DE PLANES (core/estilos.py) ---
+iniciar_pagina("Suscripción", "💎", estilos=(PLANES,), login=False)
 
 st.title("💎 Suscripción")
 
@@ -1,6 +1,10 @@
 import streamlit as st
+from core.arranque import iniciar_pagina
+from core.buzon import encolar
+from core.estilos import BASE
 
-st.set_page_config(page_title="Soporte", page_icon="📩")
+# Se puede escribir sin haber iniciado sesión
+iniciar_pagina("Soporte", "📩", estilos=(BASE,), login=False)
 
 st.title("📩 Soporte Técnico")
 
@@ -25,6 +29,13 @@ with st.form("form_soporte"):
     enviar = st.form_submit_button("Enviar Mensaje")
     
     if enviar:
-        # Aquí es visual, en el futuro podrías conectarlo para que te llegue un email real
-        st.success("✅ Hemos recibido tu mensaje. Te contestaremos en menos de 24h.")
-        st.balloons()
+        if "@" not in email_usuario or not mensaje.strip():
+            st.warning("✍️ Escribe tu email y el mensaje para que podamos contestarte.")
+        else:
+            # Se guarda en el buzón de salida y se manda en segundo plano (core/buzon.py)
+            try:
+                encolar(email_usuario.strip(), asunto, mensaje.strip(), getattr(st.session_state.get('user'), 'id', None))
+                st.success("✅ Hemos recibido tu mensaje. Te contestaremos en menos de 24h.")
+                st.balloons()
+            except Exception:
+                st.error("❌ No hemos podido guardar tu mensaje. Escríbenos al correo de arriba.")
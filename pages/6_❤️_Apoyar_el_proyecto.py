@@ -1,6 +1,9 @@
 import streamlit as st
+from core.arranque import iniciar_pagina
+from core.estilos import BASE
+from core.recursos import imagen
 
-st.set_page_config(page_title="Apoyar el Proyecto", page_icon="❤️")
+iniciar_pagina("Apoyar el Proyecto", "❤️", estilos=(BASE,), login=False)
 
 st.title("❤️ ¿Te ha sido útil esta herramienta?")
 
@@ -16,7 +19,8 @@ st.divider()
 col_img, col_txt = st.columns([1, 2], gap="medium")
 
 with col_img:
-    st.image("revolut.jpg", use_container_width=True)
+    st.markdown(imagen("revolut", "Revolut Business", "(max-width: 640px) 100vw, 240px",
+                       estilo="border-radius: 8px;"), unsafe_allow_html=True)
 
 with col_txt:
     st.subheader("🏦 Revolut para Autónomos")
@@ -1,52 +1,9 @@
 import streamlit as st
-from supabase import create_client
+from core.arranque import cliente, iniciar_pagina
+from core.estilos import BASE, PERFIL, TARJETAS
 
-# --- 1. CONFIGURACIÓN ---
-st.set_page_config(page_title="Mi Perfil", page_icon="👤", layout="wide")
-
-# --- 2. CSS PREMIUM ---
-st.markdown("""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;600;800&display=swap');
-    html, body, [class*="css"] { font-family: 'Inter', sans-serif; }
-    .stApp { background-color: #F8FAFC; }
-
-    /* Tarjetas */
-    div[data-testid="stVerticalBlockBorderWrapper"] {
-        background-color: white;
-        padding: 25px;
-        border-radius: 16px;
-        border: 1px solid #E2E8F0;
-        box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.05);
-    }
-    
-    /* Avatar Simulado */
-    .avatar-circle {
-        width: 100px; height: 100px;
-        background: linear-gradient(135deg, #3B82F6 0%, #2563EB 100%);
-        border-radius: 50%;
-        color: white;
-        display: flex; align-items: center; justify-content: center;
-        font-size: 40px; font-weight: bold;
-        margin: 0 auto 15px auto;
-        box-shadow: 0 10px 15px -3px rgba(37, 99, 235, 0.3);
-    }
-    </style>
-""", unsafe_allow_html=True)
-
-# --- 3. CONEXIÓN ---
-@st.cache_resource
-def init_supabase():
-    try:
-        url = st.secrets["supabase"]["url"]
-        key = st.secrets["supabase"]["key"]
-        return create_client(url, key)
-    except: return None
-
-if 'supabase' not in st.session_state: st.session_state['supabase'] = init_supabase()
-if 'user' not in st.session_state or st.session_state['user'] is None:
-    st.warning("⚠️ Inicia sesión primero.")
-    st.stop()
+# --- 1. CONFIGURACIÓN, ESTILOS Y SEGURIDAD ---
+iniciar_pagina("Mi Perfil", "👤", layout="wide", estilos=(BASE, TARJETAS, PERFIL))
 
 # --- LÓGICA USUARIO ---
 user = st.session_state['user']
@@ -80,6 +37,7 @@ with col_left:
         st.write("")
         if st.button("🚪 Cerrar Sesión", use_container_width=True):
             st.session_state['user'] = None
+            st.session_state.pop('supabase', None)  # el cliente lleva el token de la sesión
             st.switch_page("app.py")
 
 # --- COLUMNA DERECHA: DATOS Y SEGURIDAD ---
@@ -111,7 +69,7 @@ with col_right:
         if st.button("🔄 Actualizar Contraseña"):
             if pass_new == pass_conf and len(pass_new) > 5:
                 try:
-                    st.session_state['supabase'].auth.update_user({"password": pass_new})
+                    cliente().auth.update_user({"password": pass_new})
                     st.success("¡Contraseña actualizada correctamente!")
                 except Exception as e:
                     st.error(f"Error: {e}")
@@ -1,42 +1,16 @@
 import streamlit as st
-import pandas as pd
-from supabase import create_client
+from core.arranque import cliente, iniciar_pagina, perezoso
+from core.estilos import BASE, TARJETAS
+from core.datos import resumen_trimestral
+from core.fiscal import filtrar_periodo, opciones_periodo, rango_periodo
+from core.exportar import FORMATOS, exportar_tabla, pack_gestoria, resumen_fiscal_csv
 
-# --- 1. CONFIGURACIÓN ---
-st.set_page_config(page_title="Configuración", page_icon="⚙️", layout="wide")
+pd = perezoso("pandas")
 
-# --- 2. CSS PREMIUM ---
-st.markdown("""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;600;800&display=swap');
-    html, body, [class*="css"] { font-family: 'Inter', sans-serif; }
-    .stApp { background-color: #F8FAFC; }
-    
-    div[data-testid="stVerticalBlockBorderWrapper"] {
-        background-color: white;
-        padding: 25px;
-        border-radius: 16px;
-        border: 1px solid #E2E8F0;
-        box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.05);
-    }
-    </style>
-""", unsafe_allow_html=True)
+# --- 1. CONFIGURACIÓN, ESTILOS Y SEGURIDAD ---
+iniciar_pagina("Configuración", "⚙️", layout="wide", estilos=(BASE, TARJETAS))
 
-# --- 3. CONEXIÓN ---
-@st.cache_resource
-def init_supabase():
-    try:
-        url = st.secrets["supabase"]["url"]
-        key = st.secrets["supabase"]["key"]
-        return create_client(url, key)
-    except: return None
-
-if 'supabase' not in st.session_state: st.session_state['supabase'] = init_supabase()
-if 'user' not in st.session_state or st.session_state['user'] is None:
-    st.warning("⚠️ Inicia sesión primero.")
-    st.stop()
-
-client = st.session_state['supabase']
+client = cliente()
 user_id = st.session_state['user'].id
 
 # --- 4. LAYOUT CONFIGURACIÓN ---
@@ -68,34 +42,35 @@ with tab_fiscal:
 # --- PESTAÑA 2: EXPORTAR DATOS (IMPORTANTE) ---
 with tab_datos:
     st.write("### 📤 Exportar Contabilidad")
-    st.write("Descarga tus ingresos y gastos en formato Excel/CSV para enviarlos a tu gestor.")
-    
+    st.write("Descarga tus ingresos y gastos en CSV, Excel o Parquet para enviarlos a tu gestor.")
+
+    # Nada se descarga hasta que pulsas un botón: los ficheros se generan en ese
+    # momento leyendo la base de datos por bloques (ver core/exportar.py).
+    trimestres = pd.DataFrame(resumen_trimestral(client, user_id))
+    periodos = opciones_periodo(trimestres)
+
+    c_per, c_fmt = st.columns(2)
+    periodo = c_per.selectbox("Periodo", list(periodos))
+    formato = c_fmt.radio("Formato", list(FORMATOS), horizontal=True)
+
+    anio_sel, trim_sel = periodos[periodo]
+    desde, hasta = rango_periodo(anio_sel, trim_sel)
+    sel = filtrar_periodo(trimestres, anio_sel, trim_sel)
+    extension, mime = FORMATOS[formato]
+    sufijo = "" if anio_sel is None else f"_{anio_sel}" + ("" if trim_sel is None else f"_{trim_sel}T")
+
     col_d1, col_d2 = st.columns(2)
-    
-    # LOGICA DE DESCARGA
-    # 1. Traemos datos de Supabase
-    try:
-        ingresos_data = client.table("ingresos").select("*").eq("user_id", user_id).execute()
-        gastos_data = client.table("gastos").select("*").eq("user_id", user_id).execute()
-        
-        df_ingresos = pd.DataFrame(ingresos_data.data) if ingresos_data.data else pd.DataFrame()
-        df_gastos = pd.DataFrame(gastos_data.data) if gastos_data.data else pd.DataFrame()
-        
-    except:
-        df_ingresos = pd.DataFrame()
-        df_gastos = pd.DataFrame()
 
     with col_d1:
         with st.container(border=True):
-            st.metric("Total Facturas Ingresos", len(df_ingresos))
-            if not df_ingresos.empty:
-                # Convertir a CSV
-                csv_i = df_ingresos.to_csv(index=False).encode('utf-8')
+            n_ingresos = int(sel['n_ingresos'].sum()) if not sel.empty else 0
+            st.metric("Total Facturas Ingresos", n_ingresos)
+            if n_ingresos:
                 st.download_button(
-                    label="⬇️ Descargar Ingresos (CSV)",
-                    data=csv_i,
-                    file_name='ingresos_gestor_pro.csv',
-                    mime='text/csv',
+                    label=f"⬇️ Descargar Ingresos ({formato})",
+                    data=lambda: exportar_tabla(client, user_id, 'ingresos', formato, desde, hasta),
+                    file_name=f'ingresos_gestor_pro{sufijo}.{extension}',
+                    mime=mime,
                     use_container_width=True
                 )
             else:
@@ -103,20 +78,39 @@ with tab_datos:
 
     with col_d2:
         with st.container(border=True):
-            st.metric("Total Tickets Gastos", len(df_gastos))
-            if not df_gastos.empty:
-                # Convertir a CSV
-                csv_g = df_gastos.to_csv(index=False).encode('utf-8')
+            n_gastos = int(sel['n_gastos'].sum()) if not sel.empty else 0
+            st.metric("Total Tickets Gastos", n_gastos)
+            if n_gastos:
                 st.download_button(
-                    label="⬇️ Descargar Gastos (CSV)",
-                    data=csv_g,
-                    file_name='gastos_gestor_pro.csv',
-                    mime='text/csv',
+                    label=f"⬇️ Descargar Gastos ({formato})",
+                    data=lambda: exportar_tabla(client, user_id, 'gastos', formato, desde, hasta),
+                    file_name=f'gastos_gestor_pro{sufijo}.{extension}',
+                    mime=mime,
                     use_container_width=True
                 )
             else:
                 st.info("No hay gastos para exportar.")
 
+    if not sel.empty:
+        c_pack, c_res = st.columns(2)
+        # Todo junto para la gestoría: ingresos, gastos y resumen fiscal del periodo
+        c_pack.download_button(
+            label="📦 Pack para la Gestoría (ZIP)",
+            data=lambda: pack_gestoria(client, user_id, formato, desde, hasta),
+            file_name=f'pack_gestoria{sufijo}.zip',
+            mime='application/zip',
+            type="primary",
+            use_container_width=True
+        )
+        # Resumen fiscal por trimestre y año (mismo motor que el Dashboard)
+        c_res.download_button(
+            label="⬇️ Resumen Fiscal por Trimestre (CSV)",
+            data=lambda: resumen_fiscal_csv(sel),
+            file_name=f'resumen_fiscal_gestor_pro{sufijo}.csv',
+            mime='text/csv',
+            use_container_width=True
+        )
+
     st.write("---")
     st.write("### 🚨 Zona de Peligro")
     with st.expander("Borrar todos mis datos"):
@@ -0,0 +1,83 @@
+import streamlit as st
+from core.arranque import cliente, iniciar_pagina, perezoso
+from core.metricas import fase
+from core.importador import (importar, leer_bloques, normalizar, ArchivoNoValido,
+                             FORMATOS, PLANTILLA, IVAS, IRPFS, CATEGORIAS)
+
+pd = perezoso("pandas")
+
+# --- 1. CONFIGURACIÓN Y SEGURIDAD ---
+iniciar_pagina("Importar", "📥", layout="wide")
+
+client = cliente()
+user_id = st.session_state['user'].id
+
+# --- 3. LAYOUT ---
+st.title("📥 Importar Facturas y Gastos")
+st.write("Sube un CSV o Excel con todo tu histórico, o el extracto de Revolut Business, y lo registramos de una vez.")
+
+with st.container(border=True):
+    c1, c2 = st.columns(2)
+    destino = c1.radio("¿Qué vas a importar?", ["Ingresos", "Gastos"], horizontal=True)
+    tabla = destino.lower()
+    formato = c2.selectbox("Formato del archivo", FORMATOS)
+
+    st.caption("Valores que se aplican cuando el archivo no los trae (en Revolut, siempre):")
+    c3, c4, c5 = st.columns(3)
+    iva_def = c3.selectbox("IVA %", IVAS, index=3)
+    irpf_def = c4.selectbox("IRPF %", IRPFS[tabla], index=0)
+    cat_def = c5.selectbox("Categoría", CATEGORIAS, index=len(CATEGORIAS) - 1, disabled=tabla == 'ingresos')
+
+    st.download_button("📄 Descargar plantilla CSV", PLANTILLA[tabla].encode('utf-8'),
+                       file_name=f"plantilla_{tabla}.csv", mime="text/csv")
+
+archivo = st.file_uploader("Archivo (CSV o Excel)", type=["csv", "txt", "xlsx", "xlsm"])
+
+if archivo is not None:
+    # Vista previa: solo el primer bloque, ya calculado como se guardaría
+    try:
+        with fase("calculo"):
+            primer_bloque, _ = next(leer_bloques(archivo, archivo.name, tamano=20), (pd.DataFrame(), 0))
+            previa, errores_previa = normalizar(primer_bloque, tabla, formato, iva_def, irpf_def, cat_def)
+    except ArchivoNoValido as e:
+        st.error(f"❌ {e}")
+        st.stop()
+    except Exception as e:
+        st.error(f"❌ No se ha podido leer el archivo: {e}")
+        st.stop()
+    st.subheader("👀 Vista previa")
+    st.dataframe(previa, use_container_width=True, hide_index=True)
+    if errores_previa:
+        linea, motivo = errores_previa[0]
+        st.warning(f"{len(errores_previa)} de las primeras filas tienen errores y no se importarán "
+                   f"(línea {linea + 2}: {motivo}).")
+
+    if st.button("🚀 IMPORTAR", type="primary", use_container_width=True):
+        archivo.seek(0)
+        barra = st.progress(0.0, text="Importando...")
+
+        def progreso(fraccion, insertadas, n_errores):
+            barra.progress(fraccion, text=f"Importando... {insertadas} guardadas, {n_errores} con errores")
+
+        try:
+            with fase("calculo"):
+                insertadas, errores = importar(client, user_id, tabla, archivo, archivo.name, formato,
+                                               iva_def, irpf_def, cat_def, progreso=progreso)
+        except ArchivoNoValido as e:
+            barra.empty()
+            st.error(f"❌ {e}")
+            st.stop()
+        except Exception as e:
+            barra.empty()
+            st.error(f"❌ La importación se ha interrumpido: {e}. Revisa en {destino} lo que se haya guardado "
+                     "antes de volver a importar.")
+            st.stop()
+        barra.progress(1.0, text="Importación terminada")
+        st.success(f"✅ {insertadas} registros importados en {destino}")
+
+        if errores:
+            st.error(f"❌ {len(errores)} filas no se han importado")
+            df_err = pd.DataFrame(errores, columns=["Línea", "Motivo"])
+            st.dataframe(df_err, use_container_width=True, hide_index=True)
+            st.download_button("⬇️ Descargar errores (CSV)", df_err.to_csv(index=False).encode('utf-8'),
+                               file_name=f"errores_importacion_{tabla}.csv", mime="text/csv")
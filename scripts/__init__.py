@@ -0,0 +1,2 @@
+# Comandos de mantenimiento. Se ejecutan desde la raíz del repo:
+#   python -m scripts.<comando> --help
@@ -0,0 +1,42 @@
+import argparse
+import os
+import tomllib
+
+from core.buzon import MAX_INTENTOS, crear_cartero
+from scripts.conexion import SECRETS
+
+# --- BUZÓN DE SOPORTE ---
+#   python -m scripts.buzon estado        # pendientes / enviados / fallidos
+#   python -m scripts.buzon reintentar    # vuelve a poner en cola los fallidos
+#   python -m scripts.buzon repartir      # manda ahora lo pendiente (p.ej. desde cron)
+#
+# Usa el mismo [soporte] de .streamlit/secrets.toml que la app (core/buzon.py).
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consulta y reparte el buzón de salida de Soporte.")
+    parser.add_argument("accion", choices=["estado", "reintentar", "repartir"])
+    args = parser.parse_args()
+
+    config = {}
+    if os.path.exists(SECRETS):
+        with open(SECRETS, "rb") as f:
+            config = tomllib.load(f).get("soporte", {})
+    cartero = crear_cartero(config, hilo=False)
+    buzon = cartero.buzon
+
+    if args.accion == "reintentar":
+        print(f"🔁 {buzon.reintentar()} mensajes vuelven a la cola")
+    elif args.accion == "repartir":
+        if cartero.transporte is None:
+            raise SystemExit("Falta [soporte] servidor (o carpeta) en secrets.toml")
+        print(f"📨 {cartero.repartir()} mensajes enviados")
+
+    estado = buzon.estado()
+    print(" · ".join(f"{clave}: {estado.get(clave, 0)}" for clave in ("pendientes", "enviados", "fallidos")))
+    if estado.get("fallidos"):
+        print(f"⚠️  Los fallidos han agotado {MAX_INTENTOS} intentos: revisa [soporte] y usa 'reintentar'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import os
+import tomllib
+
+from supabase import create_client
+
+# --- CLIENTE CON SERVICE KEY PARA LOS COMANDOS ---
+# Lee SUPABASE_URL / SUPABASE_SERVICE_KEY del entorno o, si no están,
+# [supabase] url / service_key de .streamlit/secrets.toml.
+
+SECRETS = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".streamlit", "secrets.toml")
+
+
+def cliente_servicio():
+    url = os.environ.get("SUPABASE_URL")
+    key = os.environ.get("SUPABASE_SERVICE_KEY")
+    if not (url and key) and os.path.exists(SECRETS):
+        with open(SECRETS, "rb") as f:
+            conf = tomllib.load(f).get("supabase", {})
+        url = url or conf.get("url")
+        key = key or conf.get("service_key")
+    if not (url and key):
+        raise SystemExit("Faltan SUPABASE_URL y SUPABASE_SERVICE_KEY (o [supabase] service_key en secrets.toml)")
+    return create_client(url, key)
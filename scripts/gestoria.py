@@ -0,0 +1,39 @@
+import argparse
+
+from scripts.conexion import cliente_servicio
+
+# --- VÍNCULOS GESTORÍA -> CLIENTES ---
+#   python -m scripts.gestoria vincular --gestor <uuid> --cliente <uuid> [--alias "Nombre"]
+#   python -m scripts.gestoria desvincular --gestor <uuid> --cliente <uuid>
+#   python -m scripts.gestoria listar --gestor <uuid>
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Da de alta o de baja clientes en la cartera de una gestoría.")
+    parser.add_argument("accion", choices=["vincular", "desvincular", "listar"])
+    parser.add_argument("--gestor", required=True, help="user_id de la cuenta de la gestoría")
+    parser.add_argument("--cliente", help="user_id del cliente")
+    parser.add_argument("--alias", help="nombre con el que aparece en la cartera")
+    args = parser.parse_args()
+
+    if args.accion != "listar" and not args.cliente:
+        parser.error(f"{args.accion} necesita --cliente")
+
+    client = cliente_servicio()
+    tabla = client.table("gestor_clientes")
+
+    if args.accion == "vincular":
+        tabla.upsert({"gestor_id": args.gestor, "cliente_id": args.cliente, "alias": args.alias}).execute()
+        print(f"✅ {args.alias or args.cliente} añadido a la cartera")
+    elif args.accion == "desvincular":
+        resp = tabla.delete().eq("gestor_id", args.gestor).eq("cliente_id", args.cliente).execute()
+        print("✅ Cliente quitado de la cartera" if resp.data else "ℹ️ Ese cliente no estaba en la cartera")
+    else:
+        resp = tabla.select("cliente_id, alias, creado_en").eq("gestor_id", args.gestor).order("alias").execute()
+        for v in resp.data or []:
+            print(f"{v['cliente_id']}  {v['alias'] or '-':30}  desde {v['creado_en'][:10]}")
+        print(f"{len(resp.data or [])} clientes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import argparse
+
+from scripts.conexion import cliente_servicio
+
+# --- LIMPIEZA DE JUSTIFICANTES ---
+#   python -m scripts.justificantes purgar [--dias 30]
+#
+# Borra del bucket y de la tabla los justificantes cuyo gasto ya no existe y
+# que tienen más de --dias (mientras tanto, "Deshacer" los recupera con el
+# gasto). Solo para Supabase Storage; con [justificantes] carpeta basta con
+# borrar los archivos a mano.
+
+LOTE = 100  # rutas por petición al Storage
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Borra los justificantes de gastos que ya no existen.")
+    parser.add_argument("accion", choices=["purgar"])
+    parser.add_argument("--dias", type=int, default=30)
+    args = parser.parse_args()
+
+    client = cliente_servicio()
+    huerfanos = client.rpc("justificantes_huerfanos", {"p_dias": args.dias}).execute().data or []
+    rutas = [r for h in huerfanos for r in (h["ruta"], h["miniatura"]) if r]
+    bucket = client.storage.from_("justificantes")
+    for i in range(0, len(rutas), LOTE):
+        bucket.remove(rutas[i:i + LOTE])
+    ids = [h["gasto_id"] for h in huerfanos]
+    for i in range(0, len(ids), LOTE):
+        client.table("justificantes").delete().in_("gasto_id", ids[i:i + LOTE]).execute()
+    print(f"🧹 {len(huerfanos)} justificantes borrados ({len(rutas)} archivos)")
+
+
+if __name__ == "__main__":
+    main()
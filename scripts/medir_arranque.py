@@ -0,0 +1,83 @@
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+
+# --- PRESUPUESTO DE ARRANQUE POR PÁGINA ---
+# Ejecuta cada página en un proceso nuevo (arranque en frío) con AppTest, sin
+# sesión iniciada, y mide:
+#   - primer_pintado_ms: lo que tarda la primera ejecución completa del script
+#   - pesados: módulos pesados que la página ha importado (pandas, plotly...)
+# Sale con código 1 si alguna página se pasa de su presupuesto o si carga
+# algún módulo pesado antes de tener sesión (todo eso va en core.arranque.perezoso).
+#
+#   python -m scripts.medir_arranque            # tabla + comprobación
+#   python -m scripts.medir_arranque --json     # salida para guardar/comparar
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PESADOS = ('pandas', 'numpy', 'plotly', 'supabase', 'pyarrow', 'openpyxl')
+PERMITIDOS = ('numpy',)  # set_page_config lo importa para el favicon (logo)
+
+# Milisegundos de primer pintado en frío (medidos en un portátil normal + margen)
+PRESUPUESTO_MS = 600
+PRESUPUESTOS_MS = {
+    'app.py': 800,
+}
+
+_MEDIDOR = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+antes = set(sys.modules)
+t0 = time.perf_counter()
+at = AppTest.from_file({pagina!r}, default_timeout=60)
+at.secrets['supabase'] = {{'url': 'http://127.0.0.1:9', 'key': 'medicion'}}
+at.run()
+t1 = time.perf_counter()
+nuevos = set(sys.modules) - antes
+print(json.dumps({{
+    'primer_pintado_ms': round((t1 - t0) * 1000, 1),
+    'pesados': sorted(p for p in {pesados!r} if p in nuevos),
+    'error': [str(e.value) for e in at.exception],
+}}))
+"""
+
+
+def medir(pagina):
+    codigo = _MEDIDOR.format(pagina=os.path.join(RAIZ, pagina), pesados=PESADOS)
+    resp = subprocess.run([sys.executable, '-c', codigo], cwd=RAIZ, capture_output=True, text=True)
+    if resp.returncode != 0:
+        return {'primer_pintado_ms': None, 'pesados': [], 'error': [resp.stderr.strip()[-500:]]}
+    return json.loads(resp.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide el arranque en frío de cada página.")
+    parser.add_argument('--json', action='store_true', help="imprime los resultados en JSON")
+    args = parser.parse_args()
+
+    paginas = ['app.py'] + sorted(os.path.relpath(p, RAIZ) for p in glob.glob(os.path.join(RAIZ, 'pages', '*.py')))
+    resultados = {p: medir(p) for p in paginas}
+
+    if args.json:
+        print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    fuera = []
+    for pagina, r in resultados.items():
+        limite = PRESUPUESTOS_MS.get(pagina, PRESUPUESTO_MS)
+        ms = r['primer_pintado_ms']
+        sobran = [m for m in r['pesados'] if m not in PERMITIDOS]
+        ok = ms is not None and ms <= limite and not r['error'] and not sobran
+        if not ok:
+            fuera.append(pagina)
+        if not args.json:
+            print(f"{'✅' if ok else '❌'} {pagina:45} {ms if ms is not None else '-':>8} ms "
+                  f"(límite {limite}) pesados={','.join(r['pesados']) or '-'}"
+                  + (f" error={r['error'][0][:80]}" if r['error'] else ""))
+    if fuera:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import argparse
+
+from scripts.conexion import cliente_servicio
+
+# --- CERRAR / REABRIR PERIODOS (rollup_mensual + bloqueo) ---
+#   python -m scripts.periodos cerrar --user <uuid> --anio 2025 [--trimestre 2]
+#   python -m scripts.periodos reabrir --user <uuid> --anio 2025 [--trimestre 3]
+#   python -m scripts.periodos reabrir --user <uuid> --todo
+#   python -m scripts.periodos verificar [--user <uuid>]
+#
+# Cerrar un trimestre cierra también los anteriores (sin --trimestre, el año
+# entero); reabrir uno reabre también los posteriores (sin --trimestre, desde
+# el 1T). Lo anterior al trimestre reabierto sigue cerrado aunque no tenga
+# facturas; --todo quita el cierre entero. Los rollups de los meses
+# afectados se rehacen o se quitan.
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cierra o reabre periodos fiscales ya presentados.")
+    parser.add_argument("accion", choices=["cerrar", "reabrir", "verificar"])
+    parser.add_argument("--user", help="user_id (obligatorio para cerrar/reabrir)")
+    parser.add_argument("--anio", type=int)
+    parser.add_argument("--trimestre", type=int, choices=[1, 2, 3, 4])
+    parser.add_argument("--todo", action="store_true", help="reabrir: quita el cierre entero")
+    args = parser.parse_args()
+
+    if args.accion != "verificar" and not args.user:
+        parser.error("cerrar y reabrir necesitan --user")
+    if args.accion == "reabrir" and args.todo:
+        if args.anio or args.trimestre:
+            parser.error("--todo no va con --anio ni --trimestre")
+    elif args.accion != "verificar" and not args.anio:
+        parser.error("cerrar y reabrir necesitan --anio (o reabrir --todo)")
+
+    client = cliente_servicio()
+
+    if args.accion == "cerrar":
+        params = {"p_user_id": args.user, "p_anio": args.anio, "p_trimestre": args.trimestre or 4}
+        resp = client.rpc("cerrar_periodo", params).execute()
+        print(f"🔒 Cerrado hasta el {resp.data}")
+    elif args.accion == "reabrir":
+        params = {"p_user_id": args.user, "p_anio": None if args.todo else args.anio,
+                  "p_trimestre": args.trimestre or 1}
+        resp = client.rpc("reabrir_periodo", params).execute()
+        print(f"🔓 Cerrado ahora hasta el {resp.data}" if resp.data else "🔓 No queda ningún periodo cerrado")
+
+    resp = client.rpc("verificar_rollup_mensual", {"p_user_id": args.user}).execute()
+    if not resp.data:
+        print("✅ Los rollups de los meses cerrados cuadran con ingresos y gastos")
+        return
+    for d in resp.data:
+        print(f"❌ {d['user_id']} {d['mes']} {d['campo']}: rollup={d['en_rollup']} esperado={d['esperado']}")
+    raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
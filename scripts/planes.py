@@ -0,0 +1,42 @@
+import argparse
+import datetime
+
+from scripts.conexion import cliente_servicio
+
+# --- PLANES DE SUSCRIPCIÓN ---
+#   python -m scripts.planes asignar --user <uuid> --plan normal
+#   python -m scripts.planes uso --user <uuid>
+#
+# El plan decide cuántos registros puede dar de alta cada usuario (ver
+# supabase/migrations/20261018000700_cuotas.sql). La app tiene los contadores
+# en caché unos minutos: el cambio de plan se nota como mucho en CACHE_TTL.
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Asigna planes y consulta el uso de cada usuario.")
+    parser.add_argument("accion", choices=["asignar", "uso"])
+    parser.add_argument("--user", required=True, help="user_id")
+    parser.add_argument("--plan", choices=["gratis", "normal", "pro"])
+    args = parser.parse_args()
+
+    client = cliente_servicio()
+
+    if args.accion == "asignar":
+        if not args.plan:
+            parser.error("asignar necesita --plan")
+        client.table("suscripciones").upsert(
+            {"user_id": args.user, "plan": args.plan, "actualizado_en": datetime.datetime.now(datetime.timezone.utc).isoformat()}, on_conflict="user_id"
+        ).execute()
+        print(f"💎 Plan {args.plan.upper()} asignado a {args.user}")
+        return
+
+    resp = client.table("uso_mensual").select("mes, altas, bajas").eq("user_id", args.user).order("mes").execute()
+    plan = client.table("suscripciones").select("plan").eq("user_id", args.user).execute().data
+    print(f"💎 Plan {(plan[0]['plan'] if plan else 'gratis').upper()}")
+    for fila in resp.data or []:
+        print(f"   {fila['mes'][:7]}  {fila['altas']:>6} altas  {fila['bajas']:>6} borradas")
+    print(f"   Total  {sum(f['altas'] for f in resp.data or []):>6} altas")
+
+
+if __name__ == "__main__":
+    main()
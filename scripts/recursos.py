@@ -0,0 +1,139 @@
+import argparse
+import glob
+import hashlib
+import io
+import json
+import os
+import shutil
+
+from PIL import Image
+
+# --- RECURSOS ESTÁTICOS (IMÁGENES Y FUENTES) ---
+#   python -m scripts.recursos                              # rehace las imágenes
+#   python -m scripts.recursos --inter InterVariable.woff2  # y el subconjunto de Inter
+#
+# Genera en static/ (servido por Streamlit en app/static/, ver
+# .streamlit/config.toml) las variantes de las imágenes de la portada en
+# AVIF, WebP y JPEG a los anchos que de verdad se pintan, y un subconjunto
+# de Inter (latín + €, variable de 300 a 800) en WOFF2. Los nombres llevan
+# el hash del contenido (revolut-320.3fa2c9d1e0.avif): se pueden cachear
+# para siempre, y al regenerarlos cambia la URL. static/recursos.json dice
+# qué fichero corresponde a cada cosa (lo lee core/recursos.py).
+#
+# Las fuentes necesitan fonttools y brotli (pip install fonttools brotli),
+# solo para generarlas. Inter: https://github.com/rsms/inter (licencia OFL,
+# se copia a static/fonts/).
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC = os.path.join(RAIZ, "static")
+MANIFIESTO = os.path.join(STATIC, "recursos.json")
+
+# nombre -> (original, anchos en px; el doble del tamaño en pantalla para pantallas retina)
+IMAGENES = {
+    "revolut": ("revolut.jpg", (320, 640)),
+    "logo": ("logo.jpg", (64,)),       # favicon
+}
+CALIDAD = {"avif": 55, "webp": 78, "jpg": 82}
+
+# Mismo rango "latin" que sirve Google Fonts
+LATIN = [*range(0x20, 0x7F), *range(0xA0, 0x100), 0x131, 0x152, 0x153, 0x2BB, 0x2BC, 0x2C6, 0x2DA, 0x2DC,
+         *range(0x2000, 0x2070), 0x2074, 0x20AC, 0x2122, 0x2191, 0x2193, 0x2212, 0x2215, 0xFEFF, 0xFFFD]
+PESOS = (300, 800)  # los que usa core/estilos.py
+
+
+def _guardar(carpeta, base, extension, datos):
+    # Escribe static/<carpeta>/<base>.<hash>.<extensión> y devuelve la ruta relativa a static/
+    nombre = f"{base}.{hashlib.sha256(datos).hexdigest()[:10]}.{extension}"
+    os.makedirs(os.path.join(STATIC, carpeta), exist_ok=True)
+    with open(os.path.join(STATIC, carpeta, nombre), "wb") as f:
+        f.write(datos)
+    return f"{carpeta}/{nombre}"
+
+
+def _codificar(img, formato):
+    salida = io.BytesIO()
+    if formato == "jpg":
+        img.save(salida, "JPEG", quality=CALIDAD["jpg"], optimize=True, progressive=True)
+    elif formato == "webp":
+        img.save(salida, "WEBP", quality=CALIDAD["webp"], method=6)
+    else:
+        img.save(salida, "AVIF", quality=CALIDAD["avif"])
+    return salida.getvalue()
+
+
+def imagenes():
+    resultado = {}
+    for nombre, (original, anchos) in IMAGENES.items():
+        with Image.open(os.path.join(RAIZ, original)) as img:
+            img = img.convert("RGB")
+            entrada = {"ancho": img.width, "alto": img.height, "variantes": {f: {} for f in CALIDAD}}
+            for ancho in anchos:
+                ancho = min(ancho, img.width)
+                reducida = img.resize((ancho, round(img.height * ancho / img.width)), Image.Resampling.LANCZOS)
+                for formato in CALIDAD:
+                    datos = _codificar(reducida, formato)
+                    entrada["variantes"][formato][str(ancho)] = _guardar("img", f"{nombre}-{ancho}", formato, datos)
+        resultado[nombre] = entrada
+        tamanos = {f: max(os.path.getsize(os.path.join(STATIC, r)) for r in v.values())
+                   for f, v in entrada["variantes"].items()}
+        print(f"🖼️  {original} ({os.path.getsize(os.path.join(RAIZ, original)) // 1024} KB) -> "
+              + " · ".join(f"{f} {t // 1024} KB" for f, t in tamanos.items()) + f" (a {max(anchos)} px)")
+    return resultado
+
+
+def fuentes(origen):
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+    from fontTools.varLib import instancer
+
+    fuente = TTFont(origen)
+    opciones = subset.Options()
+    opciones.name_IDs = [0, 1, 2, 3, 4, 5, 6, 13, 14]  # con el copyright y la licencia
+    subconjunto = subset.Subsetter(opciones)
+    subconjunto.populate(unicodes=LATIN)
+    subconjunto.subset(fuente)
+    # opsz fijo (tamaño de texto) y wght solo en el rango que se usa: menos tablas de variación
+    fuente = instancer.instantiateVariableFont(fuente, {"opsz": 14, "wght": PESOS})
+    salida = io.BytesIO()
+    fuente.flavor = "woff2"
+    fuente.save(salida)
+    ruta = _guardar("fonts", "inter-latin", "woff2", salida.getvalue())
+    licencia = os.path.join(os.path.dirname(os.path.abspath(origen)), "LICENSE.txt")
+    if os.path.exists(licencia):
+        shutil.copy(licencia, os.path.join(STATIC, "fonts", "LICENSE.txt"))
+    print(f"🔤 {os.path.basename(origen)} ({os.path.getsize(origen) // 1024} KB) -> "
+          f"{ruta} ({len(salida.getvalue()) // 1024} KB)")
+    return {"inter": {"fichero": ruta, "pesos": list(PESOS)}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera las variantes de imágenes y fuentes de static/.")
+    parser.add_argument("--inter", help="Inter variable (.ttf o .woff2) de la que sacar el subconjunto")
+    args = parser.parse_args()
+
+    anterior = {}
+    if os.path.exists(MANIFIESTO):
+        with open(MANIFIESTO, encoding="utf-8") as f:
+            anterior = json.load(f)
+
+    manifiesto = {
+        "img": imagenes(),
+        "fuentes": fuentes(args.inter) if args.inter else anterior.get("fuentes", {}),
+    }
+
+    # Fuera las versiones anteriores que ya no usa nadie
+    vivas = {r for i in manifiesto["img"].values() for v in i["variantes"].values() for r in v.values()}
+    vivas |= {f["fichero"] for f in manifiesto["fuentes"].values()}
+    for carpeta, patron in (("img", "*.*.*"), ("fonts", "*.woff2")):
+        for fichero in glob.glob(os.path.join(STATIC, carpeta, patron)):
+            if os.path.relpath(fichero, STATIC).replace(os.sep, "/") not in vivas:
+                os.remove(fichero)
+
+    with open(MANIFIESTO, "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    print(f"✅ {os.path.relpath(MANIFIESTO, RAIZ)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import argparse
+
+from scripts.conexion import cliente_servicio
+
+# --- VERIFICAR / RECONSTRUIR EL LIBRO resumen_trimestral ---
+#   python -m scripts.resumen_trimestral verificar [--user <uuid>]
+#   python -m scripts.resumen_trimestral reconstruir [--user <uuid>]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comprueba el libro de totales trimestrales contra ingresos/gastos.")
+    parser.add_argument("accion", choices=["verificar", "reconstruir"])
+    parser.add_argument("--user", help="user_id concreto (por defecto, todos)")
+    args = parser.parse_args()
+
+    client = cliente_servicio()
+    params = {"p_user_id": args.user}
+
+    if args.accion == "reconstruir":
+        resp = client.rpc("reconstruir_resumen_trimestral", params).execute()
+        print(f"✅ Libro reconstruido ({resp.data} filas)")
+
+    resp = client.rpc("verificar_resumen_trimestral", params).execute()
+    if not resp.data:
+        print("✅ El libro cuadra con las tablas de ingresos y gastos")
+        return
+    for d in resp.data:
+        print(f"❌ {d['user_id']} {d['anio']}T{d['trimestre']} {d['campo']}: "
+              f"libro={d['en_libro']} esperado={d['esperado']}")
+    raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
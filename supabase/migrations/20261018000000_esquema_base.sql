@@ -0,0 +1,43 @@
+-- Esquema base de la app (tal y como lo usan las páginas de /pages).
+-- Es idempotente para poder aplicarlo sobre la base de datos existente o
+-- sobre una instancia local (`supabase start` + `supabase db reset`).
+
+create table if not exists public.ingresos (
+    id          bigint generated by default as identity primary key,
+    user_id     uuid not null references auth.users (id) on delete cascade,
+    fecha       date not null,
+    cliente     text,
+    base        numeric not null default 0,
+    iva_pct     integer not null default 0,
+    cuota_iva   numeric not null default 0,
+    irpf_pct    integer not null default 0,
+    retencion   numeric not null default 0,
+    total       numeric not null default 0,
+    created_at  timestamptz not null default now()
+);
+
+create table if not exists public.gastos (
+    id          bigint generated by default as identity primary key,
+    user_id     uuid not null references auth.users (id) on delete cascade,
+    fecha       date not null,
+    proveedor   text,
+    categoria   text,
+    base        numeric not null default 0,
+    iva_pct     integer not null default 0,
+    cuota_iva   numeric not null default 0,
+    irpf_pct    integer not null default 0,
+    retencion   numeric not null default 0,
+    total       numeric not null default 0,
+    created_at  timestamptz not null default now()
+);
+
+alter table public.ingresos enable row level security;
+alter table public.gastos enable row level security;
+
+drop policy if exists "ingresos propios" on public.ingresos;
+create policy "ingresos propios" on public.ingresos
+    for all using (auth.uid() = user_id) with check (auth.uid() = user_id);
+
+drop policy if exists "gastos propios" on public.gastos;
+create policy "gastos propios" on public.gastos
+    for all using (auth.uid() = user_id) with check (auth.uid() = user_id);
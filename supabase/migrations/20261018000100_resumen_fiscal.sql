@@ -0,0 +1,62 @@
+-- Totales fiscales calculados en la base de datos.
+-- Devuelve una fila de sumas por periodo ('total', 'year', 'quarter', 'month')
+-- para que el Dashboard no tenga que descargar todas las facturas.
+--
+--   select * from resumen_fiscal('<uuid>', 'quarter', '2025-01-01', '2025-12-31');
+--
+-- Es SECURITY INVOKER: la RLS de ingresos/gastos sigue aplicándose, así que
+-- un usuario solo puede sumar sus propias filas aunque pase otro user_id.
+
+create index if not exists ingresos_user_fecha_idx on public.ingresos (user_id, fecha);
+create index if not exists gastos_user_fecha_idx on public.gastos (user_id, fecha);
+
+create or replace function public.resumen_fiscal(
+    p_user_id uuid,
+    p_periodo text default 'total',
+    p_desde date default null,
+    p_hasta date default null
+)
+returns table (
+    periodo        date,
+    base_ingresos  numeric,
+    iva_rep        numeric,
+    ret_sop        numeric,
+    base_gastos    numeric,
+    iva_sop        numeric,
+    ret_prac       numeric
+)
+language sql
+stable
+security invoker
+as $$
+    with movimientos as (
+        select fecha,
+               base as base_ingresos, cuota_iva as iva_rep, retencion as ret_sop,
+               0::numeric as base_gastos, 0::numeric as iva_sop, 0::numeric as ret_prac
+        from public.ingresos
+        where user_id = p_user_id
+          and (p_desde is null or fecha >= p_desde)
+          and (p_hasta is null or fecha <= p_hasta)
+        union all
+        select fecha,
+               0, 0, 0,
+               base, cuota_iva, retencion
+        from public.gastos
+        where user_id = p_user_id
+          and (p_desde is null or fecha >= p_desde)
+          and (p_hasta is null or fecha <= p_hasta)
+    )
+    select case when p_periodo = 'total' then null
+                else date_trunc(p_periodo, fecha)::date end as periodo,
+           coalesce(sum(base_ingresos), 0),
+           coalesce(sum(iva_rep), 0),
+           coalesce(sum(ret_sop), 0),
+           coalesce(sum(base_gastos), 0),
+           coalesce(sum(iva_sop), 0),
+           coalesce(sum(ret_prac), 0)
+    from movimientos
+    group by 1
+    order by 1;
+$$;
+
+grant execute on function public.resumen_fiscal(uuid, text, date, date) to authenticated;
@@ -0,0 +1,187 @@
+-- Libro de totales por usuario y trimestre.
+-- Lo mantienen los triggers de ingresos/gastos en cada alta, baja o edición,
+-- así las tarjetas fiscales leen como mucho 4 filas por año en vez de
+-- sumar todas las facturas.
+--
+-- Comprobación / reconstrucción (con la service key):
+--   python -m scripts.resumen_trimestral verificar
+--   python -m scripts.resumen_trimestral reconstruir [--user <uuid>]
+
+create table if not exists public.resumen_trimestral (
+    user_id        uuid not null references auth.users (id) on delete cascade,
+    anio           smallint not null,
+    trimestre      smallint not null check (trimestre between 1 and 4),
+    n_ingresos     integer not null default 0,
+    base_ingresos  numeric not null default 0,
+    iva_rep        numeric not null default 0,
+    ret_sop        numeric not null default 0,
+    n_gastos       integer not null default 0,
+    base_gastos    numeric not null default 0,
+    iva_sop        numeric not null default 0,
+    ret_prac       numeric not null default 0,
+    primary key (user_id, anio, trimestre)
+);
+
+alter table public.resumen_trimestral enable row level security;
+
+-- Los usuarios solo leen; las escrituras las hacen los triggers (security definer)
+drop policy if exists "resumen propio" on public.resumen_trimestral;
+create policy "resumen propio" on public.resumen_trimestral
+    for select using (auth.uid() = user_id);
+
+
+create or replace function public._acumular_resumen(
+    p_tabla text, p_user_id uuid, p_fecha date, p_signo integer,
+    p_base numeric, p_cuota_iva numeric, p_retencion numeric
+)
+returns void
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_anio smallint := extract(year from p_fecha);
+    v_trim smallint := extract(quarter from p_fecha);
+begin
+    if p_tabla = 'ingresos' then
+        insert into resumen_trimestral as r
+            (user_id, anio, trimestre, n_ingresos, base_ingresos, iva_rep, ret_sop)
+        values (p_user_id, v_anio, v_trim, p_signo,
+                p_signo * p_base, p_signo * p_cuota_iva, p_signo * p_retencion)
+        on conflict (user_id, anio, trimestre) do update set
+            n_ingresos    = r.n_ingresos + excluded.n_ingresos,
+            base_ingresos = r.base_ingresos + excluded.base_ingresos,
+            iva_rep       = r.iva_rep + excluded.iva_rep,
+            ret_sop       = r.ret_sop + excluded.ret_sop;
+    else
+        insert into resumen_trimestral as r
+            (user_id, anio, trimestre, n_gastos, base_gastos, iva_sop, ret_prac)
+        values (p_user_id, v_anio, v_trim, p_signo,
+                p_signo * p_base, p_signo * p_cuota_iva, p_signo * p_retencion)
+        on conflict (user_id, anio, trimestre) do update set
+            n_gastos    = r.n_gastos + excluded.n_gastos,
+            base_gastos = r.base_gastos + excluded.base_gastos,
+            iva_sop     = r.iva_sop + excluded.iva_sop,
+            ret_prac    = r.ret_prac + excluded.ret_prac;
+    end if;
+end;
+$$;
+
+revoke all on function public._acumular_resumen(text, uuid, date, integer, numeric, numeric, numeric) from public, anon, authenticated;
+
+
+create or replace function public.resumen_trimestral_trg()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        perform _acumular_resumen(tg_table_name, old.user_id, old.fecha, -1,
+                                  old.base, old.cuota_iva, old.retencion);
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        perform _acumular_resumen(tg_table_name, new.user_id, new.fecha, 1,
+                                  new.base, new.cuota_iva, new.retencion);
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists ingresos_resumen on public.ingresos;
+create trigger ingresos_resumen
+    after insert or update or delete on public.ingresos
+    for each row execute function public.resumen_trimestral_trg();
+
+drop trigger if exists gastos_resumen on public.gastos;
+create trigger gastos_resumen
+    after insert or update or delete on public.gastos
+    for each row execute function public.resumen_trimestral_trg();
+
+
+-- Totales recalculados desde las tablas crudas (lo que el libro debería contener)
+create or replace view public.resumen_trimestral_esperado
+with (security_invoker = true) as
+    select user_id, anio, trimestre,
+           sum(n_ingresos)::integer as n_ingresos, sum(base_ingresos) as base_ingresos,
+           sum(iva_rep) as iva_rep, sum(ret_sop) as ret_sop,
+           sum(n_gastos)::integer as n_gastos, sum(base_gastos) as base_gastos,
+           sum(iva_sop) as iva_sop, sum(ret_prac) as ret_prac
+    from (
+        select user_id, extract(year from fecha)::smallint as anio,
+               extract(quarter from fecha)::smallint as trimestre,
+               1 as n_ingresos, base as base_ingresos, cuota_iva as iva_rep, retencion as ret_sop,
+               0 as n_gastos, 0::numeric as base_gastos, 0::numeric as iva_sop, 0::numeric as ret_prac
+        from public.ingresos
+        union all
+        select user_id, extract(year from fecha)::smallint, extract(quarter from fecha)::smallint,
+               0, 0, 0, 0,
+               1, base, cuota_iva, retencion
+        from public.gastos
+    ) m
+    group by user_id, anio, trimestre;
+
+
+-- Filas donde el libro no cuadra con las tablas crudas (vacío = todo correcto)
+create or replace function public.verificar_resumen_trimestral(p_user_id uuid default null)
+returns table (
+    user_id uuid, anio smallint, trimestre smallint,
+    campo text, en_libro numeric, esperado numeric
+)
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    with l as (
+        select * from resumen_trimestral where p_user_id is null or user_id = p_user_id
+    ), e as (
+        select * from resumen_trimestral_esperado where p_user_id is null or user_id = p_user_id
+    ), cruce as (
+        select coalesce(l.user_id, e.user_id) as user_id,
+               coalesce(l.anio, e.anio) as anio,
+               coalesce(l.trimestre, e.trimestre) as trimestre,
+               array[coalesce(l.n_ingresos, 0), coalesce(l.base_ingresos, 0), coalesce(l.iva_rep, 0),
+                     coalesce(l.ret_sop, 0), coalesce(l.n_gastos, 0), coalesce(l.base_gastos, 0),
+                     coalesce(l.iva_sop, 0), coalesce(l.ret_prac, 0)]::numeric[] as libro,
+               array[coalesce(e.n_ingresos, 0), coalesce(e.base_ingresos, 0), coalesce(e.iva_rep, 0),
+                     coalesce(e.ret_sop, 0), coalesce(e.n_gastos, 0), coalesce(e.base_gastos, 0),
+                     coalesce(e.iva_sop, 0), coalesce(e.ret_prac, 0)]::numeric[] as calc
+        from l full outer join e using (user_id, anio, trimestre)
+    )
+    select c.user_id, c.anio, c.trimestre, k.campo, c.libro[k.i], c.calc[k.i]
+    from cruce c
+    cross join unnest(array['n_ingresos', 'base_ingresos', 'iva_rep', 'ret_sop',
+                            'n_gastos', 'base_gastos', 'iva_sop', 'ret_prac'])
+         with ordinality as k(campo, i)
+    where c.libro[k.i] <> c.calc[k.i]
+    order by 1, 2, 3, 4;
+$$;
+
+
+-- Vuelve a generar el libro desde cero (de un usuario o de todos)
+create or replace function public.reconstruir_resumen_trimestral(p_user_id uuid default null)
+returns integer
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_filas integer;
+begin
+    delete from resumen_trimestral where p_user_id is null or user_id = p_user_id;
+    insert into resumen_trimestral
+    select * from resumen_trimestral_esperado where p_user_id is null or user_id = p_user_id;
+    get diagnostics v_filas = row_count;
+    return v_filas;
+end;
+$$;
+
+revoke all on function public.verificar_resumen_trimestral(uuid) from public, anon, authenticated;
+revoke all on function public.reconstruir_resumen_trimestral(uuid) from public, anon, authenticated;
+grant execute on function public.verificar_resumen_trimestral(uuid) to service_role;
+grant execute on function public.reconstruir_resumen_trimestral(uuid) to service_role;
+
+-- Carga inicial con los datos que ya existen
+select public.reconstruir_resumen_trimestral();
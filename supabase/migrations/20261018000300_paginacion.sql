@@ -0,0 +1,9 @@
+-- Índices para la paginación por cursor (fecha, id) de las tablas de
+-- Ingresos/Gastos: cada página es un "index range scan" de N filas,
+-- da igual en qué página estés. Sustituyen a los de (user_id, fecha).
+
+drop index if exists public.ingresos_user_fecha_idx;
+drop index if exists public.gastos_user_fecha_idx;
+
+create index if not exists ingresos_user_fecha_id_idx on public.ingresos (user_id, fecha desc, id desc);
+create index if not exists gastos_user_fecha_id_idx on public.gastos (user_id, fecha desc, id desc);
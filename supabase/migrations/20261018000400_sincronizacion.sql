@@ -0,0 +1,189 @@
+-- Sincronización incremental de la réplica local (core/espejo.py).
+-- Cada fila de ingresos/gastos lleva la hora de su última escritura
+-- (updated_at, la pone siempre la base de datos) y cada borrado deja una
+-- "lápida" en la tabla borrados. Así la réplica solo pide lo que ha
+-- cambiado desde su última marca:
+--
+--   select * from ingresos where user_id = $1 and updated_at >= $marca
+--   select * from borrados where user_id = $1 and borrado_en >= $marca
+--
+-- Las lápidas de más de 30 días se pueden purgar (una réplica más antigua
+-- que eso se vuelve a llenar desde cero):
+--   select purgar_borrados(30);
+
+alter table public.ingresos add column if not exists updated_at timestamptz not null default now();
+alter table public.gastos add column if not exists updated_at timestamptz not null default now();
+
+create index if not exists ingresos_user_updated_idx on public.ingresos (user_id, updated_at, id);
+create index if not exists gastos_user_updated_idx on public.gastos (user_id, updated_at, id);
+
+
+-- clock_timestamp() y no now(): dentro de una importación larga cada fila
+-- lleva su propia hora y no la del inicio de la transacción
+create or replace function public.marcar_actualizado_trg()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := clock_timestamp();
+    return new;
+end;
+$$;
+
+drop trigger if exists ingresos_actualizado on public.ingresos;
+create trigger ingresos_actualizado
+    before insert or update on public.ingresos
+    for each row execute function public.marcar_actualizado_trg();
+
+drop trigger if exists gastos_actualizado on public.gastos;
+create trigger gastos_actualizado
+    before insert or update on public.gastos
+    for each row execute function public.marcar_actualizado_trg();
+
+
+create table if not exists public.borrados (
+    id          bigint generated by default as identity primary key,
+    user_id     uuid not null references auth.users (id) on delete cascade,
+    tabla       text not null check (tabla in ('ingresos', 'gastos')),
+    fila_id     bigint not null,
+    fila_creada timestamptz,   -- created_at de la fila, para restaurar_borrados()
+    borrado_en  timestamptz not null default clock_timestamp(),
+    unique (tabla, fila_id)
+);
+
+create index if not exists borrados_user_borrado_idx on public.borrados (user_id, borrado_en, id);
+
+alter table public.borrados enable row level security;
+
+-- Los usuarios solo leen sus lápidas; las escriben los triggers (security definer)
+drop policy if exists "borrados propios" on public.borrados;
+create policy "borrados propios" on public.borrados
+    for select using (auth.uid() = user_id);
+
+
+create or replace function public.lapidas_trg()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    -- Si se está borrando la cuenta entera no hay réplica que avisar. La
+    -- lápida de una fila que vuelve la quita restaurar_borrados().
+    insert into borrados (user_id, tabla, fila_id, fila_creada)
+    select old.user_id, tg_table_name, old.id, old.created_at
+    where exists (select 1 from auth.users u where u.id = old.user_id)
+    on conflict (tabla, fila_id) do update
+        set borrado_en = clock_timestamp(), fila_creada = excluded.fila_creada;
+    return old;
+end;
+$$;
+
+drop trigger if exists ingresos_lapidas on public.ingresos;
+create trigger ingresos_lapidas
+    after delete on public.ingresos
+    for each row execute function public.lapidas_trg();
+
+drop trigger if exists gastos_lapidas on public.gastos;
+create trigger gastos_lapidas
+    after delete on public.gastos
+    for each row execute function public.lapidas_trg();
+
+
+create or replace function public.purgar_borrados(p_dias integer default 30)
+returns integer
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_filas integer;
+begin
+    delete from borrados where borrado_en < now() - make_interval(days => p_dias);
+    get diagnostics v_filas = row_count;
+    return v_filas;
+end;
+$$;
+
+revoke all on function public.purgar_borrados(integer) from public, anon, authenticated;
+grant execute on function public.purgar_borrados(integer) to service_role;
+
+
+-- "Deshacer" un borrado (core/datos.restaurar). Los clientes no eligen el id
+-- ni el created_at de una fila (ver los permisos de abajo): una fila solo
+-- vuelve con su id si el usuario que llama tiene su lápida, y con el
+-- created_at que tenía. El resto de columnas sale de p_filas (las filas que
+-- devolvió el DELETE). Devuelve las filas restauradas y quita sus lápidas.
+create or replace function public.restaurar_borrados(p_tabla text, p_filas jsonb)
+returns jsonb
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_filas jsonb;
+begin
+    if p_tabla not in ('ingresos', 'gastos') then
+        raise exception 'Tabla no válida: %', p_tabla using errcode = 'invalid_parameter_value';
+    end if;
+    execute format($f$
+        with restauradas as (
+            insert into %1$I
+            select (jsonb_populate_record(null::%1$I, f || jsonb_build_object(
+                'id', b.fila_id, 'user_id', b.user_id, 'created_at', coalesce(b.fila_creada, b.borrado_en)))).*
+            from jsonb_array_elements($1) f
+            join borrados b on b.tabla = %1$L and b.fila_id = (f ->> 'id')::bigint and b.user_id = auth.uid()
+            returning *
+        )
+        select coalesce(jsonb_agg(to_jsonb(r)), '[]') from restauradas r
+    $f$, p_tabla) into v_filas using p_filas;
+    -- Después del insert: mientras tanto, la lápida dice a los triggers de
+    -- cuotas que la fila no es un alta nueva
+    delete from borrados
+    where tabla = p_tabla and fila_id in (select (f ->> 'id')::bigint from jsonb_array_elements(v_filas) f);
+    return v_filas;
+end;
+$$;
+
+revoke all on function public.restaurar_borrados(text, jsonb) from public, anon;
+grant execute on function public.restaurar_borrados(text, jsonb) to authenticated;
+
+-- id y created_at los pone siempre la base de datos. Elegir el id permitiría
+-- ocupar valores de la secuencia que tocan a otros usuarios (sus altas
+-- fallarían por clave duplicada) y el created_at decide el mes del cupo
+-- (migración de cuotas). Si se añade una columna que rellene el usuario,
+-- hay que añadirla aquí.
+revoke insert, update on public.ingresos from anon, authenticated;
+grant insert (user_id, fecha, cliente, base, iva_pct, cuota_iva, irpf_pct, retencion, total),
+      update (fecha, cliente, base, iva_pct, cuota_iva, irpf_pct, retencion, total)
+    on public.ingresos to authenticated;
+
+revoke insert, update on public.gastos from anon, authenticated;
+grant insert (user_id, fecha, proveedor, categoria, base, iva_pct, cuota_iva, irpf_pct, retencion, total),
+      update (fecha, proveedor, categoria, base, iva_pct, cuota_iva, irpf_pct, retencion, total)
+    on public.gastos to authenticated;
+
+
+-- Mismo caso en el libro trimestral: al borrar una cuenta, el cascade sobre
+-- ingresos/gastos no debe intentar descontar en un libro que ya no existe
+create or replace function public.resumen_trimestral_trg()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if tg_op = 'DELETE' and not exists (select 1 from auth.users u where u.id = old.user_id) then
+        return null;
+    end if;
+    if tg_op in ('UPDATE', 'DELETE') then
+        perform _acumular_resumen(tg_table_name, old.user_id, old.fecha, -1,
+                                  old.base, old.cuota_iva, old.retencion);
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        perform _acumular_resumen(tg_table_name, new.user_id, new.fecha, 1,
+                                  new.base, new.cuota_iva, new.retencion);
+    end if;
+    return null;
+end;
+$$;
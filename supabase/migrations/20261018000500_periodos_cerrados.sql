@@ -0,0 +1,306 @@
+-- Cierre de periodos: lo presentado ya no cambia.
+-- Cada usuario tiene como mucho una fecha de cierre (último día de un
+-- trimestre). Todo lo anterior queda bloqueado (altas, bajas y ediciones de
+-- ingresos/gastos con esa fecha fallan) y sus sumas por mes se guardan en
+-- rollup_mensual. resumen_fiscal lee esos meses del rollup y solo recorre
+-- las facturas del periodo abierto, así que los años ya cerrados no se
+-- vuelven a sumar en cada carga del Dashboard. Las sumas por trimestre ya
+-- están en resumen_trimestral y, con el periodo cerrado, tampoco cambian.
+--
+-- Cerrar un trimestre cierra también los anteriores; reabrirlo reabre
+-- también los posteriores (con la service key):
+--   python -m scripts.periodos cerrar --user <uuid> --anio 2025 [--trimestre 2]
+--   python -m scripts.periodos reabrir --user <uuid> --anio 2025 [--trimestre 3]
+--   python -m scripts.periodos reabrir --user <uuid> --todo
+--   python -m scripts.periodos verificar [--user <uuid>]
+
+create table if not exists public.periodos_cerrados (
+    user_id     uuid primary key references auth.users (id) on delete cascade,
+    hasta       date not null,
+    cerrado_en  timestamptz not null default now()
+);
+
+create table if not exists public.rollup_mensual (
+    user_id        uuid not null references auth.users (id) on delete cascade,
+    mes            date not null check (mes = date_trunc('month', mes)::date),
+    n_ingresos     integer not null default 0,
+    base_ingresos  numeric not null default 0,
+    iva_rep        numeric not null default 0,
+    ret_sop        numeric not null default 0,
+    n_gastos       integer not null default 0,
+    base_gastos    numeric not null default 0,
+    iva_sop        numeric not null default 0,
+    ret_prac       numeric not null default 0,
+    primary key (user_id, mes)
+);
+
+alter table public.periodos_cerrados enable row level security;
+alter table public.rollup_mensual enable row level security;
+
+-- Los usuarios solo leen; cierran y reabren los comandos (service key)
+drop policy if exists "cierre propio" on public.periodos_cerrados;
+create policy "cierre propio" on public.periodos_cerrados
+    for select using (auth.uid() = user_id);
+
+drop policy if exists "rollup propio" on public.rollup_mensual;
+create policy "rollup propio" on public.rollup_mensual
+    for select using (auth.uid() = user_id);
+
+
+-- Sumas por mes recalculadas desde las tablas crudas
+create or replace view public.rollup_mensual_esperado
+with (security_invoker = true) as
+    select user_id, mes,
+           sum(n_ingresos)::integer as n_ingresos, sum(base_ingresos) as base_ingresos,
+           sum(iva_rep) as iva_rep, sum(ret_sop) as ret_sop,
+           sum(n_gastos)::integer as n_gastos, sum(base_gastos) as base_gastos,
+           sum(iva_sop) as iva_sop, sum(ret_prac) as ret_prac
+    from (
+        select user_id, date_trunc('month', fecha)::date as mes,
+               1 as n_ingresos, base as base_ingresos, cuota_iva as iva_rep, retencion as ret_sop,
+               0 as n_gastos, 0::numeric as base_gastos, 0::numeric as iva_sop, 0::numeric as ret_prac
+        from public.ingresos
+        union all
+        select user_id, date_trunc('month', fecha)::date,
+               0, 0, 0, 0,
+               1, base, cuota_iva, retencion
+        from public.gastos
+    ) m
+    group by user_id, mes;
+
+
+-- Bloqueo: nada con fecha dentro del periodo cerrado se puede tocar
+create or replace function public.periodo_cerrado_trg()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_hasta date;
+begin
+    if tg_op = 'DELETE' and not exists (select 1 from auth.users u where u.id = old.user_id) then
+        return old;  -- se está borrando la cuenta entera
+    end if;
+    if tg_op in ('UPDATE', 'DELETE') then
+        select hasta into v_hasta from periodos_cerrados where user_id = old.user_id;
+        if old.fecha <= v_hasta then
+            raise exception 'El periodo hasta el % está cerrado: no se puede modificar ni borrar', to_char(v_hasta, 'DD/MM/YYYY')
+                using errcode = 'check_violation';
+        end if;
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        select hasta into v_hasta from periodos_cerrados where user_id = new.user_id;
+        if new.fecha <= v_hasta then
+            raise exception 'El periodo hasta el % está cerrado: no se pueden añadir registros con fecha %',
+                to_char(v_hasta, 'DD/MM/YYYY'), to_char(new.fecha, 'DD/MM/YYYY')
+                using errcode = 'check_violation';
+        end if;
+    end if;
+    return coalesce(new, old);
+end;
+$$;
+
+drop trigger if exists ingresos_periodo_cerrado on public.ingresos;
+create trigger ingresos_periodo_cerrado
+    before insert or update or delete on public.ingresos
+    for each row execute function public.periodo_cerrado_trg();
+
+drop trigger if exists gastos_periodo_cerrado on public.gastos;
+create trigger gastos_periodo_cerrado
+    before insert or update or delete on public.gastos
+    for each row execute function public.periodo_cerrado_trg();
+
+
+-- Cierra hasta el final del trimestre indicado (por defecto, el año entero)
+-- y genera los rollups de los meses que se cierran. Devuelve la fecha de cierre.
+create or replace function public.cerrar_periodo(p_user_id uuid, p_anio integer, p_trimestre integer default 4)
+returns date
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_hasta date := (make_date(p_anio, p_trimestre * 3, 1) + interval '1 month - 1 day')::date;
+    v_antes date;
+begin
+    if p_trimestre not between 1 and 4 then
+        raise exception 'Trimestre % no válido', p_trimestre;
+    end if;
+    select hasta into v_antes from periodos_cerrados where user_id = p_user_id for update;
+    if v_antes >= v_hasta then
+        return v_antes;  -- ya estaba cerrado
+    end if;
+
+    delete from rollup_mensual
+    where user_id = p_user_id and mes > coalesce(v_antes, '-infinity'::date) and mes <= v_hasta;
+    insert into rollup_mensual
+    select * from rollup_mensual_esperado
+    where user_id = p_user_id and mes > coalesce(v_antes, '-infinity'::date) and mes <= v_hasta;
+
+    insert into periodos_cerrados (user_id, hasta) values (p_user_id, v_hasta)
+    on conflict (user_id) do update set hasta = excluded.hasta, cerrado_en = now();
+    return v_hasta;
+end;
+$$;
+
+
+-- Reabre desde el principio del trimestre indicado (por defecto, el año
+-- entero) y quita los rollups de los meses reabiertos. Lo anterior sigue
+-- cerrado aunque no tenga facturas (y por tanto no tenga rollups): el cierre
+-- pasa al día antes del trimestre reabierto. Con p_anio null se reabre todo.
+-- Devuelve la nueva fecha de cierre (null si ya no queda nada cerrado).
+create or replace function public.reabrir_periodo(p_user_id uuid, p_anio integer, p_trimestre integer default 1)
+returns date
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_hasta date;
+    v_antes date;
+begin
+    if p_trimestre not between 1 and 4 then
+        raise exception 'Trimestre % no válido', p_trimestre;
+    end if;
+    select hasta into v_antes from periodos_cerrados where user_id = p_user_id for update;
+    if p_anio is null then
+        delete from rollup_mensual where user_id = p_user_id;
+        delete from periodos_cerrados where user_id = p_user_id;
+        return null;
+    end if;
+
+    v_hasta := make_date(p_anio, p_trimestre * 3 - 2, 1) - 1;
+    if v_antes is null or v_antes <= v_hasta then
+        return v_antes;  -- no estaba cerrado
+    end if;
+
+    delete from rollup_mensual where user_id = p_user_id and mes > v_hasta;
+    update periodos_cerrados set hasta = v_hasta, cerrado_en = now() where user_id = p_user_id;
+    return v_hasta;
+end;
+$$;
+
+
+-- Meses cerrados donde el rollup no cuadra con las tablas crudas (vacío = bien)
+create or replace function public.verificar_rollup_mensual(p_user_id uuid default null)
+returns table (user_id uuid, mes date, campo text, en_rollup numeric, esperado numeric)
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    with cerrados as (
+        select e.* from rollup_mensual_esperado e
+        join periodos_cerrados p on p.user_id = e.user_id and e.mes <= p.hasta
+        where p_user_id is null or e.user_id = p_user_id
+    ), r as (
+        select * from rollup_mensual where p_user_id is null or user_id = p_user_id
+    ), cruce as (
+        select coalesce(r.user_id, c.user_id) as user_id, coalesce(r.mes, c.mes) as mes,
+               array[coalesce(r.n_ingresos, 0), coalesce(r.base_ingresos, 0), coalesce(r.iva_rep, 0),
+                     coalesce(r.ret_sop, 0), coalesce(r.n_gastos, 0), coalesce(r.base_gastos, 0),
+                     coalesce(r.iva_sop, 0), coalesce(r.ret_prac, 0)]::numeric[] as rollup,
+               array[coalesce(c.n_ingresos, 0), coalesce(c.base_ingresos, 0), coalesce(c.iva_rep, 0),
+                     coalesce(c.ret_sop, 0), coalesce(c.n_gastos, 0), coalesce(c.base_gastos, 0),
+                     coalesce(c.iva_sop, 0), coalesce(c.ret_prac, 0)]::numeric[] as calc
+        from r full outer join cerrados c using (user_id, mes)
+    )
+    select x.user_id, x.mes, k.campo, x.rollup[k.i], x.calc[k.i]
+    from cruce x
+    cross join unnest(array['n_ingresos', 'base_ingresos', 'iva_rep', 'ret_sop',
+                            'n_gastos', 'base_gastos', 'iva_sop', 'ret_prac'])
+         with ordinality as k(campo, i)
+    where x.rollup[k.i] <> x.calc[k.i]
+    order by 1, 2, 3;
+$$;
+
+revoke all on function public.cerrar_periodo(uuid, integer, integer) from public, anon, authenticated;
+revoke all on function public.reabrir_periodo(uuid, integer, integer) from public, anon, authenticated;
+revoke all on function public.verificar_rollup_mensual(uuid) from public, anon, authenticated;
+grant execute on function public.cerrar_periodo(uuid, integer, integer) to service_role;
+grant execute on function public.reabrir_periodo(uuid, integer, integer) to service_role;
+grant execute on function public.verificar_rollup_mensual(uuid) to service_role;
+
+
+-- resumen_fiscal: los meses cerrados que caen enteros dentro del rango salen
+-- de rollup_mensual; las facturas solo se leen para el resto (el periodo
+-- abierto y, si el rango empieza o acaba a mitad de mes, esos bordes).
+-- Las semanas cruzan meses: con 'week' se suma siempre desde las facturas.
+create or replace function public.resumen_fiscal(
+    p_user_id uuid,
+    p_periodo text default 'total',
+    p_desde date default null,
+    p_hasta date default null
+)
+returns table (
+    periodo        date,
+    base_ingresos  numeric,
+    iva_rep        numeric,
+    ret_sop        numeric,
+    base_gastos    numeric,
+    iva_sop        numeric,
+    ret_prac       numeric
+)
+language plpgsql
+stable
+security invoker
+as $$
+declare
+    v_corte date := '-infinity';
+    v_mes_desde date := '-infinity';  -- primer mes entero dentro del rango
+    v_mes_hasta date := 'infinity';   -- primer mes que ya no está entero dentro
+begin
+    if p_periodo <> 'week' then
+        select coalesce(max(c.hasta), '-infinity') into v_corte
+        from public.periodos_cerrados c where c.user_id = p_user_id;
+    end if;
+    if p_desde is not null then
+        v_mes_desde := case when p_desde = date_trunc('month', p_desde)::date then p_desde
+                            else (date_trunc('month', p_desde) + interval '1 month')::date end;
+    end if;
+    if p_hasta is not null then
+        v_mes_hasta := date_trunc('month', p_hasta + 1)::date;
+    end if;
+
+    return query
+    with movimientos as (
+        select r.mes as fecha, r.base_ingresos, r.iva_rep, r.ret_sop,
+               r.base_gastos, r.iva_sop, r.ret_prac
+        from public.rollup_mensual r
+        where r.user_id = p_user_id
+          and r.mes <= v_corte and r.mes >= v_mes_desde and r.mes < v_mes_hasta
+        union all
+        select i.fecha,
+               i.base, i.cuota_iva, i.retencion,
+               0::numeric, 0::numeric, 0::numeric
+        from public.ingresos i
+        where i.user_id = p_user_id
+          and (p_desde is null or i.fecha >= p_desde)
+          and (p_hasta is null or i.fecha <= p_hasta)
+          and (i.fecha > v_corte or i.fecha < v_mes_desde or i.fecha >= v_mes_hasta)
+        union all
+        select g.fecha,
+               0::numeric, 0::numeric, 0::numeric,
+               g.base, g.cuota_iva, g.retencion
+        from public.gastos g
+        where g.user_id = p_user_id
+          and (p_desde is null or g.fecha >= p_desde)
+          and (p_hasta is null or g.fecha <= p_hasta)
+          and (g.fecha > v_corte or g.fecha < v_mes_desde or g.fecha >= v_mes_hasta)
+    )
+    select case when p_periodo = 'total' then null
+                else date_trunc(p_periodo, m.fecha)::date end,
+           coalesce(sum(m.base_ingresos), 0),
+           coalesce(sum(m.iva_rep), 0),
+           coalesce(sum(m.ret_sop), 0),
+           coalesce(sum(m.base_gastos), 0),
+           coalesce(sum(m.iva_sop), 0),
+           coalesce(sum(m.ret_prac), 0)
+    from movimientos m
+    group by 1
+    order by 1;
+end;
+$$;
+
+grant execute on function public.resumen_fiscal(uuid, text, date, date) to authenticated;
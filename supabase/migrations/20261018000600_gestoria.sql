@@ -0,0 +1,31 @@
+-- Modo gestoría: una cuenta de asesor ve la posición fiscal de sus clientes.
+-- El vínculo lo da de alta el administrador (service key):
+--   python -m scripts.gestoria vincular --gestor <uuid> --cliente <uuid> [--alias "Nombre"]
+--
+-- El asesor solo puede leer el libro resumen_trimestral de sus clientes
+-- (sumas por trimestre), nunca sus facturas.
+
+create table if not exists public.gestor_clientes (
+    gestor_id   uuid not null references auth.users (id) on delete cascade,
+    cliente_id  uuid not null references auth.users (id) on delete cascade,
+    alias       text,
+    creado_en   timestamptz not null default now(),
+    primary key (gestor_id, cliente_id),
+    check (gestor_id <> cliente_id)
+);
+
+create index if not exists gestor_clientes_cliente_idx on public.gestor_clientes (cliente_id);
+
+alter table public.gestor_clientes enable row level security;
+
+-- Lo ven el asesor y el propio cliente (para saber quién tiene acceso)
+drop policy if exists "vinculos propios" on public.gestor_clientes;
+create policy "vinculos propios" on public.gestor_clientes
+    for select using ((select auth.uid()) in (gestor_id, cliente_id));
+
+drop policy if exists "resumen de mis clientes" on public.resumen_trimestral;
+create policy "resumen de mis clientes" on public.resumen_trimestral
+    for select using (exists (
+        select 1 from public.gestor_clientes g
+        where g.gestor_id = (select auth.uid()) and g.cliente_id = resumen_trimestral.user_id
+    ));
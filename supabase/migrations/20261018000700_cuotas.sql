@@ -0,0 +1,180 @@
+-- Límites de los planes (pages/4_💎_Suscripción.py):
+--   GRATIS  5 registros en total · NORMAL 20 registros/mes · PRO sin límite
+--
+-- uso_mensual lleva, por usuario y mes, las altas (registros nuevos dados
+-- ese mes) y las bajas (registros de ese mes que se han borrado). Lo
+-- mantiene un trigger por sentencia (una importación de 500 filas es una
+-- sola actualización del contador) y en la misma transacción se comprueba
+-- el límite: si se pasa, la inserción entera se deshace.
+--   · Límite mensual: altas - bajas del mes en curso. Borrar una fila de
+--     este mes libera cupo y "Deshacer" (restaurar_borrados) lo vuelve a
+--     ocupar.
+--   · Límite total: la suma de las altas. Borrar no lo libera.
+-- El mes de un alta es el de now(), no el created_at que mande nadie (los
+-- clientes tampoco pueden ponerlo, ver la migración de sincronización).
+-- La app cachea estos contadores (core/cuotas.py) para avisar antes de
+-- escribir sin una consulta más.
+--
+-- Cambiar el plan de alguien (service key):
+--   python -m scripts.planes asignar --user <uuid> --plan pro
+--   python -m scripts.planes uso --user <uuid>
+
+create table if not exists public.planes (
+    plan         text primary key,
+    altas_mes    integer,   -- registros nuevos por mes (null = sin límite)
+    altas_total  integer    -- registros en total (null = sin límite)
+);
+
+insert into public.planes (plan, altas_mes, altas_total) values
+    ('gratis', null, 5),
+    ('normal', 20, null),
+    ('pro', null, null)
+on conflict (plan) do update set altas_mes = excluded.altas_mes, altas_total = excluded.altas_total;
+
+create table if not exists public.suscripciones (
+    user_id         uuid primary key references auth.users (id) on delete cascade,
+    plan            text not null default 'gratis' references public.planes (plan),
+    actualizado_en  timestamptz not null default now()
+);
+
+create table if not exists public.uso_mensual (
+    user_id  uuid not null references auth.users (id) on delete cascade,
+    mes      date not null,
+    altas    integer not null default 0,
+    bajas    integer not null default 0,
+    primary key (user_id, mes)
+);
+
+alter table public.planes enable row level security;
+alter table public.suscripciones enable row level security;
+alter table public.uso_mensual enable row level security;
+
+drop policy if exists "planes publicos" on public.planes;
+create policy "planes publicos" on public.planes for select using (true);
+
+-- Los usuarios solo leen; el plan lo cambia el pago (service key) y el uso, el trigger
+drop policy if exists "suscripcion propia" on public.suscripciones;
+create policy "suscripcion propia" on public.suscripciones
+    for select using (auth.uid() = user_id);
+
+drop policy if exists "uso propio" on public.uso_mensual;
+create policy "uso propio" on public.uso_mensual
+    for select using (auth.uid() = user_id);
+
+
+create or replace function public.uso_mensual_trg()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_mes date := date_trunc('month', now())::date;
+    v_fuera record;
+begin
+    if tg_op = 'DELETE' then
+        update uso_mensual u set bajas = u.bajas + v.n
+        from (select user_id, date_trunc('month', created_at)::date as mes, count(*)::integer as n
+              from viejas group by 1, 2) v
+        where u.user_id = v.user_id and u.mes = v.mes;
+        return null;
+    end if;
+
+    -- Las altas cuentan en el mes en curso. Las filas que vuelven con su id
+    -- (restaurar_borrados, aún con su lápida) no son altas: deshacen su baja.
+    insert into uso_mensual as u (user_id, mes, altas)
+    select user_id, v_mes, count(*)::integer
+    from nuevas n
+    where not exists (select 1 from borrados b where b.tabla = tg_table_name and b.fila_id = n.id)
+    group by 1
+    on conflict (user_id, mes) do update set altas = u.altas + excluded.altas;
+
+    update uso_mensual u set bajas = greatest(u.bajas - v.n, 0)
+    from (select user_id, date_trunc('month', created_at)::date as mes, count(*)::integer as n
+          from nuevas n
+          where exists (select 1 from borrados b where b.tabla = tg_table_name and b.fila_id = n.id)
+          group by 1, 2) v
+    where u.user_id = v.user_id and u.mes = v.mes;
+
+    -- Sin fila en suscripciones = plan gratis. Solo se mira el límite que
+    -- esta sentencia ha podido hacer pasar; el total solo se suma para los
+    -- planes que lo limitan (como mucho unos pocos meses).
+    select n.user_id, p.plan, p.altas_mes, p.altas_total into v_fuera
+    from (select user_id,
+                 bool_or(not exists (select 1 from borrados b where b.tabla = tg_table_name and b.fila_id = f.id))
+                     as altas,
+                 bool_or(created_at >= v_mes) as del_mes
+          from nuevas f group by 1) n
+    left join suscripciones s on s.user_id = n.user_id
+    join planes p on p.plan = coalesce(s.plan, 'gratis')
+    where (p.altas_mes is not null and n.del_mes
+           and (select u.altas - u.bajas from uso_mensual u where u.user_id = n.user_id and u.mes = v_mes) > p.altas_mes)
+       or (p.altas_total is not null and n.altas
+           and (select sum(u.altas) from uso_mensual u where u.user_id = n.user_id) > p.altas_total)
+    limit 1;
+    if found then
+        raise exception 'Has llegado al límite del plan %: %', upper(v_fuera.plan),
+            coalesce(v_fuera.altas_mes || ' registros al mes', v_fuera.altas_total || ' registros en total')
+            using errcode = 'check_violation', hint = 'cuota';
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists ingresos_uso_altas on public.ingresos;
+create trigger ingresos_uso_altas
+    after insert on public.ingresos
+    referencing new table as nuevas
+    for each statement execute function public.uso_mensual_trg();
+
+drop trigger if exists ingresos_uso_bajas on public.ingresos;
+create trigger ingresos_uso_bajas
+    after delete on public.ingresos
+    referencing old table as viejas
+    for each statement execute function public.uso_mensual_trg();
+
+drop trigger if exists gastos_uso_altas on public.gastos;
+create trigger gastos_uso_altas
+    after insert on public.gastos
+    referencing new table as nuevas
+    for each statement execute function public.uso_mensual_trg();
+
+drop trigger if exists gastos_uso_bajas on public.gastos;
+create trigger gastos_uso_bajas
+    after delete on public.gastos
+    referencing old table as viejas
+    for each statement execute function public.uso_mensual_trg();
+
+
+-- Plan, límites y uso del usuario que llama, en una sola petición. 'mes' es
+-- el mes en curso para la base de datos (UTC), el de usadas_mes.
+drop function if exists public.uso_actual();
+create function public.uso_actual()
+returns table (plan text, altas_mes integer, altas_total integer, usadas_mes integer, usadas_total integer,
+               mes date)
+language sql
+stable
+security invoker
+set search_path = public
+as $$
+    select p.plan, p.altas_mes, p.altas_total,
+           coalesce((select u.altas - u.bajas from uso_mensual u
+                     where u.user_id = auth.uid() and u.mes = date_trunc('month', now())::date), 0),
+           coalesce((select sum(u.altas) from uso_mensual u where u.user_id = auth.uid()), 0)::integer,
+           date_trunc('month', now())::date
+    from planes p
+    where p.plan = coalesce((select s.plan from suscripciones s where s.user_id = auth.uid()), 'gratis');
+$$;
+
+grant execute on function public.uso_actual() to authenticated;
+
+
+-- Carga inicial con los datos que ya existen (si se vuelve a aplicar no
+-- toca lo que ya lleva el trigger: las altas borradas siguen contando)
+insert into public.uso_mensual (user_id, mes, altas)
+select user_id, date_trunc('month', created_at)::date, count(*)::integer
+from (select user_id, created_at from public.ingresos
+      union all
+      select user_id, created_at from public.gastos) m
+group by 1, 2
+on conflict (user_id, mes) do nothing;
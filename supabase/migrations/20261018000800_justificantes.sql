@@ -0,0 +1,67 @@
+-- Justificantes (foto o PDF) de los gastos, para la gestoría.
+--
+-- Los ficheros van al bucket privado "justificantes" de Supabase Storage, en
+-- <user_id>/<gasto_id>/<nombre>; aquí solo se guarda dónde están. Las fotos
+-- se reducen antes de subirlas y la miniatura la genera la app en segundo
+-- plano (core/justificantes.py), por eso "miniatura" puede estar vacía un
+-- momento.
+--
+-- No hay clave foránea a gastos: si se borra un gasto y se deshace, vuelve
+-- con su justificante. Los que se quedan sin gasto se limpian, pasados unos
+-- días desde que se borró (su lápida en borrados), con:
+--   python -m scripts.justificantes purgar
+
+create table if not exists public.justificantes (
+    gasto_id   bigint primary key,
+    user_id    uuid not null references auth.users (id) on delete cascade,
+    ruta       text not null,
+    miniatura  text,
+    tipo       text not null,      -- image/jpeg, image/png, application/pdf
+    nombre     text,               -- nombre original del archivo
+    bytes      integer not null,
+    creado_en  timestamptz not null default now()
+);
+
+create index if not exists justificantes_user_idx on public.justificantes (user_id);
+
+alter table public.justificantes enable row level security;
+
+drop policy if exists "justificantes propios" on public.justificantes;
+create policy "justificantes propios" on public.justificantes
+    for all using (auth.uid() = user_id) with check (auth.uid() = user_id);
+
+
+-- Bucket privado: cada usuario solo ve su carpeta
+insert into storage.buckets (id, name, public, file_size_limit, allowed_mime_types)
+values ('justificantes', 'justificantes', false, 10485760,
+        array['image/jpeg', 'image/png', 'image/webp', 'application/pdf'])
+on conflict (id) do update set file_size_limit = excluded.file_size_limit,
+                               allowed_mime_types = excluded.allowed_mime_types;
+
+drop policy if exists "justificantes propios" on storage.objects;
+create policy "justificantes propios" on storage.objects
+    for all to authenticated
+    using (bucket_id = 'justificantes' and (storage.foldername(name))[1] = auth.uid()::text)
+    with check (bucket_id = 'justificantes' and (storage.foldername(name))[1] = auth.uid()::text);
+
+
+-- Justificantes cuyo gasto se borró hace más de p_dias (service key, ver
+-- scripts/justificantes.py). Cuenta desde el borrado y no desde la subida:
+-- hasta entonces se puede deshacer. Sin lápida (ya purgada) el borrado es
+-- aún más antiguo y vale la fecha del justificante.
+create or replace function public.justificantes_huerfanos(p_dias integer default 30)
+returns table (gasto_id bigint, ruta text, miniatura text)
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    select j.gasto_id, j.ruta, j.miniatura
+    from justificantes j
+    left join borrados b on b.tabla = 'gastos' and b.fila_id = j.gasto_id
+    where not exists (select 1 from gastos g where g.id = j.gasto_id)
+      and coalesce(b.borrado_en, j.creado_en) < now() - make_interval(days => p_dias);
+$$;
+
+revoke all on function public.justificantes_huerfanos(integer) from public, anon, authenticated;
+grant execute on function public.justificantes_huerfanos(integer) to service_role;
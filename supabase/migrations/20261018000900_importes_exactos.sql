@@ -0,0 +1,93 @@
+-- Importes con dos decimales exactos.
+-- Las columnas de dinero pasan de numeric sin escala a numeric(12,2) (hasta
+-- 9.999.999.999,99 €) y las de los libros de totales a numeric(14,2). Lo
+-- que llegue con más decimales se redondea al céntimo al guardarlo (mitad
+-- lejos del cero, igual que core/dinero.py), así las sumas de los triggers
+-- y las de la app coinciden al céntimo.
+--
+-- Las vistas *_esperado dependen de estas columnas: se quitan y se vuelven a
+-- crear tal cual. Se puede ejecutar más de una vez.
+
+drop view if exists public.resumen_trimestral_esperado;
+drop view if exists public.rollup_mensual_esperado;
+
+alter table public.ingresos
+    alter column base      type numeric(12,2) using round(base, 2),
+    alter column cuota_iva type numeric(12,2) using round(cuota_iva, 2),
+    alter column retencion type numeric(12,2) using round(retencion, 2),
+    alter column total     type numeric(12,2) using round(total, 2);
+
+alter table public.gastos
+    alter column base      type numeric(12,2) using round(base, 2),
+    alter column cuota_iva type numeric(12,2) using round(cuota_iva, 2),
+    alter column retencion type numeric(12,2) using round(retencion, 2),
+    alter column total     type numeric(12,2) using round(total, 2);
+
+alter table public.resumen_trimestral
+    alter column base_ingresos type numeric(14,2) using round(base_ingresos, 2),
+    alter column iva_rep       type numeric(14,2) using round(iva_rep, 2),
+    alter column ret_sop       type numeric(14,2) using round(ret_sop, 2),
+    alter column base_gastos   type numeric(14,2) using round(base_gastos, 2),
+    alter column iva_sop       type numeric(14,2) using round(iva_sop, 2),
+    alter column ret_prac      type numeric(14,2) using round(ret_prac, 2);
+
+alter table public.rollup_mensual
+    alter column base_ingresos type numeric(14,2) using round(base_ingresos, 2),
+    alter column iva_rep       type numeric(14,2) using round(iva_rep, 2),
+    alter column ret_sop       type numeric(14,2) using round(ret_sop, 2),
+    alter column base_gastos   type numeric(14,2) using round(base_gastos, 2),
+    alter column iva_sop       type numeric(14,2) using round(iva_sop, 2),
+    alter column ret_prac      type numeric(14,2) using round(ret_prac, 2);
+
+
+-- Las mismas vistas que en 20261018000200 y 20261018000500
+create or replace view public.resumen_trimestral_esperado
+with (security_invoker = true) as
+    select user_id, anio, trimestre,
+           sum(n_ingresos)::integer as n_ingresos, sum(base_ingresos) as base_ingresos,
+           sum(iva_rep) as iva_rep, sum(ret_sop) as ret_sop,
+           sum(n_gastos)::integer as n_gastos, sum(base_gastos) as base_gastos,
+           sum(iva_sop) as iva_sop, sum(ret_prac) as ret_prac
+    from (
+        select user_id, extract(year from fecha)::smallint as anio,
+               extract(quarter from fecha)::smallint as trimestre,
+               1 as n_ingresos, base as base_ingresos, cuota_iva as iva_rep, retencion as ret_sop,
+               0 as n_gastos, 0::numeric as base_gastos, 0::numeric as iva_sop, 0::numeric as ret_prac
+        from public.ingresos
+        union all
+        select user_id, extract(year from fecha)::smallint, extract(quarter from fecha)::smallint,
+               0, 0, 0, 0,
+               1, base, cuota_iva, retencion
+        from public.gastos
+    ) m
+    group by user_id, anio, trimestre;
+
+create or replace view public.rollup_mensual_esperado
+with (security_invoker = true) as
+    select user_id, mes,
+           sum(n_ingresos)::integer as n_ingresos, sum(base_ingresos) as base_ingresos,
+           sum(iva_rep) as iva_rep, sum(ret_sop) as ret_sop,
+           sum(n_gastos)::integer as n_gastos, sum(base_gastos) as base_gastos,
+           sum(iva_sop) as iva_sop, sum(ret_prac) as ret_prac
+    from (
+        select user_id, date_trunc('month', fecha)::date as mes,
+               1 as n_ingresos, base as base_ingresos, cuota_iva as iva_rep, retencion as ret_sop,
+               0 as n_gastos, 0::numeric as base_gastos, 0::numeric as iva_sop, 0::numeric as ret_prac
+        from public.ingresos
+        union all
+        select user_id, date_trunc('month', fecha)::date,
+               0, 0, 0, 0,
+               1, base, cuota_iva, retencion
+        from public.gastos
+    ) m
+    group by user_id, mes;
+
+
+-- Los libros se rehacen con los importes ya redondeados (la suma de los
+-- redondeos no tiene por qué ser el redondeo de la suma)
+select public.reconstruir_resumen_trimestral();
+
+delete from public.rollup_mensual;
+insert into public.rollup_mensual
+select e.* from public.rollup_mensual_esperado e
+join public.periodos_cerrados p on p.user_id = e.user_id and e.mes <= p.hasta;
@@ -0,0 +1,128 @@
+-- Búsqueda en Ingresos/Gastos y sugerencias de clientes y proveedores.
+--
+-- La tabla paginada (core/tablas.py) filtra en el servidor por texto
+-- (cliente; proveedor o categoría), fechas y total, con el mismo cursor
+-- (fecha, id) de siempre. El texto se busca con ~* (imatch de PostgREST,
+-- con el texto escapado como literal; ver core.datos._patron): los índices
+-- GIN de trigramas (pg_trgm) con user_id delante (btree_gin) lo resuelven
+-- sin recorrer el histórico del usuario, tenga 1.000 o 100.000 filas. Con
+-- menos de 3 letras no hay trigramas: se tira del índice por fecha y el
+-- LIMIT de la página corta pronto.
+--
+-- contrapartes lleva, por usuario, cuántas facturas hay de cada cliente y
+-- de cada proveedor. La mantienen triggers por sentencia (una importación
+-- es una sola actualización) y los formularios sacan de aquí los nombres
+-- habituales para el autocompletado, sin agrupar ingresos ni gastos.
+
+create extension if not exists pg_trgm with schema extensions;
+create extension if not exists btree_gin with schema extensions;
+
+create index if not exists ingresos_cliente_trgm_idx on public.ingresos
+    using gin (user_id, cliente extensions.gin_trgm_ops);
+create index if not exists gastos_proveedor_trgm_idx on public.gastos
+    using gin (user_id, proveedor extensions.gin_trgm_ops);
+create index if not exists gastos_categoria_trgm_idx on public.gastos
+    using gin (user_id, categoria extensions.gin_trgm_ops);
+
+-- Filtro por importe
+create index if not exists ingresos_user_total_idx on public.ingresos (user_id, total);
+create index if not exists gastos_user_total_idx on public.gastos (user_id, total);
+
+
+create table if not exists public.contrapartes (
+    user_id  uuid not null references auth.users (id) on delete cascade,
+    tipo     text not null check (tipo in ('cliente', 'proveedor')),
+    nombre   text not null,
+    n        integer not null default 0,
+    primary key (user_id, tipo, nombre)
+);
+
+create index if not exists contrapartes_frecuentes_idx on public.contrapartes (user_id, tipo, n desc);
+
+alter table public.contrapartes enable row level security;
+
+-- Los usuarios solo leen; la escriben los triggers
+drop policy if exists "contrapartes propias" on public.contrapartes;
+create policy "contrapartes propias" on public.contrapartes
+    for select using (auth.uid() = user_id);
+
+
+create or replace function public.contrapartes_trg()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_tipo text := case tg_table_name when 'ingresos' then 'cliente' else 'proveedor' end;
+begin
+    -- El nombre es la columna que se llama como el tipo (cliente / proveedor).
+    -- En un UPDATE se suma lo nuevo y se resta lo viejo: si el nombre no cambia, queda igual.
+    if tg_op <> 'DELETE' then
+        insert into contrapartes as c (user_id, tipo, nombre, n)
+        select user_id, v_tipo, to_jsonb(f) ->> v_tipo, count(*)::integer
+        from nuevas f
+        where coalesce(btrim(to_jsonb(f) ->> v_tipo), '') <> ''
+        group by 1, 3
+        on conflict (user_id, tipo, nombre) do update set n = c.n + excluded.n;
+    end if;
+
+    if tg_op <> 'INSERT' then
+        update contrapartes c set n = c.n - v.n
+        from (select user_id, to_jsonb(f) ->> v_tipo as nombre, count(*)::integer as n
+              from viejas f group by 1, 2) v
+        where c.user_id = v.user_id and c.tipo = v_tipo and c.nombre = v.nombre;
+
+        delete from contrapartes c
+        where c.n <= 0 and c.tipo = v_tipo and c.user_id in (select distinct user_id from viejas);
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists ingresos_contrapartes_altas on public.ingresos;
+create trigger ingresos_contrapartes_altas
+    after insert on public.ingresos
+    referencing new table as nuevas
+    for each statement execute function public.contrapartes_trg();
+
+drop trigger if exists ingresos_contrapartes_cambios on public.ingresos;
+create trigger ingresos_contrapartes_cambios
+    after update on public.ingresos
+    referencing old table as viejas new table as nuevas
+    for each statement execute function public.contrapartes_trg();
+
+drop trigger if exists ingresos_contrapartes_bajas on public.ingresos;
+create trigger ingresos_contrapartes_bajas
+    after delete on public.ingresos
+    referencing old table as viejas
+    for each statement execute function public.contrapartes_trg();
+
+drop trigger if exists gastos_contrapartes_altas on public.gastos;
+create trigger gastos_contrapartes_altas
+    after insert on public.gastos
+    referencing new table as nuevas
+    for each statement execute function public.contrapartes_trg();
+
+drop trigger if exists gastos_contrapartes_cambios on public.gastos;
+create trigger gastos_contrapartes_cambios
+    after update on public.gastos
+    referencing old table as viejas new table as nuevas
+    for each statement execute function public.contrapartes_trg();
+
+drop trigger if exists gastos_contrapartes_bajas on public.gastos;
+create trigger gastos_contrapartes_bajas
+    after delete on public.gastos
+    referencing old table as viejas
+    for each statement execute function public.contrapartes_trg();
+
+
+-- Carga inicial con los datos que ya existen
+delete from public.contrapartes;
+insert into public.contrapartes (user_id, tipo, nombre, n)
+select user_id, tipo, nombre, count(*)::integer
+from (select user_id, 'cliente' as tipo, cliente as nombre from public.ingresos
+      union all
+      select user_id, 'proveedor', proveedor from public.gastos) m
+where coalesce(btrim(nombre), '') <> ''
+group by 1, 2, 3;
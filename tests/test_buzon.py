@@ -0,0 +1,122 @@
+import smtplib
+import time
+
+import pytest
+
+from core import buzon as modulo
+from core.buzon import ESPERA_BASE, ESPERA_MAX, MAX_INTENTOS, Buzon, Cartero, CorreoSMTP, _espera
+
+
+class Transporte:
+    # Como CorreoLocal, pero guarda los mensajes en memoria
+    def __init__(self):
+        self.enviados = []
+
+    def enviar(self, correos):
+        self.enviados += [correo for _, correo in correos]
+        return {id_mensaje: None for id_mensaje, _ in correos}
+
+
+class Caido:
+    def enviar(self, correos):
+        raise ConnectionRefusedError("Connection refused")
+
+
+class SMTPFalso:
+    # smtplib.SMTP que rechaza un destinatario y se cae a mitad de lote
+    enviados = []
+
+    def __init__(self, servidor, puerto, timeout):
+        pass
+
+    def starttls(self):
+        pass
+
+    def login(self, usuario, clave):
+        pass
+
+    def send_message(self, correo):
+        if correo["Reply-To"] == "rechazado@x.es":
+            raise smtplib.SMTPRecipientsRefused({"soporte@x.es": (550, b"No such user")})
+        if correo["Reply-To"] == "corte@x.es":
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        self.enviados.append(correo["Reply-To"])
+
+    def quit(self):
+        raise smtplib.SMTPServerDisconnected("please run connect() first")
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def sin_azar(monkeypatch):
+    monkeypatch.setattr(modulo.random, "uniform", lambda a, b: 1.0)
+
+
+def _intentos(buzon):
+    return dict(buzon._con.execute("select email, intentos from mensajes").fetchall())
+
+
+def test_un_mensaje_roto_no_para_el_lote(tmp_path):
+    buzon, transporte = Buzon(str(tmp_path / "buzon.sqlite3")), Transporte()
+    buzon.encolar("a@x.es", "Hola", "uno")
+    roto = buzon.encolar("b@x.es", "Asunto\nInyectado: si", "dos")
+    buzon.encolar("c@x.es", "Adiós", "tres")
+
+    assert Cartero(buzon, transporte, "soporte@x.es", "app@x.es", hilo=False).repartir() == 2
+    assert [m["Reply-To"] for m in transporte.enviados] == ["a@x.es", "c@x.es"]
+    # El roto pasa a fallidos sin esperar los reintentos
+    assert buzon.estado() == {'enviados': 2, 'fallidos': 1}
+    intentos, error = buzon._con.execute("select intentos, error from mensajes where id = ?", (roto,)).fetchone()
+    assert intentos == MAX_INTENTOS and error.startswith("ValueError")
+
+
+def test_espera_exponencial_con_tope(sin_azar):
+    esperas = [_espera(n) for n in range(1, MAX_INTENTOS + 1)]
+    assert esperas[:4] == [ESPERA_BASE, 2 * ESPERA_BASE, 4 * ESPERA_BASE, 8 * ESPERA_BASE]
+    assert max(esperas) == ESPERA_MAX
+
+
+def test_servidor_caido_reintenta_hasta_dejarlo_fallido(tmp_path, sin_azar):
+    buzon = Buzon(str(tmp_path / "buzon.sqlite3"))
+    buzon.encolar("a@x.es", "Hola", "uno")
+    buzon.encolar("b@x.es", "Hola", "dos")
+    cartero = Cartero(buzon, Caido(), "soporte@x.es", "app@x.es", hilo=False)
+
+    for intento in range(1, MAX_INTENTOS + 1):
+        assert cartero.repartir() == 0
+        assert _intentos(buzon) == {"a@x.es": intento, "b@x.es": intento}
+        if intento < MAX_INTENTOS:
+            # Hasta que pase la espera no se vuelve a intentar
+            assert buzon.proximo() == pytest.approx(_espera(intento), abs=5)
+            assert cartero.repartir() == 0 and _intentos(buzon)["a@x.es"] == intento
+            buzon._con.execute("update mensajes set siguiente = ?", (time.time(),))
+
+    assert buzon.estado() == {"fallidos": 2}
+    assert buzon.proximo() is None
+    error, = {e for e, in buzon._con.execute("select error from mensajes")}
+    assert error == "ConnectionRefusedError: Connection refused"
+
+    assert buzon.reintentar() == 2
+    assert Cartero(buzon, Transporte(), "soporte@x.es", "app@x.es", hilo=False).repartir() == 2
+
+
+def test_smtp_caido_a_mitad_de_lote(tmp_path, monkeypatch, sin_azar):
+    monkeypatch.setattr(smtplib, "SMTP", SMTPFalso)
+    monkeypatch.setattr(SMTPFalso, "enviados", [])
+    buzon = Buzon(str(tmp_path / "buzon.sqlite3"))
+    for email in ("a@x.es", "rechazado@x.es", "b@x.es", "corte@x.es", "c@x.es"):
+        buzon.encolar(email, "Hola", "cuerpo")
+    cartero = Cartero(buzon, CorreoSMTP("smtp.x.es", usuario="app@x.es", clave="..."), "soporte@x.es",
+                      "app@x.es", hilo=False)
+
+    # Lo aceptado antes del corte cuenta como enviado; el rechazado y lo pendiente se reintentan
+    assert cartero.repartir() == 2
+    assert SMTPFalso.enviados == ["a@x.es", "b@x.es"]
+    assert buzon.estado() == {"enviados": 2, "pendientes": 3}
+    assert {k: v for k, v in _intentos(buzon).items() if v} == {"rechazado@x.es": 1, "corte@x.es": 1, "c@x.es": 1}
+    errores = dict(buzon._con.execute("select email, error from mensajes where enviado is null").fetchall())
+    assert errores["corte@x.es"] == errores["c@x.es"] == "SMTPServerDisconnected: Connection unexpectedly closed"
+    assert "No such user" in errores["rechazado@x.es"]
+    assert buzon.proximo() == pytest.approx(ESPERA_BASE, abs=5)
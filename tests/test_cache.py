@@ -0,0 +1,68 @@
+import threading
+
+from core.cache import CacheUsuario
+
+
+def _cargas(valores):
+    # cargar() que devuelve los valores en orden y cuenta las llamadas
+    llamadas = []
+    def cargar():
+        llamadas.append(1)
+        return valores[len(llamadas) - 1]
+    return cargar, llamadas
+
+
+def test_lru_y_ttl(monkeypatch):
+    reloj = [1000.0]
+    monkeypatch.setattr("core.cache.time.monotonic", lambda: reloj[0])
+    cache = CacheUsuario(ttl=60, max_entradas=2)
+    cargar, llamadas = _cargas(['a', 'b', 'c', 'a2', 'b2'])
+    assert cache.obtener('u', 'ingresos', 'filas', 1, cargar) == 'a'
+    assert cache.obtener('u', 'ingresos', 'filas', 2, cargar) == 'b'
+    assert cache.obtener('u', 'ingresos', 'filas', 1, cargar) == 'a'  # 1 pasa a ser la más reciente
+    assert cache.obtener('u', 'ingresos', 'filas', 3, cargar) == 'c'  # expulsa la 2
+    assert len(llamadas) == 3
+
+    reloj[0] += 59
+    assert cache.obtener('u', 'ingresos', 'filas', 1, cargar) == 'a'
+    reloj[0] += 1
+    assert cache.obtener('u', 'ingresos', 'filas', 1, cargar) == 'a2'  # caducada
+    assert cache.obtener('u', 'ingresos', 'filas', 2, cargar) == 'b2'
+    assert len(llamadas) == 5
+
+
+def test_invalidar_conserva_el_tipo_pedido_y_no_toca_otros_usuarios():
+    cache = CacheUsuario()
+    for usuario in ('u', 'v'):
+        cache.obtener(usuario, 'ingresos', 'filas', None, lambda: [1])
+        cache.obtener(usuario, 'ingresos', 'contar', None, lambda: 1)
+    cache.invalidar('u', 'ingresos', conservar='filas')
+    assert sorted(c[:3] for c in cache._datos) == [('u', 'ingresos', 'filas'), ('v', 'ingresos', 'contar'),
+                                                   ('v', 'ingresos', 'filas')]
+    cache.parchear('u', 'ingresos', 'filas', lambda filas: filas + [2])
+    assert cache.obtener('u', 'ingresos', 'filas', None, lambda: None) == [1, 2]
+
+
+def test_escritura_durante_la_carga_no_deja_datos_viejos():
+    # Mientras una sesión lee, otra escribe: lo leído se devuelve pero no se guarda
+    cache = CacheUsuario()
+    for escribir in (lambda: cache.invalidar('u', 'ingresos'),
+                     lambda: cache.parchear('u', 'ingresos', 'filas', lambda v: v)):
+        leyendo, escrito = threading.Event(), threading.Event()
+        def cargar_lento():
+            leyendo.set()
+            escrito.wait(5)
+            return 'viejo'
+        hilo = threading.Thread(target=lambda: cache.obtener('u', 'ingresos', 'filas', None, cargar_lento))
+        hilo.start()
+        leyendo.wait(5)
+        escribir()
+        escrito.set()
+        hilo.join(5)
+        assert cache.obtener('u', 'ingresos', 'filas', None, lambda: 'nuevo') == 'nuevo'
+        cache.invalidar('u', 'ingresos')
+
+    # Lo de otra tabla o de otro usuario no cuenta como cambio
+    cache.obtener('u', 'ingresos', 'filas', None,
+                  lambda: cache.invalidar('u', 'gastos') or cache.invalidar('v', 'ingresos') or 'leido')
+    assert cache.obtener('u', 'ingresos', 'filas', None, lambda: 'otra vez') == 'leido'
@@ -0,0 +1,60 @@
+import threading
+import time
+
+from core.concurrente import POR_SESION, a_la_vez
+
+
+class Contador:
+    # Cuántas tareas hay en vuelo a la vez como mucho
+    def __init__(self):
+        self.ahora, self.maximo = 0, 0
+        self._lock = threading.Lock()
+
+    def tarea(self, valor, espera=0.05):
+        def f():
+            with self._lock:
+                self.ahora += 1
+                self.maximo = max(self.maximo, self.ahora)
+            time.sleep(espera)
+            with self._lock:
+                self.ahora -= 1
+            return valor
+        return f
+
+
+def test_respeta_el_cupo_de_la_sesion_y_de_la_llamada():
+    contador = Contador()
+    tareas = {f"t{i}": contador.tarea(i) for i in range(3 * POR_SESION)}
+    resultados, errores = a_la_vez(tareas)
+    assert resultados == {f"t{i}": i for i in range(3 * POR_SESION)} and errores == {}
+    assert contador.maximo == POR_SESION
+
+    contador = Contador()
+    resultados, errores = a_la_vez({f"t{i}": contador.tarea(i) for i in range(6)}, simultaneas=2)
+    assert len(resultados) == 6 and errores == {}
+    assert contador.maximo == 2
+
+
+def test_errores_y_timeout_no_tapan_el_resto():
+    def falla():
+        raise ValueError("sin datos")
+
+    suelta = threading.Event()
+    resultados, errores = a_la_vez({'bien': lambda: 1, 'mal': falla, 'lenta': suelta.wait}, timeout=0.2)
+    suelta.set()
+    assert resultados == {'bien': 1}
+    assert isinstance(errores['mal'], ValueError)
+    assert isinstance(errores['lenta'], TimeoutError)
+
+
+def test_lo_que_sigue_en_vuelo_ocupa_el_cupo():
+    # Tareas de un rerun anterior que vencieron el timeout siguen contando para la sesión
+    suelta = threading.Event()
+    _, errores = a_la_vez({f"t{i}": suelta.wait for i in range(POR_SESION)}, timeout=0.1)
+    assert len(errores) == POR_SESION
+
+    _, errores = a_la_vez({'otra': lambda: 1}, timeout=0.1)
+    assert isinstance(errores['otra'], TimeoutError)
+
+    suelta.set()
+    assert a_la_vez({'otra': lambda: 1}, timeout=5) == ({'otra': 1}, {})
@@ -0,0 +1,90 @@
+import pytest
+from postgrest.exceptions import APIError
+
+from bench.cliente_local import ClienteLocal
+from bench.sinteticos import generar
+from core import cuotas, datos
+from core.cache import cache_usuario
+
+USER_ID = '00000000-0000-0000-0000-0000000000a1'
+OTRO = '00000000-0000-0000-0000-0000000000b2'
+FILA = {'fecha': '2025-06-01', 'cliente': 'Cliente', 'base': 10.0, 'iva_pct': 21, 'cuota_iva': 2.1,
+        'irpf_pct': 0, 'retencion': 0.0, 'total': 12.1}
+
+
+@pytest.fixture
+def client():
+    # Plan GRATIS pequeño; las tablas solo tienen filas de otro usuario
+    cache_usuario.clear()
+    yield ClienteLocal(generar(20, OTRO, semilla=1), plan={'plan': 'gratis', 'altas_mes': 3, 'altas_total': 5})
+    cache_usuario.clear()
+
+
+def _igual_que_la_bd(client):
+    # La copia en caché, parcheada tras cada escritura, cuenta lo mismo que uso_actual
+    assert cuotas.estado(client, USER_ID) == client.rpc('uso_actual').execute().data[0]
+
+
+def test_avisa_antes_de_escribir_sin_preguntar(client):
+    assert cuotas.disponibles(client, USER_ID) == 3
+    consultas = client.consultas
+    datos.insertar_varios(client, USER_ID, 'ingresos', [FILA] * 2)
+    assert client.consultas == consultas + 1  # solo el INSERT: el uso se anota en la caché
+    assert cuotas.disponibles(client, USER_ID) == 1
+
+    with pytest.raises(cuotas.CuotaAgotada, match="3 registros al mes"):
+        datos.insertar_varios(client, USER_ID, 'ingresos', [FILA] * 2)
+    assert client.consultas == consultas + 1
+    assert cuotas.disponibles(client, USER_ID) == 1
+    _igual_que_la_bd(client)
+
+
+def test_borrar_devuelve_el_mes_pero_no_el_total(client):
+    nuevas = datos.insertar_varios(client, USER_ID, 'ingresos', [FILA] * 3)
+    assert cuotas.disponibles(client, USER_ID) == 0
+    datos.borrar(client, USER_ID, 'ingresos', nuevas[0]['id'])
+    assert cuotas.disponibles(client, USER_ID) == 1
+    _igual_que_la_bd(client)
+
+    datos.insertar(client, USER_ID, 'gastos', {**FILA, 'proveedor': 'P', 'categoria': 'Otros'})
+    datos.borrar_varios(client, USER_ID, 'ingresos', [f['id'] for f in nuevas[1:]])
+    # Mes: 4 altas - 3 bajas = 1 de 3; total: 4 de 5
+    assert cuotas.disponibles(client, USER_ID) == 1
+    _igual_que_la_bd(client)
+    with pytest.raises(cuotas.CuotaAgotada, match="5 registros en total"):
+        datos.insertar_varios(client, USER_ID, 'ingresos', [FILA] * 2)
+
+
+def test_deshacer_ocupa_el_mes_sin_ser_alta_nueva(client):
+    borradas = datos.borrar_varios(client, USER_ID, 'ingresos',
+                                   [f['id'] for f in datos.insertar_varios(client, USER_ID, 'ingresos', [FILA] * 3)])
+    datos.insertar(client, USER_ID, 'ingresos', FILA)
+    # Deshacer las tres ya no cabe en el mes (1 + 3 > 3)
+    with pytest.raises(cuotas.CuotaAgotada):
+        datos.restaurar(client, USER_ID, 'ingresos', borradas)
+    assert len(datos.restaurar(client, USER_ID, 'ingresos', borradas[:2])) == 2
+    assert cuotas.estado(client, USER_ID)['usadas_total'] == 4
+    _igual_que_la_bd(client)
+
+
+def test_rechazo_de_la_base_de_datos_vuelve_a_leer_el_uso(client):
+    assert cuotas.disponibles(client, USER_ID) == 3
+    # Otro dispositivo gasta el cupo: la copia en caché no lo sabe
+    client.table('ingresos').insert([{'user_id': USER_ID, **FILA}] * 3).execute()
+    assert cuotas.disponibles(client, USER_ID) == 3
+
+    with pytest.raises(APIError) as error:
+        datos.insertar(client, USER_ID, 'ingresos', FILA)
+    assert cuotas.es_limite(error.value)
+    assert cuotas.disponibles(client, USER_ID) == 0
+    _igual_que_la_bd(client)
+
+    # Otros errores de la base de datos no son del límite
+    assert not cuotas.es_limite(APIError({'code': '42501', 'details': None, 'hint': None, 'message': 'permission'}))
+    assert not cuotas.es_limite(ValueError())
+
+
+def test_sin_limites(client):
+    client.plan = {'plan': 'pro', 'altas_mes': None, 'altas_total': None}
+    assert cuotas.disponibles(client, USER_ID) is None
+    cuotas.comprobar(client, USER_ID, [FILA] * 1000)
@@ -0,0 +1,140 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+from bench.cliente_local import ClienteLocal
+from bench.sinteticos import generar
+from core import datos, fiscal
+from core.cache import cache_usuario
+from core.dinero import centimos_serie
+
+USER_ID = '00000000-0000-0000-0000-0000000000a1'
+OTRO = '00000000-0000-0000-0000-0000000000b2'
+HASTA = datetime.date(2025, 6, 30)
+
+
+@pytest.fixture
+def client():
+    # Libro de USER_ID y unas pocas filas de otro usuario que nunca deben salir
+    mio, otro = generar(600, USER_ID, semilla=3, anios=2, hasta=HASTA), generar(80, OTRO, semilla=4, hasta=HASTA)
+    tablas = {}
+    for tabla in ('ingresos', 'gastos'):
+        ajeno = otro[tabla].assign(id=otro[tabla]['id'] + len(mio[tabla]))
+        tablas[tabla] = pd.concat([mio[tabla], ajeno], ignore_index=True)
+    cache_usuario.clear()
+    yield ClienteLocal(tablas)
+    cache_usuario.clear()
+
+
+def _propias(client, tabla):
+    df = client.tablas[tabla]
+    return df[df['user_id'] == USER_ID].sort_values(['fecha', 'id'], ascending=False)
+
+
+def _todas_las_paginas(client, tabla, limite, filtro=None):
+    paginas, cursor = [], None
+    while True:
+        df, hay_mas = datos.pagina(client, USER_ID, tabla, limite, cursor, filtro)
+        paginas.append(df)
+        if not hay_mas:
+            return pd.concat(paginas, ignore_index=True)
+        assert len(df) == limite
+        cursor = datos.cursor_siguiente(df)
+
+
+@pytest.mark.parametrize('tabla', ['ingresos', 'gastos'])
+def test_pagina_recorre_todo_sin_repetir(client, tabla):
+    todo = _todas_las_paginas(client, tabla, 50)
+    assert todo['id'].tolist() == _propias(client, tabla)['id'].tolist()
+    assert list(todo.columns) == list(datos.COLUMNAS[tabla])
+    assert todo['base'].dtype == 'int64' and todo['iva_pct'].dtype == 'int8'
+
+
+def test_pagina_usa_la_cache(client):
+    datos.pagina(client, USER_ID, 'ingresos', 25)
+    consultas = client.consultas
+    datos.pagina(client, USER_ID, 'ingresos', 25)
+    assert client.consultas == consultas
+
+
+def test_pagina_con_filtro(client):
+    filtro = {'texto': 'cliente 00', 'desde': datetime.date(2024, 1, 1), 'hasta': datetime.date(2024, 12, 31),
+              'minimo': 50000, 'maximo': 500000}
+    todo = _todas_las_paginas(client, 'ingresos', 20, filtro)
+
+    esperado = _propias(client, 'ingresos')
+    total = centimos_serie(esperado['total'])
+    esperado = esperado[esperado['cliente'].astype(str).str.contains('cliente 00', case=False, regex=False)
+                        & esperado['fecha'].between('2024-01-01', '2024-12-31')
+                        & total.between(50000, 500000)]
+    assert len(esperado) > 0
+    assert todo['id'].tolist() == esperado['id'].tolist()
+
+
+def test_pagina_busca_comodines_como_texto(client):
+    fila = {'fecha': '2025-06-01', 'base': 10.0, 'iva_pct': 21, 'cuota_iva': 2.1,
+            'irpf_pct': 0, 'retencion': 0.0, 'total': 12.1}
+    nombres = ['100% Digital', 'Hola_Mundo SL', 'Coma, Punto. SL', 'Barra \\ SL', 'Estrella*Norte',
+               'EstrellaXNorte', 'Taller (Madrid) "El Sol"']
+    datos.insertar_varios(client, USER_ID, 'ingresos', [{**fila, 'cliente': n} for n in nombres])
+    for texto, esperado in (('%', ['100% Digital']), ('_', ['Hola_Mundo SL']),
+                            ('coma, punto.', ['Coma, Punto. SL']), ('\\', ['Barra \\ SL']),
+                            ('a*n', ['Estrella*Norte']), ('*', ['Estrella*Norte']),
+                            ('(madrid) "el', ['Taller (Madrid) "El Sol"'])):
+        df, _ = datos.pagina(client, USER_ID, 'ingresos', 50, filtro={'texto': texto})
+        assert df['cliente'].astype(str).tolist() == esperado, texto
+
+
+def test_insertar_y_borrar_actualizan_la_pagina(client):
+    antes, _ = datos.pagina(client, USER_ID, 'gastos', 10)
+    nuevas = datos.insertar_varios(client, USER_ID, 'gastos', [{
+        'fecha': '2030-01-01', 'proveedor': 'Nuevo', 'categoria': 'Otros', 'base': 1.0, 'iva_pct': 0,
+        'cuota_iva': 0.0, 'irpf_pct': 0, 'retencion': 0.0, 'total': 1.0}])
+    despues, _ = datos.pagina(client, USER_ID, 'gastos', 10)
+    assert despues['id'].iloc[0] == nuevas[0]['id']
+    assert despues['id'].iloc[1:].tolist() == antes['id'].iloc[:9].tolist()
+
+    datos.borrar_varios(client, USER_ID, 'gastos', [nuevas[0]['id']])
+    otra_vez, _ = datos.pagina(client, USER_ID, 'gastos', 10)
+    assert otra_vez['id'].tolist() == antes['id'].tolist()
+
+
+def test_deshacer_devuelve_las_filas_con_su_id(client):
+    from postgrest.exceptions import APIError
+
+    antes, _ = datos.pagina(client, USER_ID, 'ingresos', 10)
+    borradas = datos.borrar_varios(client, USER_ID, 'ingresos', antes['id'].iloc[:3].tolist())
+    restauradas = datos.restaurar(client, USER_ID, 'ingresos', borradas)
+    assert sorted(f['id'] for f in restauradas) == sorted(antes['id'].iloc[:3].tolist())
+    despues, _ = datos.pagina(client, USER_ID, 'ingresos', 10)
+    pd.testing.assert_frame_equal(despues, antes)
+
+    # Sin lápida (fila no borrada o ya restaurada) no vuelve nada, y el id no lo elige el cliente
+    assert datos.restaurar(client, USER_ID, 'ingresos', borradas) == []
+    with pytest.raises(APIError) as error:
+        datos.insertar(client, USER_ID, 'ingresos', {**borradas[0], 'id': 10 ** 6})
+    assert error.value.code == '42501'
+
+
+def test_resumen_fiscal_igual_que_el_motor(client):
+    df_i = datos.leer_tabla(client, USER_ID, 'ingresos', 'fiscal')
+    df_g = datos.leer_tabla(client, USER_ID, 'gastos', 'fiscal')
+    trimestral, _ = fiscal.calcular(df_i, df_g)
+
+    por_trimestre = {r['periodo']: r for r in datos.resumen_fiscal(client, USER_ID, 'quarter')}
+    assert len(por_trimestre) == len(trimestral)
+    for _, fila in trimestral.iterrows():
+        r = por_trimestre[datetime.date(fila['anio'], 3 * fila['trimestre'] - 2, 1).isoformat()]
+        assert {c: r[c] for c in fiscal.TOTALES} == {c: fila[c] for c in fiscal.TOTALES}
+
+    total, = datos.resumen_fiscal(client, USER_ID)
+    assert {c: total[c] for c in fiscal.TOTALES} == {c: int(trimestral[c].sum()) for c in fiscal.TOTALES}
+
+
+def test_rpc_desconocida_falla_como_postgrest(client):
+    from postgrest.exceptions import APIError
+
+    with pytest.raises(APIError) as error:
+        client.rpc('no_existe', {})
+    assert error.value.code == 'PGRST202'
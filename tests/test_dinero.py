@@ -0,0 +1,62 @@
+from decimal import Decimal
+
+import pandas as pd
+
+from core.dinero import a_euros, centimos, centimos_serie, desglose, euros, formato, porcentaje, porcentajes
+
+# Importes en los que un float de Python no redondea como una factura
+# (2.675 es 2.67499999... en binario) y empates en negativo
+DIFICILES = [0, 0.01, 0.005, 0.015, 1.005, 2.675, 8.345, 1234.565, -0.005, -1.005, -2.675, 999999999.995]
+
+
+def test_centimos_redondea_el_empate_lejos_del_cero():
+    assert centimos('2.675') == 268
+    assert centimos(2.675) == 268
+    assert centimos(Decimal('-1.005')) == -101
+    assert centimos('0.004') == 0
+    assert centimos(None) == 0
+    assert centimos('') == 0
+
+
+def test_centimos_serie_igual_que_centimos():
+    serie = pd.Series(DIFICILES + [None], dtype='object')
+    esperado = [centimos(v) for v in DIFICILES] + [0]
+    assert centimos_serie(serie).tolist() == esperado
+    assert centimos_serie(serie).dtype == 'int64'
+
+
+def test_centimos_serie_desde_texto():
+    assert centimos_serie(pd.Series(['10.10', '0.005', '-3.335'])).tolist() == [1010, 1, -334]
+
+
+def test_porcentajes_igual_que_porcentaje():
+    cantidades = pd.Series([0, 1, 50, 250, 333, 1050, -250, -1050, 99999999])
+    for pct in (0, 4, 7, 10, 15, 19, 20, 21):
+        assert porcentajes(cantidades, pct).tolist() == [porcentaje(c, pct) for c in cantidades]
+
+
+def test_porcentaje_redondea_al_centimo():
+    assert porcentaje(250, 21) == 53      # 52.5 -> 53
+    assert porcentaje(-250, 21) == -53
+    assert porcentaje(1000, 15) == 150
+
+
+def test_desglose_siempre_cuadra():
+    for base in (1, 99, 12345, 100000):
+        d = desglose(base, 21, 15)
+        assert d['total'] == base + d['cuota_iva'] - d['retencion']
+    assert desglose(100000, 21, 15) == {'cuota_iva': 21000, 'retencion': 15000, 'total': 106000}
+
+
+def test_euros_vuelve_al_mismo_importe():
+    for c in (1, 10, 268, 123456, -101):
+        assert centimos(euros(c)) == c
+    assert repr(euros(268)) == '2.68'
+
+
+def test_a_euros_y_formato():
+    df = pd.DataFrame({'base': [12345], 'iva_pct': [21]})
+    assert a_euros(df)['base'].tolist() == [123.45]
+    assert a_euros(df)['iva_pct'].tolist() == [21]
+    assert df['base'].tolist() == [12345]  # no toca el original
+    assert formato(123456789) == "1,234,567.89 €"
@@ -0,0 +1,129 @@
+import datetime
+import os
+import stat
+
+import pandas as pd
+import pytest
+
+from bench.cliente_local import ClienteLocal
+from bench.sinteticos import generar
+from core import datos, espejo
+from core.cache import cache_usuario
+from core.dinero import centimos
+from core.espejo import RETENCION_BORRADOS, Espejo
+
+USER_ID = '00000000-0000-0000-0000-0000000000a1'
+OTRO = '00000000-0000-0000-0000-0000000000b2'
+
+
+@pytest.fixture
+def client():
+    # Libros de dos usuarios escritos hace tiempo, cada fila una hora después que la anterior
+    mio, otro = generar(300, USER_ID, semilla=5), generar(40, OTRO, semilla=6)
+    tablas = {}
+    for tabla in ('ingresos', 'gastos'):
+        df = pd.concat([mio[tabla], otro[tabla].assign(id=otro[tabla]['id'] + len(mio[tabla]))], ignore_index=True)
+        marcas = pd.Timestamp('2025-01-01', tz='UTC') + pd.to_timedelta(df['id'], unit='h')
+        tablas[tabla] = df.assign(updated_at=marcas.dt.strftime('%Y-%m-%dT%H:%M:%S.%f+00:00'))
+    cache_usuario.clear()
+    yield ClienteLocal(tablas)
+    cache_usuario.clear()
+
+
+@pytest.fixture
+def replica(tmp_path):
+    e = Espejo(str(tmp_path / f"{USER_ID}.sqlite3"), USER_ID)
+    yield e
+    e._con.close()
+
+
+def _ids(e, tabla):
+    return sorted(e.filas(tabla, ['id'])['id'].tolist())
+
+
+def _en_servidor(client, tabla):
+    df = client.tablas[tabla]
+    return sorted(df.loc[df['user_id'] == USER_ID, 'id'].tolist())
+
+
+def _espiar(e):
+    # (tabla, id) de cada fila que llega del servidor
+    vistas, guardar = [], e.guardar
+    def espia(tabla, filas, marca=None):
+        vistas.extend((tabla, f['id']) for f in filas)
+        return guardar(tabla, filas, marca)
+    e.guardar = espia
+    return vistas
+
+
+def test_se_llena_y_despues_solo_pide_lo_cambiado(client, replica):
+    assert replica.sincronizar(client, forzar=True) == {'ingresos', 'gastos'}
+    for tabla in ('ingresos', 'gastos'):
+        assert _ids(replica, tabla) == _en_servidor(client, tabla)
+
+    # Desde otro dispositivo: una alta, un cambio y un borrado
+    primera, ultima_i = _en_servidor(client, 'ingresos')[0], _en_servidor(client, 'ingresos')[-1]
+    ultima_g = _en_servidor(client, 'gastos')[-1]
+    nueva, = datos.insertar(client, USER_ID, 'ingresos', {
+        'fecha': '2030-01-01', 'cliente': 'Nuevo', 'base': 10.0, 'iva_pct': 21, 'cuota_iva': 2.1,
+        'irpf_pct': 0, 'retencion': 0.0, 'total': 12.1})
+    client.table('ingresos').update({'base': 999.0}).eq('user_id', USER_ID).eq('id', primera).execute()
+    borrada = _en_servidor(client, 'gastos')[0]
+    datos.borrar(client, USER_ID, 'gastos', borrada)
+
+    vistas = _espiar(replica)
+    assert replica.sincronizar(client, forzar=True) == {'ingresos', 'gastos'}
+    # Lo escrito después de la marca y, por el MARGEN, la última fila ya vista de cada tabla
+    assert sorted(vistas) == sorted([('ingresos', nueva['id']), ('ingresos', primera),
+                                     ('ingresos', ultima_i), ('gastos', ultima_g)])
+    for tabla in ('ingresos', 'gastos'):
+        assert _ids(replica, tabla) == _en_servidor(client, tabla)
+    base = replica.filas('ingresos', ['id', 'base']).set_index('id')['base']
+    assert base[primera] == centimos(999.0)
+    assert borrada not in _ids(replica, 'gastos')
+
+
+def test_lapidas_y_filas_restauradas(client, replica):
+    replica.sincronizar(client, forzar=True)
+    borradas = datos.borrar_varios(client, USER_ID, 'gastos', _en_servidor(client, 'gastos')[:3])
+    assert replica.sincronizar(client, forzar=True) == {'gastos'}
+    assert _ids(replica, 'gastos') == _en_servidor(client, 'gastos')
+
+    # Deshacer: la fila vuelve con un updated_at posterior a su lápida
+    datos.restaurar(client, USER_ID, 'gastos', borradas)
+    assert replica.sincronizar(client, forzar=True) == {'gastos'}
+    assert _ids(replica, 'gastos') == _en_servidor(client, 'gastos')
+
+    # Una lápida anterior a la copia local (vuelve a llegar por el MARGEN) no la borra
+    fila = borradas[0]
+    replica._aplicar_borrados([{'id': 1, 'tabla': 'gastos', 'fila_id': fila['id'],
+                                'borrado_en': '2000-01-01T00:00:00+00:00'}])
+    assert fila['id'] in _ids(replica, 'gastos')
+
+
+def test_sin_sincronizar_mas_que_la_retencion_se_rehace(client, replica):
+    replica.sincronizar(client, forzar=True)
+    consultas = client.consultas
+    assert replica.sincronizar(client) == set()  # antes de SINCRONIZAR_CADA no pregunta
+    assert client.consultas == consultas
+
+    # Lo borrado hace más de RETENCION_BORRADOS días ya no tiene lápida: se rehace entera
+    perdida = _en_servidor(client, 'ingresos')[0]
+    replica.quitar('ingresos', [perdida])
+    datos.borrar(client, USER_ID, 'ingresos', _en_servidor(client, 'ingresos')[-1])
+    client._lapidas.clear()
+    viejo = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=RETENCION_BORRADOS + 1)
+    with replica._con:
+        replica._poner_meta('sincronizado', viejo.isoformat())
+    replica.sincronizar(client, forzar=True)
+    assert _ids(replica, 'ingresos') == _en_servidor(client, 'ingresos')
+    assert perdida in _ids(replica, 'ingresos')
+
+
+@pytest.mark.skipif(os.name == 'nt', reason="permisos POSIX")
+def test_carpeta_por_usuario_y_privada(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    previa = tmp_path / 'gestor' / 'espejo'
+    previa.mkdir(parents=True, mode=0o755)  # de una versión anterior, abierta a todos
+    assert espejo._carpeta() == str(previa)
+    assert stat.S_IMODE(os.stat(previa).st_mode) == 0o700
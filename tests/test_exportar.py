@@ -0,0 +1,50 @@
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+
+from bench.cliente_local import ClienteLocal
+from bench.sinteticos import generar
+from core import exportar
+from core.cache import cache_usuario
+
+USER_ID = '00000000-0000-0000-0000-0000000000a1'
+
+
+@pytest.fixture
+def client():
+    tablas = generar(300, USER_ID, semilla=5)
+    # Gastos sin categoría ni proveedor (p.ej. importados de un extracto)
+    tablas['gastos'].loc[::7, ['categoria', 'proveedor']] = None
+    cache_usuario.clear()
+    yield ClienteLocal(tablas)
+    cache_usuario.clear()
+
+
+def _leer(datos, formato):
+    if formato == "CSV":
+        return pd.read_csv(io.BytesIO(datos), keep_default_na=False, dtype=str)
+    if formato == "Parquet":
+        return pd.read_parquet(io.BytesIO(datos))
+    return pd.read_excel(io.BytesIO(datos), keep_default_na=False, dtype=str)
+
+
+@pytest.mark.parametrize('formato', list(exportar.FORMATOS))
+def test_exportar_sin_categoria_sale_vacio(client, formato, monkeypatch):
+    monkeypatch.setattr(exportar, 'BLOQUE', 50)  # varios bloques
+    df = _leer(exportar.exportar_tabla(client, USER_ID, 'gastos', formato), formato)
+    gastos = client.tablas['gastos']
+    assert len(df) == len(gastos)
+    for columna in ('categoria', 'proveedor'):
+        valores = df[columna].fillna('').astype(str)
+        assert not valores.isin(['nan', 'None', '<NA>']).any()
+        assert (valores == '').sum() == gastos[columna].isna().sum() > 0
+
+
+def test_pack_gestoria(client):
+    with zipfile.ZipFile(io.BytesIO(exportar.pack_gestoria(client, USER_ID, "CSV"))) as zf:
+        assert sorted(zf.namelist()) == ['gastos.csv', 'ingresos.csv', 'resumen_fiscal.csv']
+        ingresos = pd.read_csv(zf.open('ingresos.csv'))
+    assert len(ingresos) == len(client.tablas['ingresos'])
+    assert ingresos['base'].sum() == pytest.approx(client.tablas['ingresos']['base'].sum())
@@ -0,0 +1,91 @@
+import datetime
+
+import pandas as pd
+
+from core import fiscal
+
+
+def _libro(filas):
+    # [(fecha, base, cuota_iva, retencion)] en céntimos -> DataFrame como el de core.datos
+    return pd.DataFrame(filas, columns=['fecha', 'base', 'cuota_iva', 'retencion']).astype(
+        {'fecha': 'datetime64[ns]'})
+
+
+INGRESOS = _libro([
+    ('2025-01-15', 100000, 21000, 15000),
+    ('2025-03-31', 50000, 10500, 0),
+    ('2025-04-01', 200000, 42000, 30000),
+    ('2024-12-31', 10000, 2100, 1500),
+])
+GASTOS = _libro([
+    ('2025-02-10', 20000, 4200, 0),
+    ('2025-05-05', 300000, 63000, 57000),  # alquiler con retención del 19 %
+])
+
+
+def test_totales_por_trimestre():
+    t = fiscal.totales_por_periodo(INGRESOS, GASTOS).set_index(['anio', 'trimestre'])
+    assert list(t.index) == [(2024, 4), (2025, 1), (2025, 2)]
+    assert t.loc[(2025, 1)].to_dict() == {
+        'base_ingresos': 150000, 'iva_rep': 31500, 'ret_sop': 15000,
+        'base_gastos': 20000, 'iva_sop': 4200, 'ret_prac': 0}
+    assert t.loc[(2024, 4), 'base_gastos'] == 0
+
+
+def test_modelos_del_trimestre():
+    trimestral, anual = fiscal.calcular(INGRESOS, GASTOS)
+    t1 = trimestral.set_index(['anio', 'trimestre']).loc[(2025, 1)]
+    assert t1['beneficio'] == 130000
+    assert t1['mod_303'] == 31500 - 4200
+    assert t1['mod_130'] == 26000 - 15000     # 20 % del beneficio menos lo ya retenido
+    assert t1['mod_111'] == 0
+    assert t1['hucha'] == t1['mod_303'] + t1['mod_130'] + t1['mod_111']
+
+    # Con pérdidas el 130 no sale negativo; el 111 es lo retenido a proveedores
+    t2 = trimestral.set_index(['anio', 'trimestre']).loc[(2025, 2)]
+    assert t2['beneficio'] == -100000
+    assert t2['mod_130'] == 0
+    assert t2['mod_111'] == 57000
+
+    assert anual.set_index('anio').loc[2025, 'facturado'] == 350000
+    assert anual['facturado'].dtype == 'int64'
+
+
+def test_sin_movimientos():
+    trimestral, anual = fiscal.calcular(INGRESOS.iloc[:0], None)
+    assert trimestral.empty and anual.empty
+    assert fiscal.calcular_modelos(fiscal.totales_vacios()) == {c: 0 for c in fiscal.MODELOS}
+
+
+def test_calcular_lote_igual_que_uno_a_uno():
+    por_usuario = {'a': (INGRESOS, GASTOS), 'b': (INGRESOS.iloc[1:], GASTOS.iloc[:1])}
+    df_i = pd.concat([i.assign(user_id=u) for u, (i, _) in por_usuario.items()], ignore_index=True)
+    df_g = pd.concat([g.assign(user_id=u) for u, (_, g) in por_usuario.items()], ignore_index=True)
+    trimestral, _ = fiscal.calcular_lote(df_i, df_g)
+    for usuario, (i, g) in por_usuario.items():
+        solo, _ = fiscal.calcular(i, g)
+        lote = trimestral[trimestral['user_id'] == usuario].drop(columns='user_id').reset_index(drop=True)
+        pd.testing.assert_frame_equal(lote, solo, check_dtype=False)
+
+
+def test_modelos_desde_el_libro_trimestral():
+    # Las filas de resumen_trimestral (BD) dan lo mismo que calcular() sobre las facturas
+    trimestral, _ = fiscal.calcular(INGRESOS, GASTOS)
+    libro = fiscal.totales_por_periodo(INGRESOS, GASTOS).assign(n_ingresos=1, n_gastos=1)
+    desde_libro = fiscal.modelos(libro)
+    for c in fiscal.MODELOS:
+        assert desde_libro[c].tolist() == trimestral[c].tolist()
+
+
+def test_periodos():
+    trimestral, _ = fiscal.calcular(INGRESOS, GASTOS)
+    opciones = fiscal.opciones_periodo(trimestral)
+    assert list(opciones)[:3] == ["Todo el histórico", "Año 2025", "2025 · 2T"]
+    for etiqueta, periodo in opciones.items():
+        assert fiscal.periodo_de_etiqueta(etiqueta) == periodo
+    assert len(fiscal.filtrar_periodo(trimestral, 2025)) == 2
+    assert len(fiscal.filtrar_periodo(trimestral, 2025, 2)) == 1
+    assert fiscal.rango_periodo(2024, 1) == (datetime.date(2024, 1, 1), datetime.date(2024, 3, 31))
+    assert fiscal.rango_periodo(2025, 4) == (datetime.date(2025, 10, 1), datetime.date(2025, 12, 31))
+    assert fiscal.rango_periodo(2025) == (datetime.date(2025, 1, 1), datetime.date(2025, 12, 31))
+    assert fiscal.rango_periodo() == (None, None)
@@ -0,0 +1,82 @@
+import io
+
+import pandas as pd
+import pytest
+
+from bench.cliente_local import ClienteLocal
+from bench.sinteticos import generar
+from core import cuotas
+from core.cache import cache_usuario
+from core.importador import importar, leer_bloques, normalizar
+
+USER_ID = '00000000-0000-0000-0000-0000000000a1'
+OTRO = '00000000-0000-0000-0000-0000000000b2'
+
+
+@pytest.fixture
+def client():
+    # Plan NORMAL con un límite pequeño; las tablas solo tienen filas de otro usuario
+    cache_usuario.clear()
+    yield ClienteLocal(generar(20, OTRO, semilla=1), plan={'plan': 'normal', 'altas_mes': 5, 'altas_total': None})
+    cache_usuario.clear()
+
+
+def _bloque(texto):
+    bloque, _ = next(leer_bloques(io.BytesIO(texto.encode('utf-8')), 'datos.csv'))
+    return bloque
+
+
+def test_plantilla_con_numeros_en_formato_europeo():
+    bloque = _bloque("fecha;cliente;base;iva_pct;irpf_pct\n"
+                     "31/01/2025;Cliente A;1.234,56 €;21;15\n"
+                     "2025-02-01;Cliente B;12,5;;\n"
+                     "2025-02-02;Cliente C;100;16;0\n")
+    filas, errores = normalizar(bloque, 'ingresos', "Detectar automáticamente", 21, 0)
+    assert filas.to_dict('records') == [
+        {'fecha': '2025-01-31', 'cliente': 'Cliente A', 'base': 1234.56, 'iva_pct': 21, 'cuota_iva': 259.26,
+         'irpf_pct': 15, 'retencion': 185.18, 'total': 1308.64},
+        {'fecha': '2025-02-01', 'cliente': 'Cliente B', 'base': 12.5, 'iva_pct': 21, 'cuota_iva': 2.63,
+         'irpf_pct': 0, 'retencion': 0.0, 'total': 15.13},
+    ]
+    assert errores == [(2, "IVA no permitido (usa 0, 4, 10, 21)")]
+
+
+def test_extracto_de_revolut():
+    bloque = pd.DataFrame({
+        'Date started (UTC)': ['2025-03-01', '2025-03-02', '2025-03-03', '2025-03-04'],
+        'Date completed (UTC)': ['2025-03-02', '', '2025-03-04', '2025-03-05'],
+        'Description': ['Hosting', 'Coworking', 'Cobro factura 7', 'Tarjeta'],
+        'Amount': ['-121.00', '-60,50', '500.00', '-10.00'],
+        'State': ['COMPLETED', 'COMPLETED', 'COMPLETED', 'REVERTED'],
+    })
+    filas, errores = normalizar(bloque, 'gastos', "Detectar automáticamente", 21, 0, "Servicios")
+    # Solo los pagos completados; el importe es el total con IVA
+    assert errores == []
+    assert filas[['fecha', 'proveedor', 'categoria', 'base', 'cuota_iva', 'total']].to_dict('records') == [
+        {'fecha': '2025-03-02', 'proveedor': 'Hosting', 'categoria': 'Servicios', 'base': 100.0,
+         'cuota_iva': 21.0, 'total': 121.0},
+        {'fecha': '2025-03-02', 'proveedor': 'Coworking', 'categoria': 'Servicios', 'base': 50.0,
+         'cuota_iva': 10.5, 'total': 60.5},
+    ]
+
+    filas, errores = normalizar(bloque.drop(columns='Amount'), 'gastos', "Extracto Revolut Business", 21, 0)
+    assert filas.empty and [m for _, m in errores] == ["Faltan columnas del extracto de Revolut: 'Amount'"] * 4
+
+
+def test_importacion_cortada_por_el_cupo(client):
+    # La caché cree que quedan 5 altas, pero otro dispositivo ya ha gastado 3
+    assert cuotas.disponibles(client, USER_ID) == 5
+    client.table('ingresos').insert([{'user_id': USER_ID, 'fecha': '2025-01-01', 'base': 1, 'total': 1}] * 3).execute()
+
+    csv = "fecha,cliente,base,iva_pct,irpf_pct\n" + "".join(f"2025-04-{d:02d},C{d},100,21,0\n" for d in range(1, 9))
+    insertadas, errores = importar(client, USER_ID, 'ingresos', io.BytesIO(csv.encode()), 'datos.csv',
+                                   "Plantilla Gestor PRO", 21, 0, tamano=4)
+
+    # El lote de 4 lo rechaza la base de datos; fila a fila caben 2 y el resto se para
+    assert insertadas == 2
+    assert [linea for linea, _ in errores] == [4, 5, 6]
+    assert all("límite del plan" in motivo.lower() for _, motivo in errores)
+    assert errores[-1][1] == "Límite del plan alcanzado: el resto del archivo no se ha importado"
+    propias = client.tablas['ingresos'][client.tablas['ingresos']['user_id'] == USER_ID]
+    assert sorted(propias['cliente'].dropna()) == ['C1', 'C2']
+    assert cuotas.disponibles(client, USER_ID) == 0
@@ -0,0 +1,56 @@
+import concurrent.futures
+import marshal
+import threading
+
+from core import metricas
+
+
+def test_en_hilo_no_deja_el_contexto_en_el_hilo():
+    with concurrent.futures.ThreadPoolExecutor(1) as pool:
+        metricas.empezar_pagina("Dashboard", "ana")
+        vista = pool.submit(metricas.en_hilo(lambda: metricas._contexto.get()['pagina'])).result()
+        metricas._contexto.set(None)
+        # La siguiente tarea del mismo hilo, sin en_hilo, ya no es de esa página
+        despues = pool.submit(metricas._contexto.get).result()
+    assert vista == "Dashboard"
+    assert despues is None
+
+
+
+PAGINA = """
+from core.arranque import iniciar_pagina
+
+iniciar_pagina("Prueba", "🧪", login=False)
+
+def trabajo():
+    return sorted(range(20000), key=lambda x: -x)
+
+trabajo()
+"""
+
+
+def ajena():
+    sum(range(1000))
+
+
+def test_perfilar_pagina_solo_mide_su_sesion(tmp_path):
+    ruta = tmp_path / "pagina.py"
+    ruta.write_text(PAGINA, encoding='utf-8')
+    # Mientras tanto, otras sesiones del proceso ejecutan sus scripts
+    parar = threading.Event()
+
+    def otras_sesiones():
+        while not parar.is_set():
+            otra = threading.Thread(target=ajena, name="ScriptRunner.scriptThread")
+            otra.start()
+            otra.join()
+
+    hilo = threading.Thread(target=otras_sesiones)
+    hilo.start()
+    try:
+        texto, perfil = metricas.perfilar_pagina(str(ruta), client=None, user=None)
+    finally:
+        parar.set()
+        hilo.join()
+    assert "(trabajo)" in texto
+    assert not any(funcion == 'ajena' for _, _, funcion in marshal.loads(perfil))